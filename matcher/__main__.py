@@ -3,307 +3,556 @@ CLI interface for the matcher
 """
 
 import argparse
-import csv
+import hashlib
 import json
+import os
 from .core import Matcher
-from .solvers import MinMaxSolver, FairFlow
+from .profiling import Profiler
+from .ingest import read_edge_files, read_edges, read_table, unique_ids, index_edges
+from .writers import OUTPUT_FORMATS
 import logging
-from collections import defaultdict
 import time
 
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
-
-log_format = (
-    "%(asctime)s %(levelname)s: [in %(pathname)s:%(lineno)d] %(message)s"
-)
-logging.basicConfig(filename="default.log", format=log_format)
-
-consoleHandler = logging.StreamHandler()
-logger.addHandler(consoleHandler)
-
-t0 = time.time()
-logger.info("Starting time={}".format(t0))
-
-parser = argparse.ArgumentParser()
-parser.add_argument(
-    "--scores",
-    nargs="+",
-    help="""
-        One or more score files,
-        with each row containing comma-separated paperID, userID, and score (in that order).
-        e.g. "paper1,reviewer1,0.5"
-        """,
-)
-
-parser.add_argument(
-    "--constraints",
-    help="""
-        One or more constraint files,
-        with each row containing comma-separated paperID, userID, and constraint (in that order).
-        Constraint values must be -1 (conflict), 1 (forced assignment), or 0 (no effect).
-        e.g. "paper1,reviewer1,-1"
-        """,
-)
-
-parser.add_argument(
-    "--max_papers",
-    help="""
-        max paper files,
-        with each row containing comma-separated userID, and max_papers that can be assigned to this user (in that order).
-        e.g. "reviewer1,2""",
-)
-
-
-parser.add_argument("--weights", nargs="+", type=float)
-parser.add_argument("--min_papers_default", default=0, type=int)
-parser.add_argument("--max_papers_default", type=int)
-parser.add_argument("--num_reviewers", default=3, type=int)
-parser.add_argument("--num_alternates", default=3, type=int)
-parser.add_argument(
-    "--allow_zero_score_assignments",
-    action="store_true",
-    help="""Use flag to allow 0 affinity (unknown scores default to 0) pairs in solver solution""",
-)
-parser.add_argument("--user_group", type=str)
-
-parser.add_argument(
-    "--user_group_file",
-    help="""Pass a csv file with each line in the form: \"Group1, user_email\"""",
-)
-
-parser.add_argument(
-    "--probability_limits",
-    help="""
-        One or more probability limit files for use with the Randomized Solver,
-        with each row containing comma-separated paperID, userID, and limit on the marginal probability of that assignment,
-        OR a single float representing the limit on the marginal assignment probability for all assignments.
-        """,
-)
-
-parser.add_argument(
-    "--perturbation",
-    help="""
-        A single float representing the perturbation factor for the Perturbed Maximization Solver. The value should be between 0 and 1, increasing the value will trade assignment quality for randomization.
-        """,
-)
-
-parser.add_argument(
-    "--bad_match_thresholds",
-    nargs="+",
-    type=float,
-    help="""
-        One or more floating numbers representing the thresholds in affinity score
-        for categorizing a paper-reviewer match. The Perturbed Maximization Solver 
-        uses these thresholds, and tries to randomize the assignment within the
-        threshold range. E.g., 0.1, 0.3, 0.5 means that the solver will try to 
-        randomize within [0, 0.1), [0.1, 0.3), [0.3, 0.5), [0.5, 1.0] score ranges.
-        """,
-)
-
-# TODO: dynamically populate solvers list
-# TODO: can argparse throw an error if the solver isn't in the list?
-parser.add_argument(
-    "--solver",
-    help="Choose from: {}".format(["MinMax", "FairFlow", "Randomized", "FairIR", "PerturbedMaximization"]),
-    default="MinMax",
-)
-
-parser.add_argument(
-    "--attribute_constraints",
-    help="""JSON file with attribute constraints"""
-)
-
-# Output folder
-parser.add_argument(
-    "--output_folder",
-    help="Output folder for assignments and alternates",
-    default=".",
-)
-
-args = parser.parse_args()
-
-# Main Logic
-logger.info("Setting solver class")
-solver_class = None
-if args.solver == "MinMax":
-    solver_class = "MinMax"
-if args.solver == "FairFlow":
-    solver_class = "FairFlow"
-if args.solver == "Randomized":
-    solver_class = "Randomized"
-if args.solver == "FairIR":
-    solver_class = "FairIR"
-if args.solver == "PerturbedMaximization":
-    solver_class = "PerturbedMaximization"
-
-if not solver_class:
-    raise ValueError("Invalid solver class {}".format(args.solver))
-logger.info("Using solver={}".format(solver_class))
-
-reviewer_set = set()
-paper_set = set()
-logger.info("Using weights={}".format(args.weights))
-weight_by_type = {
-    score_file: args.weights[idx] for idx, score_file in enumerate(args.scores)
-}
-
-scores_by_type = {score_file: {"edges": []} for score_file in args.scores}
-
-for score_file in args.scores:
-    logger.info("processing file={}".format(score_file))
-    file_reviewers = []
-    file_papers = []
-
-    with open(score_file) as file_handle:
-
-        for row in csv.reader(file_handle):
-            paper_id = row[0].strip()
-            profile_id = row[1].strip()
-            score = row[2].strip()
-
-            file_reviewers.append(profile_id)
-            file_papers.append(paper_id)
-            scores_by_type[score_file]["edges"].append(
-                (paper_id, profile_id, score)
+
+
+def build_parser():
+    """Return the argument parser of the matcher CLI."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scores",
+        nargs="+",
+        help="""
+            One or more score files,
+            with each row containing comma-separated paperID, userID, and score (in that order).
+            e.g. "paper1,reviewer1,0.5"
+            Files ending in .parquet, .feather or .npz are read as binary edge files
+            (see `python -m matcher.ingest`).
+            """,
+    )
+
+    parser.add_argument(
+        "--constraints",
+        help="""
+            One or more constraint files,
+            with each row containing comma-separated paperID, userID, and constraint (in that order).
+            Constraint values must be -1 (conflict), 1 (forced assignment), or 0 (no effect).
+            e.g. "paper1,reviewer1,-1"
+            Binary edge files (.parquet, .feather, .npz) are accepted as for --scores.
+            """,
+    )
+
+    parser.add_argument(
+        "--max_papers",
+        help="""
+            max paper files,
+            with each row containing comma-separated userID, and max_papers that can be assigned to this user (in that order).
+            e.g. "reviewer1,2""",
+    )
+
+
+    parser.add_argument("--weights", nargs="+", type=float)
+    parser.add_argument("--min_papers_default", default=0, type=int)
+    parser.add_argument("--max_papers_default", type=int)
+    parser.add_argument("--num_reviewers", default=3, type=int)
+    parser.add_argument("--num_alternates", default=3, type=int)
+    parser.add_argument(
+        "--allow_zero_score_assignments",
+        action="store_true",
+        help="""Use flag to allow 0 affinity (unknown scores default to 0) pairs in solver solution""",
+    )
+    parser.add_argument("--user_group", type=str)
+
+    parser.add_argument(
+        "--user_group_file",
+        help="""Pass a csv file with each line in the form: \"Group1, user_email\"""",
+    )
+
+    parser.add_argument(
+        "--probability_limits",
+        help="""
+            One or more probability limit files for use with the Randomized Solver,
+            with each row containing comma-separated paperID, userID, and limit on the marginal probability of that assignment,
+            OR a single float representing the limit on the marginal assignment probability for all assignments.
+            Binary edge files (.parquet, .feather, .npz) are accepted as for --scores.
+            """,
+    )
+
+    parser.add_argument(
+        "--perturbation",
+        help="""
+            A single float representing the perturbation factor for the Perturbed Maximization Solver. The value should be between 0 and 1, increasing the value will trade assignment quality for randomization.
+            """,
+    )
+
+    parser.add_argument(
+        "--bad_match_thresholds",
+        nargs="+",
+        type=float,
+        help="""
+            One or more floating numbers representing the thresholds in affinity score
+            for categorizing a paper-reviewer match. The Perturbed Maximization Solver 
+            uses these thresholds, and tries to randomize the assignment within the
+            threshold range. E.g., 0.1, 0.3, 0.5 means that the solver will try to 
+            randomize within [0, 0.1), [0.1, 0.3), [0.3, 0.5), [0.5, 1.0] score ranges.
+            """,
+    )
+
+    # TODO: dynamically populate solvers list
+    # TODO: can argparse throw an error if the solver isn't in the list?
+    parser.add_argument(
+        "--solver",
+        help="Choose from: {}".format(["MinMax", "FairFlow", "Randomized", "FairIR", "PerturbedMaximization"]),
+        default="MinMax",
+    )
+
+    parser.add_argument(
+        "--attribute_constraints",
+        help="""JSON file with attribute constraints"""
+    )
+
+    parser.add_argument(
+        "--sparse",
+        action="store_true",
+        help="""Store scores, costs and constraints as sparse matrices holding only the known
+        (paper, reviewer) edges. Supported by the MinMax, Randomized and FairIR solvers.""",
+    )
+
+    parser.add_argument(
+        "--memmap_dir",
+        help="""Directory for memory-mapped score, cost, constraint and limit matrices. Keeps
+        large instances out of RAM; a later run on the same data reuses the encoded files.""",
+    )
+
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="""Store matrices with compact dtypes: int8 constraints, float32 scores and
+        probability limits, int32 costs.""",
+    )
+
+    parser.add_argument(
+        "--cache_dir",
+        help="""Directory for encoded problems, keyed by a hash of the input files, weights and
+        encoding options. A later run with identical inputs loads the stored matrices instead
+        of encoding them again.""",
+    )
+
+    parser.add_argument(
+        "--candidates_per_paper",
+        type=int,
+        help="""Build the min-cost flow graphs with arcs to only the N cheapest reviewers of
+        each paper (and forced pairs), widening them until the solution is optimal for the
+        full graph. Supported by the MinMax and Randomized solvers.""",
+    )
+
+    parser.add_argument(
+        "--candidates_per_reviewer",
+        type=int,
+        help="""Like --candidates_per_paper, for the N cheapest papers of each reviewer. Both
+        may be given; a pair is kept if either keeps it.""",
+    )
+
+    parser.add_argument(
+        "--single_solve",
+        action="store_true",
+        help="""Solve one min-cost flow with the reviewer minimums as lower bounds, instead of
+        one for the minimums and another for the rest. Finds the optimum over all loads
+        within the minimums and maximums. Supported by the MinMax and Randomized solvers.""",
+    )
+
+    parser.add_argument(
+        "--fractional_backend",
+        choices=["flow", "lp"],
+        help="""How the Randomized solver finds the fractional assignment: a min-cost flow
+        with every capacity scaled up (flow, the default), or the LP solved directly with
+        HiGHS and its solution rounded (lp). The LP finds the optimum over all loads within
+        the minimums and maximums, like --single_solve.""",
+    )
+
+    parser.add_argument(
+        "--skip_deterministic_baseline",
+        action="store_true",
+        help="""Do not solve the optimal deterministic assignment alongside the Randomized
+        solver's fractional assignment. It only serves to report the fraction of the
+        optimal score achieved (randomized_fraction_of_opt), which is then left out.""",
+    )
+
+    parser.add_argument(
+        "--concurrent_baseline",
+        action="store_true",
+        help="""Solve the Randomized solver's optimal deterministic assignment on a second
+        thread, alongside its fractional assignment. Only faster with more than one core.""",
+    )
+
+    parser.add_argument(
+        "--skip_feasibility_check",
+        action="store_true",
+        help="""Do not check the problem for infeasibility (e.g. papers without enough
+        available reviewers) before running the solver""",
+    )
+
+    # Output folder
+    parser.add_argument(
+        "--output_folder",
+        help="Output folder for assignments and alternates",
+        default=".",
+    )
+
+    parser.add_argument(
+        "--output_format",
+        help="""Format of the assignments and alternates files: json (default), jsonl, csv
+        (headerless paper_id,user,aggregate_score rows) or parquet""",
+        choices=OUTPUT_FORMATS,
+        default="json",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="""Record wall time, CPU time and peak RSS increase of every stage of the run, and write them
+        to profile.json in the output folder""",
+    )
+
+    parser.add_argument(
+        "--profile_solver",
+        action="store_true",
+        help="With --profile, also dump cProfile statistics of the solver to solver.prof",
+    )
+
+    return parser
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of the contents of the file at `path`."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as file_handle:
+        for chunk in iter(lambda: file_handle.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_solver_class(solver):
+    """Return the solver class name for the --solver argument, or raise a ValueError."""
+    logger.info("Setting solver class")
+    solver_class = None
+    if solver == "MinMax":
+        solver_class = "MinMax"
+    if solver == "FairFlow":
+        solver_class = "FairFlow"
+    if solver == "Randomized":
+        solver_class = "Randomized"
+    if solver == "FairIR":
+        solver_class = "FairIR"
+    if solver == "PerturbedMaximization":
+        solver_class = "PerturbedMaximization"
+
+    if not solver_class:
+        raise ValueError("Invalid solver class {}".format(solver))
+    logger.info("Using solver={}".format(solver_class))
+    return solver_class
+
+
+# the CLI options that name input files, or change how they are read; scenarios of a
+# batch that agree on these share one load_inputs()
+INPUT_OPTIONS = [
+    "scores",
+    "constraints",
+    "max_papers",
+    "user_group",
+    "user_group_file",
+    "probability_limits",
+    "attribute_constraints",
+    "cache_dir",
+    "memmap_dir",
+]
+
+
+def load_inputs(args, profiler=None, edge_frames=None):
+    """
+    Read, hash and index the input files named in the parsed CLI `args` (see
+    INPUT_OPTIONS), and return them as a dict for `load_match_data`.
+
+    `edge_frames`, if given, is a dict of parsed edge files keyed on path: files found
+    in it are not read again, and files that are read are added to it.
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
+    # the edge files stand in for the parsed edges in the encoding cache key
+    cache_key = None
+    with profiler.stage("hash_inputs"):
+        if args.cache_dir or args.memmap_dir:
+            edge_files = list(args.scores) + [args.constraints, args.probability_limits]
+            cache_key = json.dumps(
+                [
+                    (path, file_digest(path))
+                    for path in edge_files
+                    if path and os.path.isfile(path)
+                ]
             )
 
-    reviewer_set.update(file_reviewers)
-    paper_set.update(file_papers)
-
-constraints = []
-if args.constraints:
-    with open(args.constraints) as file_handle:
-        for row in csv.reader(file_handle):
-            paper_id = row[0]
-            profile_id = row[1]
-            constraint = row[2]
-
-            reviewer_set.update([profile_id])
-            paper_set.update([paper_id])
-
-            constraints.append((paper_id, profile_id, constraint))
-
-reviewers = sorted(list(reviewer_set))
-papers = sorted(list(paper_set))
-
-user_group_map = defaultdict(list)
-if args.user_group_file:
-    with open(args.user_group_file) as file_handle:
-        for row in csv.reader(file_handle):
-            group_id = row[0]
-            reviewer_email = row[1]
-            user_group_map[group_id].append(reviewer_email)
-
-reviewers_copy = [reviewer for reviewer in reviewers]
-if args.user_group:
-    selected_reviewers = user_group_map.get(args.user_group)
-    for reviewer in reviewers:
-        if reviewer not in selected_reviewers:
-            reviewers_copy.remove(reviewer)
-    reviewers = reviewers_copy
-
-minimums = [args.min_papers_default] * len(reviewers)
-maximums = [args.max_papers_default] * len(reviewers)
-
-if args.max_papers:
-    missing_reviewers = []
-    with open(args.max_papers) as file_handle:
-        for idx, row in enumerate(csv.reader(file_handle)):
-            profile_id = row[0]
-            max_assignment = int(row[1])
-
-            if profile_id in reviewers:
-                reviewer_idx = reviewers.index(profile_id)
-
-                maximums[reviewer_idx] = max_assignment
-            else:
-                missing_reviewers.append(profile_id)
-    if missing_reviewers:
-        logger.info(
-            "Reviewers missing in all score files: " + ", ".join(profile_id)
-        )
+    for score_file in args.scores:
+        logger.info("processing file={}".format(score_file))
+    if edge_frames is None:
+        edge_frames = {}
 
-demands = [args.num_reviewers] * len(papers)
-num_alternates = args.num_alternates
-
-probability_limits = []
-if args.probability_limits:
-    try:
-        probability_limits = float(args.probability_limits)
-    except ValueError:  # read from file
-        missing_reviewers = set()
-        missing_papers = set()
-        with open(args.probability_limits) as file_handle:
-            for row in csv.reader(file_handle):
-                paper_id = row[0].strip()
-                profile_id = row[1].strip()
-                limit = row[2].strip()
-
-                if profile_id in reviewer_set and paper_id in paper_set:
-                    probability_limits.append((paper_id, profile_id, limit))
-
-                if profile_id not in reviewer_set:
-                    missing_reviewers.add(profile_id)
-                if paper_id not in paper_set:
-                    missing_papers.add(paper_id)
-
-        if missing_reviewers:
-            logger.info(
-                "Reviewers with probability limits but missing in all score files: "
-                + ", ".join(missing_reviewers)
+    with profiler.stage("read_edges"):
+        edge_frames.update(
+            read_edge_files(
+                [path for path in args.scores if path not in edge_frames]
             )
-        if missing_papers:
-            logger.info(
-                "Papers with probability limits but missing in all score files: "
-                + ", ".join(missing_papers)
+        )
+        score_frames = {path: edge_frames[path] for path in args.scores}
+
+        constraint_frame = None
+        if args.constraints:
+            if args.constraints not in edge_frames:
+                edge_frames[args.constraints] = read_edges(
+                    args.constraints, strip=False
+                )
+            constraint_frame = edge_frames[args.constraints]
+
+    with profiler.stage("collect_ids"):
+        reviewer_set = unique_ids(
+            *[frame["reviewer"] for frame in score_frames.values()]
+        )
+        paper_set = unique_ids(*[frame["paper"] for frame in score_frames.values()])
+        if constraint_frame is not None:
+            reviewer_set.update(unique_ids(constraint_frame["reviewer"]))
+            paper_set.update(unique_ids(constraint_frame["paper"]))
+
+        reviewers = sorted(reviewer_set)
+        papers = sorted(paper_set)
+
+        if args.user_group:
+            selected_reviewers = set()
+            if args.user_group_file:
+                user_groups = read_table(
+                    args.user_group_file, ["group", "reviewer"], {"group": str, "reviewer": str}
+                )
+                selected_reviewers = set(
+                    user_groups["reviewer"][user_groups["group"] == args.user_group]
+                )
+            reviewers = [
+                reviewer for reviewer in reviewers if reviewer in selected_reviewers
+            ]
+
+    index_by_reviewer = {reviewer: idx for idx, reviewer in enumerate(reviewers)}
+
+    max_papers_by_index = {}
+    with profiler.stage("read_max_papers"):
+        if args.max_papers:
+            max_papers = read_table(
+                args.max_papers, ["reviewer", "max_papers"], {"reviewer": str, "max_papers": int}
             )
-        
-perturbation = 0.0
-if args.perturbation:
-    try:
-        perturbation = float(args.perturbation)
-    except ValueError:
-        logger.info("Perturbation is non-numeric, defaulting to 0.0")
-
-bad_match_thresholds = []
-if args.bad_match_thresholds:
-    for threshold in args.bad_match_thresholds:
-        bad_match_thresholds.append(threshold)
-
-attr_constraints = None
-if args.attribute_constraints:
-    with open(args.attribute_constraints) as file_handle:
-        attr_constraints = json.load(file_handle)
-
-
-logger.info("Count of reviewers={} ".format(len(reviewers)))
-logger.info("Count of papers={}".format(len(papers)))
-
-match_data = {
-    "reviewers": reviewers,
-    "papers": papers,
-    "constraints": constraints,
-    "scores_by_type": scores_by_type,
-    "weight_by_type": weight_by_type,
-    "minimums": minimums,
-    "maximums": maximums,
-    "demands": demands,
-    "probability_limits": probability_limits,
-    "perturbation": perturbation,
-    "bad_match_thresholds": bad_match_thresholds,
-    "num_alternates": num_alternates,
-    "allow_zero_score_assignments": args.allow_zero_score_assignments,
-    "attribute_constraints": attr_constraints,
-    "assignments_output": args.output_folder + "/assignments.json",
-    "alternates_output": args.output_folder + "/alternates.json",
-    "logger": logger,
-}
-
-matcher = Matcher(
-    datasource=match_data, solver_class=solver_class, logger=logger
-)
-
-matcher.run()
-t1 = time.time()
-logger.info("Overall execution time: {0} seconds".format(t1 - t0))
+            missing_reviewers = []
+            for profile_id, max_assignment in zip(
+                max_papers["reviewer"].tolist(), max_papers["max_papers"].tolist()
+            ):
+                reviewer_idx = index_by_reviewer.get(profile_id)
+                if reviewer_idx is not None:
+                    max_papers_by_index[reviewer_idx] = max_assignment
+                else:
+                    missing_reviewers.append(profile_id)
+            if missing_reviewers:
+                logger.info(
+                    "Reviewers missing in all score files: "
+                    + ", ".join(missing_reviewers)
+                )
+
+    with profiler.stage("index_edges"):
+        scores_by_type = {
+            score_file: {"edges": index_edges(frame, papers, reviewers, logger=logger)}
+            for score_file, frame in score_frames.items()
+        }
+        del score_frames
+
+        constraints = []
+        if constraint_frame is not None:
+            constraints = index_edges(constraint_frame, papers, reviewers, logger=logger)
+            del constraint_frame
+
+    probability_limits = []
+    with profiler.stage("read_probability_limits"):
+        if args.probability_limits:
+            try:
+                probability_limits = float(args.probability_limits)
+            except ValueError:  # read from file
+                if args.probability_limits not in edge_frames:
+                    edge_frames[args.probability_limits] = read_edges(
+                        args.probability_limits
+                    )
+                limit_frame = edge_frames[args.probability_limits]
+
+                known_reviewers = limit_frame["reviewer"].isin(reviewer_set)
+                known_papers = limit_frame["paper"].isin(paper_set)
+                missing_reviewers = unique_ids(limit_frame["reviewer"][~known_reviewers])
+                missing_papers = unique_ids(limit_frame["paper"][~known_papers])
+
+                probability_limits = index_edges(
+                    limit_frame[known_reviewers & known_papers],
+                    papers,
+                    reviewers,
+                    logger=logger,
+                )
+                del limit_frame
+
+                if missing_reviewers:
+                    logger.info(
+                        "Reviewers with probability limits but missing in all score files: "
+                        + ", ".join(missing_reviewers)
+                    )
+                if missing_papers:
+                    logger.info(
+                        "Papers with probability limits but missing in all score files: "
+                        + ", ".join(missing_papers)
+                    )
+
+    attr_constraints = None
+    if args.attribute_constraints:
+        with open(args.attribute_constraints) as file_handle:
+            attr_constraints = json.load(file_handle)
+
+    return {
+        "reviewers": reviewers,
+        "papers": papers,
+        "constraints": constraints,
+        "scores_by_type": scores_by_type,
+        "max_papers_by_index": max_papers_by_index,
+        "probability_limits": probability_limits,
+        "attribute_constraints": attr_constraints,
+        "cache_key": cache_key,
+    }
+
+
+def load_match_data(args, profiler=None, inputs=None):
+    """
+    Read the input files named in the parsed CLI `args` and return the keyword
+    arguments of a KeywordDatasource.
+
+    `inputs`, if given, is what `load_inputs` returned for the same INPUT_OPTIONS, and
+    the files are not read again.
+    """
+    if inputs is None:
+        inputs = load_inputs(args, profiler)
+
+    logger.info("Using weights={}".format(args.weights))
+    weight_by_type = {
+        score_file: args.weights[idx] for idx, score_file in enumerate(args.scores)
+    }
+
+    reviewers = inputs["reviewers"]
+    papers = inputs["papers"]
+
+    minimums = [args.min_papers_default] * len(reviewers)
+    maximums = [args.max_papers_default] * len(reviewers)
+    for reviewer_idx, max_assignment in inputs["max_papers_by_index"].items():
+        maximums[reviewer_idx] = max_assignment
+
+    demands = [args.num_reviewers] * len(papers)
+    num_alternates = args.num_alternates
+
+    perturbation = 0.0
+    if args.perturbation:
+        try:
+            perturbation = float(args.perturbation)
+        except ValueError:
+            logger.info("Perturbation is non-numeric, defaulting to 0.0")
+
+    bad_match_thresholds = []
+    if args.bad_match_thresholds:
+        for threshold in args.bad_match_thresholds:
+            bad_match_thresholds.append(threshold)
+
+    logger.info("Count of reviewers={} ".format(len(reviewers)))
+    logger.info("Count of papers={}".format(len(papers)))
+
+    match_data = {
+        "reviewers": reviewers,
+        "papers": papers,
+        "constraints": inputs["constraints"],
+        "scores_by_type": {
+            score_type: dict(scores)
+            for score_type, scores in inputs["scores_by_type"].items()
+        },
+        "weight_by_type": weight_by_type,
+        "minimums": minimums,
+        "maximums": maximums,
+        "demands": demands,
+        "probability_limits": inputs["probability_limits"],
+        "perturbation": perturbation,
+        "bad_match_thresholds": bad_match_thresholds,
+        "num_alternates": num_alternates,
+        "allow_zero_score_assignments": args.allow_zero_score_assignments,
+        "attribute_constraints": inputs["attribute_constraints"],
+        "sparse": args.sparse,
+        "memmap_dir": args.memmap_dir,
+        "compact": args.compact,
+        "cache_dir": args.cache_dir,
+        "cache_key": inputs["cache_key"],
+        "candidates_per_paper": args.candidates_per_paper,
+        "candidates_per_reviewer": args.candidates_per_reviewer,
+        "single_solve": args.single_solve,
+        "fractional_backend": args.fractional_backend,
+        "skip_deterministic_baseline": args.skip_deterministic_baseline,
+        "concurrent_baseline": args.concurrent_baseline,
+        "check_feasibility": not args.skip_feasibility_check,
+        "output_format": args.output_format,
+        "assignments_output": "{}/assignments.{}".format(
+            args.output_folder, args.output_format
+        ),
+        "alternates_output": "{}/alternates.{}".format(
+            args.output_folder, args.output_format
+        ),
+        "logger": logger,
+    }
+
+    return match_data
+
+
+def main():
+    logger.setLevel(logging.DEBUG)
+
+    log_format = (
+        "%(asctime)s %(levelname)s: [in %(pathname)s:%(lineno)d] %(message)s"
+    )
+    logging.basicConfig(filename="default.log", format=log_format)
+
+    consoleHandler = logging.StreamHandler()
+    logger.addHandler(consoleHandler)
+
+    t0 = time.time()
+    logger.info("Starting time={}".format(t0))
+
+    args = build_parser().parse_args()
+
+    profiler = Profiler(
+        enabled=args.profile,
+        cprofile_path=os.path.join(args.output_folder, "solver.prof")
+        if args.profile_solver
+        else None,
+    )
+
+    solver_class = get_solver_class(args.solver)
+    match_data = load_match_data(args, profiler)
+
+    matcher = Matcher(
+        datasource=match_data,
+        solver_class=solver_class,
+        logger=logger,
+        profiler=profiler,
+    )
+
+    matcher.run()
+    t1 = time.time()
+    logger.info("Overall execution time: {0} seconds".format(t1 - t0))
+
+    if args.profile:
+        profile_output = os.path.join(args.output_folder, "profile.json")
+        logger.info("Writing profile to {}".format(profile_output))
+        profiler.write(profile_output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Batch mode: run several matching scenarios on shared inputs.
+
+    python -m matcher.batch scenarios.json
+
+The manifest (JSON, or YAML with PyYAML installed) holds the options shared by every
+scenario and a list of named scenarios that override them. Option names are those of
+`python -m matcher`:
+
+    {
+        "options": {
+            "scores": ["scores.csv", "bids.csv"],
+            "weights": [1, 2],
+            "constraints": "constraints.csv",
+            "max_papers_default": 5,
+            "num_reviewers": 4
+        },
+        "output_folder": "batch",
+        "workers": 3,
+        "scenarios": [
+            {"name": "q55", "solver": "Randomized", "probability_limits": 0.55},
+            {"name": "bids_x3", "weights": [1, 3]},
+            {"name": "fairflow", "solver": "FairFlow", "num_reviewers": 3}
+        ]
+    }
+
+Every input file is parsed and hashed once (again only for scenarios that override an
+input path), and every distinct encoding is computed once, in this process, into a shared cache directory: the `cache_dir` option if given (so that a
+later batch reuses it), else a temporary directory. Scenarios then run in a pool of
+worker processes, which memory-map the stored matrices read-only and so share one copy
+of them through the OS page cache (point `cache_dir` at /dev/shm to keep it in RAM).
+Sparse matrices are loaded by each worker instead.
+
+Each scenario writes its outputs to `<output_folder>/<name>`, and the status, objective
+(the total aggregate score of the assignments), fraction of the optimum (Randomized
+solver) and runtime of every scenario are written to `<output_folder>/summary.csv`.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from .core import Matcher
+from .encoder import STORAGE_MANIFEST
+from .profiling import Profiler
+from .__main__ import (
+    INPUT_OPTIONS,
+    build_parser,
+    get_solver_class,
+    load_inputs,
+    load_match_data,
+)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLUMNS = [
+    "scenario",
+    "solver",
+    "status",
+    "objective",
+    "fraction_of_opt",
+    "runtime",
+]
+
+
+def read_manifest(path):
+    """Read a batch manifest from a JSON or (.yaml / .yml) YAML file."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def option_arguments(options):
+    """
+    Turn a dict of CLI options into command-line arguments: True adds a flag, False and
+    None leave the option out, and lists become several values.
+    """
+    arguments = []
+    for name, value in options.items():
+        flag = "--" + name
+        if isinstance(value, bool):
+            if value:
+                arguments.append(flag)
+        elif value is None:
+            continue
+        elif isinstance(value, (list, tuple)):
+            arguments += [flag] + [str(item) for item in value]
+        else:
+            arguments += [flag, str(value)]
+    return arguments
+
+
+def scenario_arguments(options, scenario, cache_dir, output_folder):
+    """Return the parsed CLI arguments of a scenario, overriding the shared `options`."""
+    options = dict(options)
+    options.update({name: value for name, value in scenario.items() if name != "name"})
+    if options.pop("memmap_dir", None):
+        logger.info("Ignoring memmap_dir: batch matrices are stored in the cache_dir")
+    options["cache_dir"] = cache_dir
+    options["output_folder"] = output_folder
+    return build_parser().parse_args(option_arguments(options))
+
+
+def without_edges(match_data):
+    """
+    Return a copy of `match_data` without its edges, for workers that load the encoded
+    matrices from the cache instead.
+    """
+    match_data = dict(match_data)
+    match_data.pop("logger", None)
+    match_data["constraints"] = []
+    match_data["scores_by_type"] = {
+        score_type: {key: value for key, value in scores.items() if key != "edges"}
+        for score_type, scores in match_data["scores_by_type"].items()
+    }
+    if not isinstance(match_data["probability_limits"], float):
+        match_data["probability_limits"] = []
+    return match_data
+
+
+def run_scenario(name, solver_class, match_data, storage_dir, args):
+    """Solve one scenario in a worker process and return its summary row."""
+    start_time = time.perf_counter()
+    row = {"scenario": name, "solver": solver_class}
+
+    if not os.path.exists(os.path.join(storage_dir, STORAGE_MANIFEST)):
+        # without its edges, the scenario can not be encoded again
+        row.update(status="Error", runtime=0.0)
+        logger.error("Encoded matrices of scenario {} are missing".format(name))
+        return row
+
+    profiler = Profiler(
+        enabled=args.profile,
+        cprofile_path=os.path.join(args.output_folder, "solver.prof")
+        if args.profile_solver
+        else None,
+    )
+    matcher = Matcher(
+        datasource=match_data,
+        solver_class=solver_class,
+        logger=logger,
+        profiler=profiler,
+    )
+    matcher.run()
+    if args.profile:
+        profiler.write(os.path.join(args.output_folder, "profile.json"))
+
+    row.update(status=matcher.get_status(), runtime=time.perf_counter() - start_time)
+    if matcher.assignments is not None:
+        row["objective"] = sum(
+            entry["aggregate_score"]
+            for entries in matcher.assignments.values()
+            for entry in entries
+        )
+    if "randomized_fraction_of_opt" in matcher.status_info:
+        row["fraction_of_opt"] = float(
+            matcher.status_info["randomized_fraction_of_opt"]
+        )
+    return row
+
+
+def write_summary(rows, path):
+    """Write the summary rows of a batch to `path` as CSV, with a header."""
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_batch(manifest, workers=None):
+    """
+    Run the scenarios of a batch `manifest` (see the module docstring) and return their
+    summary rows, in the order of the manifest.
+    """
+    options = manifest.get("options", {})
+    scenarios = manifest["scenarios"]
+    output_folder = manifest.get("output_folder", ".")
+    workers = workers or manifest.get("workers") or os.cpu_count()
+
+    names = [scenario["name"] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario names must be unique: {}".format(names))
+
+    cache_dir = options.get("cache_dir")
+    temporary_dir = None
+    if not cache_dir:
+        cache_dir = temporary_dir = tempfile.mkdtemp(prefix="matcher-batch-")
+
+    try:
+        rows = {}
+        jobs = []
+        edge_frames = {}
+        # load_inputs() of each distinct set of INPUT_OPTIONS
+        inputs_by_key = {}
+        for scenario in scenarios:
+            name = scenario["name"]
+            scenario_folder = os.path.join(output_folder, name)
+            os.makedirs(scenario_folder, exist_ok=True)
+            args = scenario_arguments(options, scenario, cache_dir, scenario_folder)
+            solver_class = get_solver_class(args.solver)
+
+            logger.info("Encoding scenario {}".format(name))
+            inputs_key = json.dumps(
+                [getattr(args, option) for option in INPUT_OPTIONS]
+            )
+            if inputs_key not in inputs_by_key:
+                inputs_by_key[inputs_key] = load_inputs(
+                    args, edge_frames=edge_frames
+                )
+            match_data = load_match_data(args, inputs=inputs_by_key[inputs_key])
+            try:
+                # stores the matrices in the cache, or finds them there
+                storage_dir = Matcher(
+                    datasource=match_data, solver_class=solver_class, logger=logger
+                ).encode().storage_dir
+            except Exception as error_handle:
+                logger.error("Scenario {} failed: {}".format(name, error_handle))
+                rows[name] = {
+                    "scenario": name,
+                    "solver": solver_class,
+                    "status": "Error",
+                    "runtime": 0.0,
+                }
+                continue
+
+            jobs.append(
+                (name, solver_class, without_edges(match_data), storage_dir, args)
+            )
+        del edge_frames, inputs_by_key
+
+        if jobs:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                futures = [pool.submit(run_scenario, *job) for job in jobs]
+                for future in futures:
+                    row = future.result()
+                    rows[row["scenario"]] = row
+    finally:
+        if temporary_dir:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+    rows = [rows[name] for name in names]
+    write_summary(rows, os.path.join(output_folder, "summary.csv"))
+    for row in rows:
+        logger.info(
+            "Scenario {scenario}: {status}, objective={objective}, "
+            "fraction_of_opt={fraction_of_opt}, runtime={runtime:.2f}s".format(
+                **dict({"objective": None, "fraction_of_opt": None}, **row)
+            )
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run several matching scenarios on shared inputs"
+    )
+    parser.add_argument("manifest", help="JSON or YAML file listing the scenarios")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of worker processes (default: the manifest's, or one per CPU)",
+    )
+    batch_args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s: [in %(pathname)s:%(lineno)d] %(message)s",
+    )
+    run_batch(read_manifest(batch_args.manifest), workers=batch_args.workers)
@@ -1,27 +1,65 @@
 """Contains core matcher functions and classes."""
+from collections.abc import Mapping
 import logging
 import threading
 import time
-import json
 from enum import Enum
-from .solvers import (
-    SolverException,
-    MinMaxSolver,
-    FairFlow,
-    RandomizedSolver,
-    FairSequence,
-    FairIR,
-    PerturbedMaximizationSolver
-)
+from . import solvers
+from .solvers import SolverException
+from .solvers.core import check_candidate_counts
 from .encoder import Encoder
+from .feasibility import (
+    FORCED_ASSIGNMENT_SOLVERS,
+    PROBABILITY_LIMIT_SOLVERS,
+    check_feasibility,
+)
+from .profiling import Profiler
+from .writers import write_records
+
+
+class SolverRegistry(Mapping):
+    """
+    Maps solver names to solver classes. A solver's module (and the libraries it
+    depends on) is only imported when the solver is looked up.
+    """
+
+    def __init__(self, class_names):
+        self._class_names = class_names
+
+    def __getitem__(self, name):
+        return getattr(solvers, self._class_names[name])
+
+    def __iter__(self):
+        return iter(self._class_names)
+
+    def __len__(self):
+        return len(self._class_names)
+
+
+SOLVER_MAP = SolverRegistry(
+    {
+        "MinMax": "MinMaxSolver",
+        "FairFlow": "FairFlow",
+        "Randomized": "RandomizedSolver",
+        "FairSequence": "FairSequence",
+        "FairIR": "FairIR",
+        "PerturbedMaximization": "PerturbedMaximizationSolver",
+    }
+)
 
-SOLVER_MAP = {
-    "MinMax": MinMaxSolver,
-    "FairFlow": FairFlow,
-    "Randomized": RandomizedSolver,
-    "FairSequence": FairSequence,
-    "FairIR": FairIR,
-    "PerturbedMaximization": PerturbedMaximizationSolver
+DEFAULT_SOLVER = "MinMax"
+
+# solvers that accept the scipy.sparse matrices of an Encoder built with sparse=True
+SPARSE_SOLVERS = ("MinMax", "Randomized", "FairIR")
+
+# optional solver arguments a datasource may set, and the solvers that accept them
+SOLVER_OPTIONS = {
+    "candidates_per_paper": ("MinMax", "Randomized"),
+    "candidates_per_reviewer": ("MinMax", "Randomized"),
+    "single_solve": ("MinMax", "Randomized"),
+    "fractional_backend": ("Randomized",),
+    "skip_deterministic_baseline": ("Randomized",),
+    "concurrent_baseline": ("Randomized",),
 }
 
 
@@ -62,6 +100,19 @@ class KeywordDatasource:
         bad_match_thresholds=[],
         allow_zero_score_assignments=False,
         attribute_constraints=None,
+        sparse=False,
+        memmap_dir=None,
+        compact=False,
+        cache_dir=None,
+        cache_key=None,
+        candidates_per_paper=None,
+        candidates_per_reviewer=None,
+        single_solve=False,
+        fractional_backend=None,
+        skip_deterministic_baseline=False,
+        concurrent_baseline=False,
+        check_feasibility=True,
+        output_format="json",
         assignments_output="assignments.json",
         alternates_output="alternates.json",
         logger=logging.getLogger(__name__),
@@ -82,19 +133,30 @@ class KeywordDatasource:
         self.normalization_types = []
         self.perturbation = perturbation
         self.bad_match_thresholds = bad_match_thresholds
+        self.sparse = sparse
+        self.memmap_dir = memmap_dir
+        self.compact = compact
+        self.cache_dir = cache_dir
+        self.cache_key = cache_key
+        self.candidates_per_paper = candidates_per_paper
+        self.candidates_per_reviewer = candidates_per_reviewer
+        self.single_solve = single_solve
+        self.fractional_backend = fractional_backend
+        self.skip_deterministic_baseline = skip_deterministic_baseline
+        self.concurrent_baseline = concurrent_baseline
+        self.check_feasibility = check_feasibility
+        self.output_format = output_format
         self.assignments_output = assignments_output
         self.alternates_output = alternates_output
         self.logger = logger
 
     def set_assignments(self, assignments):
         self.logger.info("Writing assignments to file")
-        with open(self.assignments_output, "w") as f:
-            f.write(json.dumps(assignments, indent=2))
+        write_records(assignments, self.assignments_output, self.output_format)
 
     def set_alternates(self, alternates):
         self.logger.info("Writing alternates to file")
-        with open(self.alternates_output, "w") as f:
-            f.write(json.dumps(alternates, indent=2))
+        write_records(alternates, self.alternates_output, self.output_format)
 
     def set_status(self, status, message, additional_status_info={}):
         self.logger.info(
@@ -113,6 +175,7 @@ class Matcher:
         solver_class,
         on_set_status=None,
         logger=logging.getLogger(__name__),
+        profiler=None,
     ):
 
         if isinstance(datasource, dict):
@@ -121,18 +184,22 @@ class Matcher:
             self.datasource = datasource
 
         self.logger = logger
+        self.profiler = profiler if profiler else Profiler(enabled=False)
         self.solution = None
         self.assignments = None
         self.alternates = None
         self.status = "Initialized"
+        self.status_info = {}
+        self.feasibility_report = None
 
-        self.solver_class = self.__set_solver_class(solver_class)
-
-    def __set_solver_class(self, solver_class):
-        return SOLVER_MAP.get(solver_class, MinMaxSolver)
+        self.solver_name = (
+            solver_class if solver_class in SOLVER_MAP else DEFAULT_SOLVER
+        )
+        self.solver_class = SOLVER_MAP[self.solver_name]
 
     def set_status(self, status, message=None, additional_status_info={}):
         self.status = status.value
+        self.status_info = additional_status_info
         self.datasource.set_status(
             status,
             message=message,
@@ -150,6 +217,85 @@ class Matcher:
         self.alternates = alternates
         self.datasource.set_alternates(alternates)
 
+    def encode(self):
+        """
+        Return an Encoder of the datasource's inputs, with the matrix options it sets.
+        Raises a MatcherError if they ask for sparse matrices the solver does not support.
+        """
+        sparse = getattr(self.datasource, "sparse", False)
+        if sparse and self.datasource.allow_zero_score_assignments:
+            self.logger.info(
+                "Zero score assignments are allowed, so every pair is a candidate. Using dense matrices"
+            )
+            sparse = False
+        if sparse and self.solver_name not in SPARSE_SOLVERS:
+            raise MatcherError(
+                "Solver {} does not support sparse matrices".format(
+                    self.solver_class.__name__
+                )
+            )
+
+        self.logger.debug("Start encoding")
+
+        return Encoder(
+            reviewers=self.datasource.reviewers,
+            papers=self.datasource.papers,
+            constraints=self.datasource.constraints,
+            scores_by_type=self.datasource.scores_by_type,
+            weight_by_type=self.datasource.weight_by_type,
+            normalization_types=self.datasource.normalization_types,
+            probability_limits=self.datasource.probability_limits,
+            attribute_constraints=self.datasource.attribute_constraints,
+            perturbation=self.datasource.perturbation,
+            bad_match_thresholds=self.datasource.bad_match_thresholds,
+            sparse=sparse,
+            memmap_dir=getattr(self.datasource, "memmap_dir", None),
+            compact=getattr(self.datasource, "compact", False),
+            cache_dir=getattr(self.datasource, "cache_dir", None),
+            cache_key=getattr(self.datasource, "cache_key", None),
+            logger=self.logger,
+        )
+
+    def solver_options(self):
+        """
+        Return the optional keyword arguments the datasource sets for the solver.
+        Raises a MatcherError if the solver does not support them, and a SolverException
+        if the numbers of candidates are not integers of at least 1.
+        """
+        check_candidate_counts(
+            getattr(self.datasource, "candidates_per_paper", None),
+            getattr(self.datasource, "candidates_per_reviewer", None),
+        )
+        options = {}
+        for name, solver_names in SOLVER_OPTIONS.items():
+            value = getattr(self.datasource, name, None)
+            if not value:
+                continue
+            if self.solver_name not in solver_names:
+                raise MatcherError(
+                    "Solver {} does not support {}".format(
+                        self.solver_class.__name__, name
+                    )
+                )
+            options[name] = value
+        return options
+
+    def check_feasibility(self, encoder):
+        """
+        Run the pre-flight feasibility check of the encoded problem, for this solver.
+        Returns a FeasibilityReport.
+        """
+        return check_feasibility(
+            encoder,
+            self.datasource.minimums,
+            self.datasource.maximums,
+            self.datasource.demands,
+            allow_zero_score_assignments=self.datasource.allow_zero_score_assignments,
+            forced_assignments=self.solver_name in FORCED_ASSIGNMENT_SOLVERS,
+            probability_limits=self.solver_name in PROBABILITY_LIMIT_SOLVERS,
+            logger=self.logger,
+        )
+
     def run(self):
         """
         Compute a match of reviewers to papers and post it to the as assignment notes.
@@ -158,39 +304,50 @@ class Matcher:
         try:
             self.set_status(MatcherStatus.RUNNING)
 
-            self.logger.debug("Start encoding")
-
-            encoder = Encoder(
-                reviewers=self.datasource.reviewers,
-                papers=self.datasource.papers,
-                constraints=self.datasource.constraints,
-                scores_by_type=self.datasource.scores_by_type,
-                weight_by_type=self.datasource.weight_by_type,
-                normalization_types=self.datasource.normalization_types,
-                probability_limits=self.datasource.probability_limits,
-                attribute_constraints=self.datasource.attribute_constraints,
-                perturbation=self.datasource.perturbation,
-                bad_match_thresholds=self.datasource.bad_match_thresholds,
-                logger=self.logger,
-            )
+            with self.profiler.stage("encode"):
+                encoder = self.encode()
+
+            # opt-in: datasources that do not set check_feasibility (e.g. the
+            # service's config note interfaces) leave the problem to the solver
+            if getattr(self.datasource, "check_feasibility", False):
+                with self.profiler.stage("check_feasibility"):
+                    self.feasibility_report = self.check_feasibility(encoder)
+                report = self.feasibility_report
+                if not report.feasible:
+                    # skip the solver: it could not find a solution either. The
+                    # message lists a few of the offending ids; the full lists are
+                    # only logged, so that no unbounded field is posted with the status
+                    self.logger.debug(str(report))
+                    self.logger.debug(
+                        "Infeasible papers={}, reviewers={}".format(
+                            report.papers, report.reviewers
+                        )
+                    )
+                    self.set_status(
+                        MatcherStatus.NO_SOLUTION, message=str(report)
+                    )
+                    return
 
             self.logger.debug("Preparing solver")
 
             # solver
-            solver = self.solver_class(
-                self.datasource.minimums,
-                self.datasource.maximums,
-                self.datasource.demands,
-                encoder,
-                allow_zero_score_assignments=self.datasource.allow_zero_score_assignments,
-                logger=self.logger,
-            )
+            with self.profiler.stage("prepare_solver"):
+                solver = self.solver_class(
+                    self.datasource.minimums,
+                    self.datasource.maximums,
+                    self.datasource.demands,
+                    encoder,
+                    allow_zero_score_assignments=self.datasource.allow_zero_score_assignments,
+                    logger=self.logger,
+                    **self.solver_options(),
+                )
 
             solution = None
             start_time = time.time()
 
             self.logger.debug("Solving solver")
-            solution = solver.solve()
+            with self.profiler.stage("solve", cprofile=True):
+                solution = solver.solve()
 
             self.logger.debug(
                 "Complete solver run took {} seconds".format(
@@ -200,26 +357,31 @@ class Matcher:
 
             if solver.solved:
                 self.solution = solution
-                self.set_assignments(encoder.decode_assignments(solution))
-                if hasattr(solver, "get_alternates"):
-                    self.set_alternates(
-                        encoder.decode_selected_alternates(
+                with self.profiler.stage("decode_assignments"):
+                    assignments = encoder.decode_assignments(solution)
+                with self.profiler.stage("write_assignments"):
+                    self.set_assignments(assignments)
+
+                with self.profiler.stage("decode_alternates"):
+                    if hasattr(solver, "get_alternates"):
+                        alternates = encoder.decode_selected_alternates(
                             solver.get_alternates(
                                 self.datasource.num_alternates
                             )
                         )
-                    )
-                else:
-                    self.set_alternates(
-                        encoder.decode_alternates(
+                    else:
+                        alternates = encoder.decode_alternates(
                             solution, self.datasource.num_alternates
                         )
-                    )
+                with self.profiler.stage("write_alternates"):
+                    self.set_alternates(alternates)
                 additional_status_info = {}
                 if hasattr(solver, "get_fraction_of_opt"):
-                    additional_status_info["randomized_fraction_of_opt"] = str(
-                        solver.get_fraction_of_opt()
-                    )
+                    fraction_of_opt = solver.get_fraction_of_opt()
+                    if fraction_of_opt is not None:
+                        additional_status_info["randomized_fraction_of_opt"] = str(
+                            fraction_of_opt
+                        )
                 self.set_status(
                     MatcherStatus.COMPLETE,
                     message="",
@@ -5,9 +5,34 @@ Responsible for:
 """
 
 from collections import defaultdict, namedtuple
+import hashlib
+import itertools
+from operator import itemgetter
 import numpy as np
+import pandas as pd
+import scipy.sparse
 import json
 import logging
+import os
+
+
+# matrices stored by an Encoder with a memmap_dir or cache_dir, as <dir>/<name>.npy
+# (dense, memory-mapped) or <dir>/<name>.npz (sparse)
+STORED_MATRICES = [
+    "aggregate_score_matrix",
+    "cost_matrix",
+    "constraint_matrix",
+    "prob_limit_matrix",
+]
+STORAGE_MANIFEST = "manifest.json"
+# number of edges hashed at a time when computing a cache key
+HASH_CHUNK_SIZE = 100000
+# number of matrix entries combined per step when filling memory-mapped matrices
+MEMMAP_BLOCK_SIZE = 2 ** 22
+
+IndexedEdges = namedtuple(
+    "IndexedEdges", ["paper_idx", "reviewer_idx", "values"]
+)
 
 
 def _score_to_cost(score, scaling_factor=100):
@@ -19,6 +44,73 @@ def _score_to_cost(score, scaling_factor=100):
     return score * -scaling_factor
 
 
+def _score_to_compact_cost(score):
+    """
+    Convert a score into an integer-valued cost, truncated toward zero as the flow
+    solvers do when they build arcs. Costs are first rounded to 4 decimals so that
+    float32 noise does not move them across an integer (e.g. a score of 0.29 must
+    give -29, not -28).
+    """
+    return np.trunc(np.round(_score_to_cost(score), 4))
+
+
+def _score_file_name(index):
+    """Name (without extension) of the stored score matrix of the `index`-th score type."""
+    return "score_{}".format(index)
+
+
+def _hash_edges(hasher, edges):
+    """Feed a list of (paper, reviewer, value) triples or an IndexedEdges to `hasher`."""
+    if isinstance(edges, IndexedEdges):
+        for column in edges:
+            column = np.asarray(column)
+            hasher.update(str(column.dtype).encode())
+            hasher.update(np.ascontiguousarray(column).tobytes())
+        return
+
+    edges = iter(edges)
+    while True:
+        chunk = list(itertools.islice(edges, HASH_CHUNK_SIZE))
+        if not chunk:
+            break
+        hasher.update("\n".join(map(repr, chunk)).encode())
+
+
+def _matrix_values(matrix, rows, cols):
+    """Return the entries of a dense or scipy.sparse matrix at (rows, cols) as a flat numpy array."""
+    return np.asarray(matrix[rows, cols]).ravel()
+
+
+def _dense_rows(matrix, rows):
+    """Return the rows in slice `rows` of a dense or scipy.sparse matrix as a dense numpy array."""
+    if scipy.sparse.issparse(matrix):
+        return scipy.sparse.csr_matrix(matrix)[rows].toarray()
+    return np.asarray(matrix[rows])
+
+
+def _edge_column(edges, position):
+    """Return one field of a list of (paper, reviewer, value) triples as an object array."""
+    return np.array(list(map(itemgetter(position), edges)), dtype=object)
+
+
+def _ids_to_indices(ids, index_by_id):
+    """
+    Map an array of IDs to their matrix indexes. The IDs are factorized in bulk, so
+    only the distinct ones are looked up; unknown IDs raise a KeyError, as a dict
+    lookup would.
+    """
+    codes, distinct_ids = pd.factorize(ids)
+    if np.any(codes < 0):
+        raise KeyError(ids[np.argmax(codes < 0)])
+    positions = pd.Index(list(index_by_id)).get_indexer(distinct_ids)
+    if np.any(positions < 0):
+        raise KeyError(distinct_ids[np.argmax(positions < 0)])
+    indices = np.fromiter(
+        index_by_id.values(), dtype=np.intp, count=len(index_by_id)
+    )
+    return indices[positions][codes]
+
+
 class EncoderError(Exception):
     """Exception wrapper class for errors related to Encoder"""
 
@@ -39,11 +131,14 @@ class Encoder:
      - `constraints`:
          a list of triples, formatted as follows:
          (<str paper_ID>, <str reviewer_ID>, <int [-1, 0, or 1]>)
+         OR an IndexedEdges of (paper indexes, reviewer indexes, constraint values) arrays
 
      - `scores_by_type`:
          a dict, keyed on string IDs representing score 'types',
-         where each value is a list of triples, formatted as follows:
+         where each value is a dict with an optional "default" score and
+         "edges", a list of triples, formatted as follows:
          (<str paper_ID>, <str reviewer_ID>, <float score>)
+         OR an IndexedEdges of (paper indexes, reviewer indexes, scores) arrays
 
     - `weight_by_type`:
          a dict, keyed on string IDs that match those in `scores_by_type`,
@@ -56,6 +151,7 @@ class Encoder:
      - `probability_limits`:
          a list of triples, formatted as follows:
          (<str paper_ID>, <str reviewer_ID>, <float limit>)
+         OR an IndexedEdges of (paper indexes, reviewer indexes, limits) arrays
          OR a float, indicating the probability limit for all reviewer-paper pairs
 
      - `perturbation`:
@@ -64,6 +160,48 @@ class Encoder:
      - `bad_match_thresholds`:
          a list of floats, representing the thresholds in affinity score for 
          categorizing a paper-reviewer match, used by the Perturbed Maximization Solver.
+
+     - `sparse`:
+         False (default) or True. If True, the score, cost, constraint and probability
+         limit matrices are stored as scipy.sparse CSR matrices holding only the known
+         (paper, reviewer) edges, so memory scales with the number of edges rather than
+         #papers x #reviewers. Scores must then default to 0, and every pair outside the
+         stored edges has a score of 0, no constraint and a probability limit of
+         `prob_limit_default`.
+
+     - `memmap_dir`:
+         None (default) or a directory path. If set, every matrix is backed by an
+         np.memmap `.npy` file in that directory, filled incrementally and then reopened
+         read-only, so the OS can page cold regions out. When the directory already
+         holds a complete encoding of the same inputs (compared by the key described
+         under `cache_dir`), it is reopened without re-encoding. Can not be combined
+         with `sparse`; see `cache_dir`.
+
+     - `compact`:
+         False (default) or True. If True, matrices use compact dtypes: int8 constraints,
+         float32 scores, aggregate scores and probability limits, and int32 costs.
+         Aggregation still runs in float64. Costs hold the integer values the flow
+         solvers use for their arcs.
+
+     - `cache_dir`:
+         None (default) or a directory path. If set, the encoded matrices and index maps
+         are stored under `<cache_dir>/<key>`, where the key is a SHA-256 hash of the
+         papers, reviewers, edges, weights, normalization types, probability limits and
+         the `sparse` and `compact` options. Dense matrices are stored as memmaps (as with
+         `memmap_dir`), sparse ones as `.npz` files. An Encoder built from identical
+         inputs loads the stored matrices instead of encoding them again.
+
+     - `cache_key`:
+         None (default) or a string identifying the constraints, score edges and
+         probability limit edges, e.g. a hash of the files they were read from. If given,
+         it is hashed in place of those edges (for `cache_dir` and `memmap_dir`), which
+         then are not read at all.
+
+     - `keep_score_matrices`:
+         False (default) or True. By default each score type is folded into the aggregate
+         score matrix as soon as it is read, and `score_matrices` is left empty, so peak
+         memory does not grow with the number of score types. If True, a matrix of
+         unweighted scores is kept in `score_matrices` for every score type.
     """
 
     def __init__(
@@ -78,9 +216,21 @@ class Encoder:
         attribute_constraints=None,
         perturbation=0.0,
         bad_match_thresholds=[],
+        sparse=False,
+        memmap_dir=None,
+        compact=False,
+        cache_dir=None,
+        cache_key=None,
+        keep_score_matrices=False,
         logger=logging.getLogger(__name__),
     ):
         self.logger = logger
+        self.sparse = sparse
+        self.compact = compact
+        self.keep_score_matrices = keep_score_matrices
+        self.score_dtype = np.float32 if compact else float
+        self.cost_dtype = np.int32 if compact else float
+        self.constraint_dtype = np.int8 if compact else int
 
         if len(reviewers) == 0:
             raise EncoderError("Reviewers List can not be empty.")
@@ -100,28 +250,6 @@ class Encoder:
 
         self.matrix_shape = (len(self.papers), len(self.reviewers))
 
-        self.logger.debug("Init score matrices")
-        self.score_matrices = {
-            score_type: self._encode_scores(scores)
-            for score_type, scores in scores_by_type.items()
-        }
-
-        with_normalization_matrices = {}
-        without_normalization_matrices = {}
-
-        self.logger.debug("Init normalization matricies")
-        for score_type, scores in self.score_matrices.items():
-            if score_type in normalization_types:
-                with_normalization_matrices[score_type] = scores
-            else:
-                without_normalization_matrices[score_type] = scores
-
-        self.logger.debug("Init conflicts")
-        self.constraint_matrix = self._encode_constraints(constraints)
-        self.prob_limit_matrix = self._encode_probability_limits(
-            probability_limits
-        )
-
         self.perturbation = perturbation
         self.bad_match_thresholds = [
             _score_to_cost(threshold) for threshold in bad_match_thresholds
@@ -151,25 +279,665 @@ class Encoder:
                 })
         self.attribute_constraints = constraints_list
 
-        # don't use numpy.sum() here. it will collapse the matrices into a single value.
-        self.aggregate_score_matrix = np.full(
-            self.matrix_shape, 0, dtype=float
+        self.prob_limit_default = (
+            probability_limits if isinstance(probability_limits, float) else 1.0
+        )
+
+        if memmap_dir is not None and self.sparse:
+            raise EncoderError(
+                "Memory-mapped matrices are dense; memmap_dir can not be combined with sparse=True"
+            )
+        if memmap_dir is not None and cache_dir is not None:
+            raise EncoderError("memmap_dir and cache_dir can not be combined")
+
+        self.memmap_dir = memmap_dir
+        self.cache_key = None
+        self.storage_dir = memmap_dir
+        if memmap_dir is not None or cache_dir is not None:
+            # recorded in the manifest, so that stored matrices are only reused for
+            # the same edges
+            self.cache_key = self._encoding_key(
+                cache_key,
+                constraints,
+                scores_by_type,
+                weight_by_type,
+                normalization_types,
+                probability_limits,
+            )
+        if cache_dir is not None:
+            self.storage_dir = os.path.join(cache_dir, self.cache_key)
+            if not self.sparse:
+                self.memmap_dir = self.storage_dir
+
+        if self.storage_dir is not None:
+            os.makedirs(self.storage_dir, exist_ok=True)
+            self.storage_manifest = {
+                "key": self.cache_key,
+                "papers": list(self.papers),
+                "reviewers": list(self.reviewers),
+                "weight_by_type": weight_by_type,
+                "normalization_types": list(normalization_types),
+                "sparse": self.sparse,
+                "compact": self.compact,
+                "score_files": {
+                    score_type: _score_file_name(i)
+                    for i, score_type in enumerate(scores_by_type)
+                }
+                if self.keep_score_matrices
+                else {},
+            }
+            if self._load_stored_matrices():
+                self.logger.info(
+                    "Reusing encoded matrices in {}".format(self.storage_dir)
+                )
+                return
+
+            # an interrupted re-encoding must not be mistaken for a complete one
+            manifest_path = os.path.join(self.storage_dir, STORAGE_MANIFEST)
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+
+        self._encode_matrices(
+            constraints,
+            scores_by_type,
+            weight_by_type,
+            normalization_types,
+            probability_limits,
+        )
+
+        if self.storage_dir is not None:
+            self._store_matrices()
+
+    def _encoding_key(
+        self,
+        cache_key,
+        constraints,
+        scores_by_type,
+        weight_by_type,
+        normalization_types,
+        probability_limits,
+    ):
+        """
+        Return a SHA-256 hex digest of everything the encoded matrices depend on.
+        The edges are only read if no `cache_key` stands in for them.
+        """
+        hasher = hashlib.sha256()
+        hasher.update(
+            json.dumps(
+                {
+                    "papers": list(self.papers),
+                    "reviewers": list(self.reviewers),
+                    "weight_by_type": weight_by_type,
+                    "normalization_types": list(normalization_types),
+                    "defaults": {
+                        score_type: scores.get("default", 0)
+                        for score_type, scores in scores_by_type.items()
+                    },
+                    "probability_limit": self.prob_limit_default,
+                    "sparse": self.sparse,
+                    "compact": self.compact,
+                    "cache_key": cache_key,
+                },
+                sort_keys=True,
+            ).encode()
+        )
+
+        if cache_key is None:
+            _hash_edges(hasher, constraints)
+            for score_type in sorted(scores_by_type):
+                hasher.update(score_type.encode())
+                _hash_edges(hasher, scores_by_type[score_type].get("edges", []))
+            if not isinstance(probability_limits, float):
+                _hash_edges(hasher, probability_limits)
+
+        return hasher.hexdigest()
+
+    def _encode_matrices(
+        self,
+        constraints,
+        scores_by_type,
+        weight_by_type,
+        normalization_types,
+        probability_limits,
+    ):
+        """
+        Build the score, aggregate score, cost, constraint and probability limit matrices.
+        """
+        self.logger.debug("Init conflicts")
+        self.constraint_matrix = self._encode_constraints(constraints)
+
+        if self.keep_score_matrices:
+            self.logger.debug("Init score matrices")
+            self.score_matrices = {
+                score_type: self._encode_scores(scores, _score_file_name(i))
+                for i, (score_type, scores) in enumerate(scores_by_type.items())
+            }
+
+            with_normalization_matrices = {}
+            without_normalization_matrices = {}
+
+            self.logger.debug("Init normalization matricies")
+            for score_type, scores in self.score_matrices.items():
+                if self.sparse:
+                    # aggregate in float64 even if the scores are stored as float32
+                    scores = scores.astype(float, copy=False)
+                if score_type in normalization_types:
+                    with_normalization_matrices[score_type] = scores
+                else:
+                    without_normalization_matrices[score_type] = scores
+
+            if not self.sparse and (self.memmap_dir is not None or self.compact):
+                self._aggregate_by_blocks(
+                    weight_by_type,
+                    with_normalization_matrices,
+                    without_normalization_matrices,
+                )
+            else:
+                # don't use numpy.sum() here. it will collapse the matrices into a single value.
+                if self.sparse:
+                    self.aggregate_score_matrix = scipy.sparse.csr_matrix(
+                        self.matrix_shape, dtype=float
+                    )
+                else:
+                    self.aggregate_score_matrix = np.full(
+                        self.matrix_shape, 0, dtype=float
+                    )
+
+                if without_normalization_matrices:
+                    self.aggregate_score_matrix = sum(
+                        [
+                            scores * weight_by_type[score_type]
+                            for score_type, scores in without_normalization_matrices.items()
+                        ]
+                    )
+
+                if with_normalization_matrices:
+                    self.aggregate_score_matrix += self._normalize(
+                        weight_by_type, with_normalization_matrices
+                    )
+
+                self._set_aggregate(self.aggregate_score_matrix)
+        else:
+            self.score_matrices = {}
+            self._accumulate_scores(
+                scores_by_type, weight_by_type, normalization_types
+            )
+
+        # probability limits are encoded last so that, in sparse mode, they can be
+        # stored over the same edges as the scores and constraints.
+        self.prob_limit_matrix = self._encode_probability_limits(
+            probability_limits
+        )
+
+    def _new_matrix(self, name, fill_value, dtype):
+        """
+        Return a matrix of `self.matrix_shape` filled with `fill_value`.
+        With a `memmap_dir` it is a writable np.memmap backed by `<memmap_dir>/<name>.npy`.
+        """
+        if self.memmap_dir is None:
+            return np.full(self.matrix_shape, fill_value, dtype=dtype)
+
+        matrix = np.lib.format.open_memmap(
+            os.path.join(self.memmap_dir, name + ".npy"),
+            mode="w+",
+            dtype=dtype,
+            shape=self.matrix_shape,
+        )
+        matrix[...] = fill_value
+        return matrix
+
+    def _row_blocks(self, num_papers=None):
+        """
+        Yield row slices covering about MEMMAP_BLOCK_SIZE matrix entries each, of all
+        the papers or of the first `num_papers` rows.
+        """
+        if num_papers is None:
+            num_papers = self.matrix_shape[0]
+        num_reviewers = self.matrix_shape[1]
+        block_rows = max(1, MEMMAP_BLOCK_SIZE // max(1, num_reviewers))
+        for start in range(0, num_papers, block_rows):
+            yield slice(start, min(start + block_rows, num_papers))
+
+    def _aggregate_by_blocks(
+        self,
+        weight_by_type,
+        with_normalization_matrices,
+        without_normalization_matrices,
+    ):
+        """
+        Fill the dense aggregate score and cost matrices a block of rows at a time, so
+        that temporaries stay a small fraction of a full matrix. Blocks are summed in
+        float64 whatever the storage dtypes.
+        """
+        self.aggregate_score_matrix = self._new_matrix(
+            "aggregate_score_matrix", 0, self.score_dtype
+        )
+        self.cost_matrix = self._new_matrix(
+            "cost_matrix", 0, self.cost_dtype
+        )
+
+        for rows in self._row_blocks():
+            aggregate = np.zeros(
+                (rows.stop - rows.start, self.matrix_shape[1]), dtype=float
+            )
+            for score_type, scores in without_normalization_matrices.items():
+                aggregate += (
+                    scores[rows].astype(float, copy=False)
+                    * weight_by_type[score_type]
+                )
+
+            if with_normalization_matrices:
+                aggregate += self._normalize(
+                    weight_by_type,
+                    {
+                        score_type: scores[rows].astype(float, copy=False)
+                        for score_type, scores in with_normalization_matrices.items()
+                    },
+                )
+
+            self._set_aggregate_block(rows, aggregate)
+
+    def _set_aggregate_block(self, rows, aggregate):
+        """Store a float64 block of aggregate scores, and its costs, at rows `rows`."""
+        self.aggregate_score_matrix[rows] = aggregate
+        self.cost_matrix[rows] = (
+            _score_to_compact_cost(aggregate)
+            if self.compact
+            else _score_to_cost(aggregate)
+        )
+
+    def _set_aggregate(self, aggregate):
+        """
+        Set the aggregate score and cost matrices from a float64 `aggregate` held in
+        memory (sparse, or dense without memmap_dir or compact dtypes).
+        """
+        if self.sparse and self.compact:
+            self.cost_matrix = aggregate.copy()
+            self.cost_matrix.data = _score_to_compact_cost(self.cost_matrix.data)
+            self.cost_matrix = self.cost_matrix.astype(self.cost_dtype)
+            self.aggregate_score_matrix = aggregate.astype(self.score_dtype)
+        else:
+            self.aggregate_score_matrix = aggregate
+            self.cost_matrix = _score_to_cost(aggregate)
+
+    def _accumulate_scores(
+        self, scores_by_type, weight_by_type, normalization_types
+    ):
+        """
+        Build the aggregate score and cost matrices without keeping a matrix per score
+        type. Each type is folded into a running weighted total as soon as it is read;
+        normalized types go into a weighted sum and a sum of weights (the normalizer's
+        denominator), which are combined at the end.
+        """
+        if self.sparse:
+            total = scipy.sparse.csr_matrix(self.matrix_shape, dtype=float)
+            numerator = scipy.sparse.csr_matrix(self.matrix_shape, dtype=float)
+            weights = scipy.sparse.csr_matrix(self.matrix_shape, dtype=float)
+            for score_type, scores in scores_by_type.items():
+                weight = weight_by_type[score_type]
+                matrix = self._encode_scores(scores).astype(float, copy=False)
+                if score_type in normalization_types:
+                    numerator = numerator + matrix * weight
+                    weights = weights + (matrix != 0) * weight
+                else:
+                    total = total + matrix * weight
+
+            if weights.nnz:
+                weights.eliminate_zeros()
+                weights.data = 1 / weights.data
+                total = total + weights.multiply(numerator).tocsr()
+
+            self._set_aggregate(total)
+            return
+
+        if self.score_dtype != float:
+            self._accumulate_by_blocks(
+                scores_by_type, weight_by_type, normalization_types
+            )
+            return
+
+        # with float64 storage the running total is the aggregate score matrix itself
+        total = self._new_matrix("aggregate_score_matrix", 0, float)
+        normalized = any(
+            score_type in normalization_types for score_type in scores_by_type
+        )
+        if normalized:
+            numerator = self._new_matrix("normalization_numerator", 0, float)
+            weights = self._new_matrix("normalization_weights", 0, float)
+
+        for score_type, scores in scores_by_type.items():
+            self.logger.debug("Accumulating scores of {}".format(score_type))
+            weight = weight_by_type[score_type]
+            default = float(scores.get("default", 0))
+            edges = self._index_edges(scores.get("edges", []), float)
+            if score_type in normalization_types:
+                self._fold(numerator, edges, edges.values, default, weight)
+                self._fold(
+                    weights, edges, edges.values != 0, default != 0, weight
+                )
+            else:
+                self._fold(total, edges, edges.values, default, weight)
+            del edges
+
+        if normalized:
+            for rows in self._row_blocks():
+                total[rows] += self._normalized_block(
+                    numerator[rows], weights[rows]
+                )
+            del numerator, weights
+            self._remove_scratch_matrix("normalization_numerator")
+            self._remove_scratch_matrix("normalization_weights")
+
+        if self.memmap_dir is None:
+            self._set_aggregate(total)
+            return
+
+        self.aggregate_score_matrix = total
+        self.cost_matrix = self._new_matrix(
+            "cost_matrix", 0, self.cost_dtype
+        )
+        for rows in self._row_blocks():
+            self._set_aggregate_block(rows, total[rows])
+
+    def _accumulate_by_blocks(
+        self, scores_by_type, weight_by_type, normalization_types
+    ):
+        """
+        Fill dense aggregate score and cost matrices of compact dtypes a block of rows
+        at a time. The edges of every score type are indexed once and grouped by
+        paper, then each block is summed in float64 from the edges in its rows, so no
+        float64 matrix bigger than a block is allocated.
+        """
+        num_papers, num_reviewers = self.matrix_shape
+        folds = []
+        for score_type, scores in scores_by_type.items():
+            self.logger.debug("Indexing scores of {}".format(score_type))
+            # the same values a score matrix of self.score_dtype would hold
+            default = float(
+                np.asarray(scores.get("default", 0), dtype=self.score_dtype)
+            )
+            # indexed edges are kept as given, and rounded to self.score_dtype a
+            # block at a time
+            edges = self._index_edges(scores.get("edges", []), float)
+            reviewer_idx, values = edges.reviewer_idx, edges.values
+            if np.any(edges.paper_idx[1:] < edges.paper_idx[:-1]):
+                # a stable sort keeps the last of repeated coordinates winning;
+                # the sorted copies can't share the caller's arrays, so are narrowed
+                order = np.argsort(edges.paper_idx, kind="stable")
+                reviewer_idx = reviewer_idx.astype(np.int32)[order]
+                values = values.astype(self.score_dtype)[order]
+                del order
+            row_counts = np.bincount(edges.paper_idx, minlength=num_papers)
+            folds.append(
+                (
+                    score_type in normalization_types,
+                    weight_by_type[score_type],
+                    default,
+                    np.concatenate([[0], np.cumsum(row_counts)]),
+                    reviewer_idx,
+                    values,
+                )
+            )
+            del edges, reviewer_idx, values
+
+        normalized = any(fold[0] for fold in folds)
+        self.aggregate_score_matrix = self._new_matrix(
+            "aggregate_score_matrix", 0, self.score_dtype
+        )
+        self.cost_matrix = self._new_matrix(
+            "cost_matrix", 0, self.cost_dtype
+        )
+        for rows in self._row_blocks():
+            block_shape = (rows.stop - rows.start, num_reviewers)
+            total = np.zeros(block_shape, dtype=float)
+            if normalized:
+                numerator = np.zeros(block_shape, dtype=float)
+                weights = np.zeros(block_shape, dtype=float)
+
+            for fold in folds:
+                (
+                    is_normalized,
+                    weight,
+                    default,
+                    row_offsets,
+                    reviewer_idx,
+                    values,
+                ) = fold
+                start, stop = row_offsets[rows.start], row_offsets[rows.stop]
+                edges = IndexedEdges(
+                    np.repeat(
+                        np.arange(block_shape[0]),
+                        np.diff(row_offsets[rows.start : rows.stop + 1]),
+                    ),
+                    reviewer_idx[start:stop],
+                    values[start:stop]
+                    .astype(self.score_dtype)
+                    .astype(float),
+                )
+                if is_normalized:
+                    self._fold(numerator, edges, edges.values, default, weight)
+                    self._fold(
+                        weights,
+                        edges,
+                        edges.values != 0,
+                        default != 0,
+                        weight,
+                    )
+                else:
+                    self._fold(total, edges, edges.values, default, weight)
+
+            if normalized:
+                total += self._normalized_block(numerator, weights)
+            self._set_aggregate_block(rows, total)
+
+    def _normalized_block(self, numerator, weights):
+        """Return `numerator` divided by `weights`, with 0 wherever `weights` is 0."""
+        with np.errstate(divide="ignore"):
+            return np.where(weights == 0, 0, 1 / weights) * numerator
+
+    def _fold(self, matrix, edges, values, default, weight):
+        """
+        Add `weight` times a score matrix, given as its `default` and its `values` at
+        the coordinates of `edges`, to `matrix` in place. As with `_scatter`, the last
+        value of a repeated coordinate wins.
+        """
+        previous = matrix[edges.paper_idx, edges.reviewer_idx]
+        if default:
+            for block in self._row_blocks(len(matrix)):
+                matrix[block] += default * weight
+        previous += np.multiply(values, weight)
+        matrix[edges.paper_idx, edges.reviewer_idx] = previous
+
+    def _remove_scratch_matrix(self, name):
+        """Delete the file behind a temporary matrix made by `_new_matrix`, if any."""
+        if self.memmap_dir is not None:
+            os.remove(os.path.join(self.memmap_dir, name + ".npy"))
+
+    def _stored_matrices(self):
+        """Return the encoded matrices, keyed on their stored file name (without extension)."""
+        matrices = {name: getattr(self, name) for name in STORED_MATRICES}
+        for score_type, file_name in self.storage_manifest["score_files"].items():
+            matrices[file_name] = self.score_matrices[score_type]
+        return matrices
+
+    def _store_matrices(self):
+        """
+        Save (sparse) or flush (memory-mapped) the freshly encoded matrices, then record
+        them in the manifest. Memory-mapped matrices are reopened read-only, so solvers
+        share the OS page cache instead of private copies.
+        """
+        for name, matrix in self._stored_matrices().items():
+            if self.sparse:
+                scipy.sparse.save_npz(
+                    os.path.join(self.storage_dir, name + ".npz"),
+                    scipy.sparse.csr_matrix(matrix),
+                )
+            else:
+                matrix.flush()
+
+        # the manifest is written last: a directory without one holds an unfinished encoding
+        with open(os.path.join(self.storage_dir, STORAGE_MANIFEST), "w") as f:
+            json.dump(self.storage_manifest, f)
+
+        if not self.sparse:
+            self._load_stored_matrices()
+
+    def _load_stored_matrices(self):
+        """
+        Load the matrices in `storage_dir`: dense ones are opened as read-only memmaps.
+
+        Returns False, without touching the Encoder, if the directory does not hold a
+        complete encoding of the same papers, reviewers, score types, weights and edges
+        (by their encoding key).
+        """
+        manifest_path = os.path.join(self.storage_dir, STORAGE_MANIFEST)
+        if not os.path.exists(manifest_path):
+            return False
+
+        with open(manifest_path) as f:
+            if json.load(f) != self.storage_manifest:
+                self.logger.info(
+                    "Matrices in {} were encoded from different inputs, re-encoding".format(
+                        self.storage_dir
+                    )
+                )
+                return False
+
+        def _load(name):
+            path = os.path.join(self.storage_dir, name)
+            if self.sparse:
+                return scipy.sparse.load_npz(path + ".npz").tocsr()
+            return np.load(path + ".npy", mmap_mode="r")
+
+        self.score_matrices = {
+            score_type: _load(file_name)
+            for score_type, file_name in self.storage_manifest["score_files"].items()
+        }
+        for name in STORED_MATRICES:
+            setattr(self, name, _load(name))
+
+        return True
+
+    @classmethod
+    def from_indexed_edges(
+        cls,
+        reviewers,
+        papers,
+        constraints,
+        scores_by_type,
+        weight_by_type,
+        probability_limits=[],
+        **kwargs
+    ):
+        """
+        Alternate constructor for callers that have already mapped IDs to matrix indexes.
+
+        `constraints`, the "edges" of every entry in `scores_by_type` and, unless it is a
+        float, `probability_limits` are each given as a triple of equal-length arrays:
+        (<int paper indexes>, <int reviewer indexes>, <values>), where the indexes refer
+        to positions in `papers` and `reviewers`. No (ID, ID, value) tuples are built.
+
+        All other keyword arguments are passed through to the Encoder.
+        """
+
+        def _indexed(edges):
+            if isinstance(edges, IndexedEdges):
+                return edges
+            if len(edges) == 0:
+                return IndexedEdges([], [], [])
+            return IndexedEdges(*edges)
+
+        if not isinstance(probability_limits, float):
+            probability_limits = _indexed(probability_limits)
+
+        return cls(
+            reviewers,
+            papers,
+            _indexed(constraints),
+            {
+                score_type: dict(
+                    scores, edges=_indexed(scores.get("edges", []))
+                )
+                for score_type, scores in scores_by_type.items()
+            },
+            weight_by_type,
+            probability_limits=probability_limits,
+            **kwargs
         )
 
-        if without_normalization_matrices:
-            self.aggregate_score_matrix = sum(
-                [
-                    scores * weight_by_type[score_type]
-                    for score_type, scores in without_normalization_matrices.items()
-                ]
+    def _index_edges(self, edges, dtype):
+        """
+        Return `edges` as an IndexedEdges of NumPy arrays.
+
+        Edges given as (<str paper_ID>, <str reviewer_ID>, <value>) triples are split
+        into columns and their IDs are translated to matrix indexes in bulk.
+        """
+        if isinstance(edges, IndexedEdges):
+            paper_idx = np.asarray(edges.paper_idx, dtype=np.intp)
+            reviewer_idx = np.asarray(edges.reviewer_idx, dtype=np.intp)
+            values = np.asarray(edges.values, dtype=dtype)
+        elif len(edges) == 0:
+            paper_idx = reviewer_idx = np.empty(0, dtype=np.intp)
+            values = np.empty(0, dtype=dtype)
+        else:
+            paper_idx = _ids_to_indices(
+                _edge_column(edges, 0), self.index_by_forum
+            )
+            reviewer_idx = _ids_to_indices(
+                _edge_column(edges, 1), self.index_by_user
             )
+            values = _edge_column(edges, 2).astype(dtype)
 
-        if with_normalization_matrices:
-            self.aggregate_score_matrix += self._normalize(
-                weight_by_type, with_normalization_matrices
+        if not len(paper_idx) == len(reviewer_idx) == len(values):
+            raise EncoderError(
+                "paper indexes ({}), reviewer indexes ({}) and values ({}) must have the same length".format(
+                    len(paper_idx), len(reviewer_idx), len(values)
+                )
             )
 
-        self.cost_matrix = _score_to_cost(self.aggregate_score_matrix)
+        return IndexedEdges(paper_idx, reviewer_idx, values)
+
+    def _scatter(self, matrix, edges):
+        """Write edge values into `matrix` with a single fancy-indexed assignment."""
+        edges = self._index_edges(edges, matrix.dtype)
+        matrix[edges.paper_idx, edges.reviewer_idx] = edges.values
+        return matrix
+
+    def _linear_to_csr(self, linear_indices, values):
+        """
+        Build a CSR matrix from sorted, unique flat (row-major) indices.
+
+        Unlike scipy's COO conversion this keeps explicit zeros, which matters for
+        probability limits of 0.
+        """
+        rows, cols = np.divmod(linear_indices, self.matrix_shape[1])
+        indptr = np.zeros(self.matrix_shape[0] + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(rows, minlength=self.matrix_shape[0]), out=indptr[1:]
+        )
+        return scipy.sparse.csr_matrix(
+            (values, cols, indptr), shape=self.matrix_shape
+        )
+
+    def _sparse_edges(self, edges, dtype):
+        """
+        Return (flat indices, values) for `edges`, sorted by flat index.
+        If a coordinate appears more than once the last value wins, as in dense mode.
+        """
+        edges = self._index_edges(edges, dtype)
+        linear_indices = np.ravel_multi_index(
+            (edges.paper_idx, edges.reviewer_idx), self.matrix_shape
+        )
+        linear_indices, last = np.unique(
+            linear_indices[::-1], return_index=True
+        )
+        return linear_indices, edges.values[::-1][last]
+
+    def _encode_sparse(self, edges, dtype):
+        """return a CSR matrix holding the non-zero values of `edges`."""
+        matrix = self._linear_to_csr(*self._sparse_edges(edges, dtype))
+        matrix.eliminate_zeros()
+        return matrix
 
     def _normalize(self, weight_by_type, with_normalization_matrices):
 
@@ -183,6 +951,19 @@ class Encoder:
                 for score_type, indicator in indicator.items()
             ]
         )
+        if scipy.sparse.issparse(sum_of_weights):
+            normalizer = scipy.sparse.csr_matrix(sum_of_weights, dtype=float)
+            normalizer.eliminate_zeros()
+            normalizer.data = 1 / normalizer.data
+            return normalizer.multiply(
+                sum(
+                    [
+                        scores * weight_by_type[score_type]
+                        for score_type, scores in with_normalization_matrices.items()
+                    ]
+                )
+            ).tocsr()
+
         normalizer = np.where(sum_of_weights == 0, 0, 1 / sum_of_weights)
 
         return normalizer * sum(
@@ -192,55 +973,84 @@ class Encoder:
             ]
         )
 
-    def _encode_scores(self, scores):
+    def _encode_scores(self, scores, file_name=None):
         """return a matrix containing unweighted scores."""
         default = scores.get("default", 0)
         edges = scores.get("edges", [])
-        score_matrix = np.full(self.matrix_shape, default, dtype=float)
+        if self.sparse:
+            if default != 0:
+                raise EncoderError(
+                    "Sparse encoding requires a default score of 0, got {}".format(
+                        default
+                    )
+                )
+            return self._encode_sparse(edges, self.score_dtype)
 
-        for forum, user, score in edges:
-            coordinates = (
-                self.index_by_forum[forum],
-                self.index_by_user[user],
-            )
-            score_matrix[coordinates] = score
+        score_matrix = self._new_matrix(file_name, default, self.score_dtype)
 
-        return score_matrix
+        return self._scatter(score_matrix, edges)
 
     def _encode_constraints(self, constraints):
         """
         return a matrix containing constraint values. label should have no bearing on the outcome.
         """
-        constraint_matrix = np.full(self.matrix_shape, 0, dtype=int)
-        for forum, user, constraint in constraints:
-            coordinates = (
-                self.index_by_forum[forum],
-                self.index_by_user[user],
-            )
-            constraint_matrix[coordinates] = constraint
+        if self.sparse:
+            return self._encode_sparse(constraints, self.constraint_dtype)
 
-        return constraint_matrix
+        constraint_matrix = self._new_matrix(
+            "constraint_matrix", 0, self.constraint_dtype
+        )
+
+        return self._scatter(constraint_matrix, constraints)
 
     def _encode_probability_limits(self, probability_limits):
         """
         return a matrix containing probability limits
         """
+        if self.sparse:
+            return self._encode_sparse_probability_limits(probability_limits)
+
         if isinstance(probability_limits, float):
-            prob_limit_matrix = np.full(
-                self.matrix_shape, probability_limits, dtype=float
+            prob_limit_matrix = self._new_matrix(
+                "prob_limit_matrix", probability_limits, self.score_dtype
             )
-        else:  # list of tuples
-            prob_limit_matrix = np.full(
-                self.matrix_shape, 1, dtype=float
+        else:  # list of tuples or IndexedEdges
+            prob_limit_matrix = self._new_matrix(
+                "prob_limit_matrix", 1, self.score_dtype
             )  # default to no limit
-            for forum, user, limit in probability_limits:
-                coordinates = (
-                    self.index_by_forum[forum],
-                    self.index_by_user[user],
-                )
-                prob_limit_matrix[coordinates] = limit
+            self._scatter(prob_limit_matrix, probability_limits)
         return prob_limit_matrix
 
+    def _encode_sparse_probability_limits(self, probability_limits):
+        """
+        return a CSR matrix of probability limits over every pair with a known score
+        or a constraint. Limits of 0 are kept as explicit entries; pairs outside the
+        stored edges take `self.prob_limit_default`.
+        """
+        support = np.union1d(
+            np.ravel_multi_index(
+                self.aggregate_score_matrix.nonzero(), self.matrix_shape
+            ),
+            np.ravel_multi_index(
+                self.constraint_matrix.nonzero(), self.matrix_shape
+            ),
+        )
+        if isinstance(probability_limits, float):
+            return self._linear_to_csr(
+                support,
+                np.full(len(support), probability_limits, dtype=self.score_dtype),
+            )
+
+        limit_indices, limits = self._sparse_edges(
+            probability_limits, self.score_dtype
+        )
+        support = np.union1d(support, limit_indices)
+        values = np.full(
+            len(support), self.prob_limit_default, dtype=self.score_dtype
+        )
+        values[np.searchsorted(support, limit_indices)] = limits
+        return self._linear_to_csr(support, values)
+
     def decode_assignments(self, flow_matrix):
         """
         Return a dictionary, keyed on forum IDs, with lists containing dicts
@@ -248,20 +1058,28 @@ class Encoder:
         """
         assignments_by_forum = defaultdict(list)
 
-        for paper_index, paper_flows in enumerate(flow_matrix):
-            paper_id = self.papers[paper_index]
-            for reviewer_index, flow in enumerate(paper_flows):
-                reviewer = self.reviewers[reviewer_index]
-
-                if flow:
-                    coordinates = (paper_index, reviewer_index)
-                    paper_user_entry = {
-                        "aggregate_score": self.aggregate_score_matrix[
-                            coordinates
-                        ],
-                        "user": reviewer,
-                    }
-                    assignments_by_forum[paper_id].append(paper_user_entry)
+        if scipy.sparse.issparse(flow_matrix):
+            paper_indices, reviewer_indices = flow_matrix.nonzero()
+            order = np.lexsort((reviewer_indices, paper_indices))
+            paper_indices = paper_indices[order]
+            reviewer_indices = reviewer_indices[order]
+        else:
+            paper_indices, reviewer_indices = np.nonzero(flow_matrix)
+
+        scores = _matrix_values(
+            self.aggregate_score_matrix, paper_indices, reviewer_indices
+        )
+
+        for paper_index, reviewer_index, score in zip(
+            paper_indices.tolist(), reviewer_indices.tolist(), scores.tolist()
+        ):
+            paper_user_entry = {
+                "aggregate_score": score,
+                "user": self.reviewers[reviewer_index],
+            }
+            assignments_by_forum[self.papers[paper_index]].append(
+                paper_user_entry
+            )
 
         return dict(assignments_by_forum)
 
@@ -270,31 +1088,61 @@ class Encoder:
         Return a dictionary, keyed on forum IDs, with lists containing dicts
         representing alternate suggested users.
 
+        Alternates are the `num_alternates` unassigned reviewers with the highest
+        aggregate scores, ties going to the lower reviewer index. They are selected
+        with a per-row argpartition over blocks of papers, so no full sort is done.
         """
-        alternates_by_forum = {}
+        alternates_by_forum = {
+            self.papers[paper_index]: []
+            for paper_index in range(np.shape(flow_matrix)[0])
+        }
 
-        for paper_index, paper_flows in enumerate(flow_matrix):
-            paper_id = self.papers[paper_index]
-            unassigned = []
-            for reviewer_index, flow in enumerate(paper_flows):
-                reviewer = self.reviewers[reviewer_index]
-
-                # alternates must not be assigned
-                if not flow:
-                    coordinates = (paper_index, reviewer_index)
-                    paper_user_entry = {
-                        "aggregate_score": self.aggregate_score_matrix[
-                            coordinates
-                        ],
-                        "user": reviewer,
-                    }
-                    unassigned.append(paper_user_entry)
+        num_reviewers = np.shape(flow_matrix)[1]
+        num_alternates = min(num_alternates, num_reviewers)
+        if num_alternates <= 0:
+            return alternates_by_forum
 
-            unassigned.sort(
-                key=lambda entry: entry["aggregate_score"], reverse=True
+        for rows in self._row_blocks():
+            # alternates must not be assigned
+            unassigned = _dense_rows(flow_matrix, rows) == 0
+            scores = _dense_rows(self.aggregate_score_matrix, rows).astype(
+                float
             )
+            scores[~unassigned] = -np.inf
 
-            alternates_by_forum[paper_id] = unassigned[:num_alternates]
+            # the num_alternates-th best score of each paper; every candidate is at least as good
+            threshold = -np.partition(-scores, num_alternates - 1, axis=1)[
+                :, num_alternates - 1
+            ]
+            paper_indices, reviewer_indices = np.nonzero(
+                unassigned & (scores >= threshold[:, np.newaxis])
+            )
+            candidate_scores = scores[paper_indices, reviewer_indices]
+
+            # sort by paper, best score first, then reviewer index, and keep the first
+            # num_alternates of each paper (there are more only if scores are tied)
+            order = np.lexsort(
+                (reviewer_indices, -candidate_scores, paper_indices)
+            )
+            paper_indices = paper_indices[order]
+            reviewer_indices = reviewer_indices[order]
+            candidate_scores = candidate_scores[order]
+            rank = np.arange(len(paper_indices)) - np.searchsorted(
+                paper_indices, paper_indices
+            )
+            keep = rank < num_alternates
+
+            for paper_index, reviewer_index, score in zip(
+                (paper_indices[keep] + rows.start).tolist(),
+                reviewer_indices[keep].tolist(),
+                candidate_scores[keep].tolist(),
+            ):
+                alternates_by_forum[self.papers[paper_index]].append(
+                    {
+                        "aggregate_score": score,
+                        "user": self.reviewers[reviewer_index],
+                    }
+                )
 
         return alternates_by_forum
 
@@ -308,15 +1156,18 @@ class Encoder:
         alternates_by_forum = {}
         for paper_index, reviewer_indices in alternates_by_index.items():
             paper_id = self.papers[paper_index]
-            reviewer_list = []
-            for reviewer_index in reviewer_indices:
-                reviewer_id = self.reviewers[reviewer_index]
-                entry = {
-                    "aggregate_score": self.aggregate_score_matrix[
-                        (paper_index, reviewer_index)
-                    ],
-                    "user": reviewer_id,
+            scores = _matrix_values(
+                self.aggregate_score_matrix,
+                np.full(len(reviewer_indices), paper_index, dtype=np.intp),
+                np.asarray(reviewer_indices, dtype=np.intp),
+            )
+            alternates_by_forum[paper_id] = [
+                {
+                    "aggregate_score": score,
+                    "user": self.reviewers[reviewer_index],
                 }
-                reviewer_list.append(entry)
-            alternates_by_forum[paper_id] = reviewer_list
+                for reviewer_index, score in zip(
+                    reviewer_indices, scores.tolist()
+                )
+            ]
         return alternates_by_forum
@@ -0,0 +1,333 @@
+"""
+Pre-flight feasibility check of a matching problem, run before any solver.
+
+Infeasible problems are otherwise only found after a full solve. `check_feasibility`
+checks necessary conditions for an assignment to exist, from the cheapest to the most
+expensive, and reports the papers and reviewers that violate them:
+
+1. the total demand lies between the total minimum and maximum reviewer loads;
+2. with hard forced assignments (FairIR), no reviewer is forced on more papers than
+   their maximum, and no paper gets more forced reviewers than its demand;
+3. every paper has enough available reviewers to meet its demand, and every reviewer
+   enough available papers to meet their minimum;
+4. a unit-capacity max-flow from the reviewers to the papers meets every demand (and,
+   separately, every minimum). A shortfall is a violation of Hall's condition: the
+   minimum cut gives a set of papers whose candidate reviewers cannot cover them all
+   (or of reviewers who cannot all reach their minimum).
+
+A pair is available to a reviewer unless it is a conflict (constraint < 0), or has a
+zero score while zero score assignments are not allowed; forced pairs (constraint == 1)
+always are. Every solver leaves out at least these pairs, so the check never rejects a
+problem a solver could solve. It may pass problems that are still infeasible.
+
+With probability limits (Randomized, PerturbedMaximization), each pair can carry at
+most its limit of a review, so the capacities are scaled like the solver's LP.
+"""
+
+import logging
+
+import numpy as np
+from scipy import sparse
+
+from .solvers.core import densify, matrix_values
+
+# solvers that must honour forced (constraint == 1) assignments
+FORCED_ASSIGNMENT_SOLVERS = ("FairIR",)
+
+# solvers whose (fractional) assignments are capped by the probability limits
+PROBABILITY_LIMIT_SOLVERS = ("Randomized", "PerturbedMaximization")
+
+# precision of fractional capacities, as in the Randomized solver's LP
+PROBABILITY_SCALE = 100000
+
+# number of matrix entries scanned at a time when collecting the available pairs
+PAIR_BLOCK_SIZE = 2 ** 22
+
+# number of ids listed in a problem message
+MAX_LISTED_IDS = 10
+
+
+def _list_ids(ids):
+    """Return `ids` as a comma-separated string, shortened to MAX_LISTED_IDS."""
+    ids = list(ids)
+    listed = ", ".join(str(id) for id in ids[:MAX_LISTED_IDS])
+    if len(ids) > MAX_LISTED_IDS:
+        listed += " and {} more".format(len(ids) - MAX_LISTED_IDS)
+    return listed
+
+
+class FeasibilityReport:
+    """
+    The outcome of `check_feasibility`.
+
+    - `problems`: a message for every violated condition; empty if none was found.
+    - `papers` & `reviewers`: the ids of the papers and reviewers involved in them.
+    """
+
+    def __init__(self):
+        self.problems = []
+        self.papers = []
+        self.reviewers = []
+
+    @property
+    def feasible(self):
+        return not self.problems
+
+    def add(self, message, papers=(), reviewers=()):
+        """Record a violated condition and the papers and reviewers involved."""
+        self.problems.append(message)
+        self.papers = list(dict.fromkeys(self.papers + list(papers)))
+        self.reviewers = list(dict.fromkeys(self.reviewers + list(reviewers)))
+
+    def __str__(self):
+        if self.feasible:
+            return "No infeasibility found"
+        return "Infeasible problem: " + " ".join(self.problems)
+
+
+def _available_pairs(encoder, allow_zero_score_assignments, probability_limits):
+    """
+    Return the (paper indices, reviewer indices, capacities, known, forced) of the
+    available pairs of the encoded problem, where `known` marks unconstrained pairs with
+    a non-zero score. Capacities are 1, or the scaled probability limits.
+    """
+    scores = encoder.aggregate_score_matrix
+    constraints = encoder.constraint_matrix
+    limits = encoder.prob_limit_matrix if probability_limits else None
+
+    if sparse.issparse(scores) or sparse.issparse(constraints):
+        if not scores.count_nonzero():
+            # the solvers fall back to random scores: every pair is a candidate
+            scores = densify(scores)
+            constraints = densify(constraints)
+            if limits is not None:
+                limits = densify(limits, getattr(encoder, "prob_limit_default", 1.0))
+            allow_zero_score_assignments = True
+    elif not scores.any():
+        allow_zero_score_assignments = True
+
+    if sparse.issparse(scores) or sparse.issparse(constraints):
+        candidates = abs(sparse.csr_matrix(scores)) + abs(
+            sparse.csr_matrix(constraints)
+        )
+        paper_indices, reviewer_indices = candidates.nonzero()
+        pair_scores = matrix_values(scores, paper_indices, reviewer_indices)
+        pair_constraints = matrix_values(constraints, paper_indices, reviewer_indices)
+        forced = pair_constraints == 1
+        known = (pair_constraints == 0) & (pair_scores != 0)
+        keep = known | forced
+        if limits is None:
+            capacities = np.ones(np.count_nonzero(keep), dtype=np.int64)
+        else:
+            capacities = np.rint(
+                matrix_values(limits, paper_indices[keep], reviewer_indices[keep])
+                * PROBABILITY_SCALE
+            ).astype(np.int64)
+        return (
+            paper_indices[keep],
+            reviewer_indices[keep],
+            capacities,
+            known[keep],
+            forced[keep],
+        )
+
+    num_papers, num_reviewers = np.shape(scores)
+    block_size = max(1, PAIR_BLOCK_SIZE // max(1, num_reviewers))
+    blocks = []
+    for start in range(0, num_papers, block_size):
+        rows = slice(start, start + block_size)
+        block_scores = np.asarray(scores[rows])
+        block_constraints = np.asarray(constraints[rows])
+        forced = block_constraints == 1
+        known = block_constraints == 0
+        if not allow_zero_score_assignments:
+            known &= block_scores != 0
+        paper_offsets, reviewer_indices = np.nonzero(known | forced)
+        if limits is None:
+            capacities = np.ones(len(paper_offsets), dtype=np.int64)
+        else:
+            capacities = np.rint(
+                np.asarray(limits[rows])[paper_offsets, reviewer_indices]
+                * PROBABILITY_SCALE
+            ).astype(np.int64)
+        blocks.append(
+            (
+                paper_offsets + start,
+                reviewer_indices,
+                capacities,
+                known[paper_offsets, reviewer_indices],
+                forced[paper_offsets, reviewer_indices],
+            )
+        )
+    return tuple(np.concatenate(arrays) for arrays in zip(*blocks))
+
+
+def check_feasibility(
+    encoder,
+    minimums,
+    maximums,
+    demands,
+    allow_zero_score_assignments=False,
+    forced_assignments=False,
+    probability_limits=False,
+    logger=logging.getLogger(__name__),
+):
+    """
+    Check necessary conditions for an assignment of the `encoder`'s problem to exist
+    (see the module docstring) and return a FeasibilityReport.
+
+    - `forced_assignments`: forced pairs must be assigned (FORCED_ASSIGNMENT_SOLVERS).
+    - `probability_limits`: pairs are capped by the encoder's probability limits
+      (PROBABILITY_LIMIT_SOLVERS).
+    """
+    report = FeasibilityReport()
+    papers = np.asarray(encoder.papers, dtype=object)
+    reviewers = np.asarray(encoder.reviewers, dtype=object)
+    num_papers, num_reviewers = len(papers), len(reviewers)
+    maximums = np.asarray(maximums, dtype=np.int64)
+    demands = np.asarray(demands, dtype=np.int64)
+    minimums = np.array(minimums, dtype=np.int64)
+
+    (
+        paper_indices,
+        reviewer_indices,
+        capacities,
+        known,
+        forced,
+    ) = _available_pairs(encoder, allow_zero_score_assignments, probability_limits)
+    logger.debug("Checking feasibility over {} available pairs".format(len(capacities)))
+
+    if not allow_zero_score_assignments:
+        # as in the solvers, reviewers with no known affinity need not meet a minimum
+        minimums[np.bincount(reviewer_indices[known], minlength=num_reviewers) == 0] = 0
+
+    # 1. total loads
+    demand = demands.sum()
+    if not minimums.sum() <= demand <= maximums.sum():
+        report.add(
+            "The total demand ({}) must be between the total minimum ({}) and maximum "
+            "({}) reviewer loads.".format(demand, minimums.sum(), maximums.sum())
+        )
+
+    # 2. forced assignments
+    if forced_assignments and forced.any():
+        forced_loads = np.bincount(reviewer_indices[forced], minlength=num_reviewers)
+        overloaded = np.flatnonzero(forced_loads > maximums)
+        if len(overloaded):
+            report.add(
+                "{} reviewers are forced on more papers than their maximum: {}.".format(
+                    len(overloaded), _list_ids(reviewers[overloaded])
+                ),
+                reviewers=reviewers[overloaded],
+            )
+        forced_coverage = np.bincount(paper_indices[forced], minlength=num_papers)
+        overcovered = np.flatnonzero(forced_coverage > demands)
+        if len(overcovered):
+            report.add(
+                "{} papers have more forced reviewers than their demand: {}.".format(
+                    len(overcovered), _list_ids(papers[overcovered])
+                ),
+                papers=papers[overcovered],
+            )
+
+    # 3. available reviewers per paper and papers per reviewer
+    scale = PROBABILITY_SCALE if probability_limits else 1
+    paper_capacities = np.bincount(
+        paper_indices, weights=capacities, minlength=num_papers
+    )
+    uncovered = np.flatnonzero(paper_capacities < demands * scale)
+    if len(uncovered):
+        report.add(
+            "{} papers have fewer available (unconflicted, known score) reviewers than "
+            "their demand: {}.".format(len(uncovered), _list_ids(papers[uncovered])),
+            papers=papers[uncovered],
+        )
+    reviewer_capacities = np.bincount(
+        reviewer_indices, weights=capacities, minlength=num_reviewers
+    )
+    underloaded = np.flatnonzero(reviewer_capacities < minimums * scale)
+    if len(underloaded):
+        report.add(
+            "{} reviewers have fewer available (unconflicted, known score) papers than "
+            "their minimum: {}.".format(
+                len(underloaded), _list_ids(reviewers[underloaded])
+            ),
+            reviewers=reviewers[underloaded],
+        )
+
+    if not report.feasible:
+        return report
+
+    # 4. max-flows from the reviewers to the papers
+    from ortools.graph.python import max_flow
+
+    source, sink = 0, num_reviewers + num_papers + 1
+    first_reviewer, first_paper = 1, num_reviewers + 1
+    tails = np.concatenate(
+        [
+            np.zeros(num_reviewers),
+            first_reviewer + reviewer_indices,
+            first_paper + np.arange(num_papers),
+        ]
+    ).astype(np.int32)
+    heads = np.concatenate(
+        [
+            first_reviewer + np.arange(num_reviewers),
+            first_paper + paper_indices,
+            np.full(num_papers, sink),
+        ]
+    ).astype(np.int32)
+    flow = max_flow.SimpleMaxFlow()
+    flow.add_arcs_with_capacity(
+        tails,
+        heads,
+        np.concatenate([maximums * scale, capacities, demands * scale]).astype(
+            np.int64
+        ),
+    )
+    source_arcs = np.arange(num_reviewers, dtype=np.int32)
+
+    if flow.solve(source, sink) != flow.OPTIMAL:
+        logger.debug("Max-flow of the feasibility check failed")
+        return report
+    if flow.optimal_flow() < demand * scale:
+        # the sink side of the smallest minimum cut holds papers that their candidate
+        # reviewers cannot cover (Hall's condition)
+        sink_side = np.asarray(flow.get_sink_side_min_cut())
+        blocked = sink_side[(sink_side >= first_paper) & (sink_side < sink)]
+        blocked = blocked - first_paper
+        report.add(
+            "The demands of {} papers cannot be met together: their available "
+            "reviewers can give at most {:g} of their {} reviews within their maximum "
+            "loads: {}.".format(
+                len(blocked),
+                (demands[blocked].sum() * scale - (demand * scale - flow.optimal_flow()))
+                / scale,
+                demands[blocked].sum(),
+                _list_ids(papers[blocked]),
+            ),
+            papers=papers[blocked],
+        )
+
+    if minimums.any():
+        flow.set_arcs_capacity(source_arcs, (minimums * scale).astype(np.int64))
+        if (
+            flow.solve(source, sink) == flow.OPTIMAL
+            and flow.optimal_flow() < minimums.sum() * scale
+        ):
+            # the source side of the smallest minimum cut holds reviewers that cannot
+            # all reach their minimum loads within the papers' demands
+            source_side = np.asarray(flow.get_source_side_min_cut())
+            stuck = source_side[
+                (source_side >= first_reviewer) & (source_side < first_paper)
+            ]
+            stuck = stuck - first_reviewer
+            report.add(
+                "The minimum loads of {} reviewers cannot be met together within the "
+                "demands of their available papers: {}.".format(
+                    len(stuck), _list_ids(reviewers[stuck])
+                ),
+                reviewers=reviewers[stuck],
+            )
+
+    return report
@@ -0,0 +1,223 @@
+"""
+Bulk readers for the input files of the matcher CLI.
+
+Files are parsed by pandas' C parser into typed columns, and IDs are mapped to matrix
+indexes with hashed lookups, so that edges reach the Encoder as IndexedEdges without
+building a tuple per row.
+
+Edge files may also be binary, detected from their extension:
+- `.parquet` / `.pq` and `.feather` / `.arrow`: the first three columns are the paper
+  IDs, reviewer IDs and values (requires pyarrow).
+- `.npz` (compressed): `paper_ids` and `reviewer_ids` dictionaries plus `paper_codes`,
+  `reviewer_codes` and `values` arrays, as written by `write_edges`. IDs stay
+  dictionary-encoded, so no string is built per edge.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from .encoder import IndexedEdges
+
+EDGE_COLUMNS = ["paper", "reviewer", "value"]
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+FEATHER_EXTENSIONS = (".feather", ".arrow")
+NPZ_EXTENSIONS = (".npz",)
+
+
+def _extension(path):
+    return os.path.splitext(str(path))[1].lower()
+
+
+def read_table(path, columns, dtypes, strip=False):
+    """
+    Read a headerless comma-separated file into a DataFrame with the given `columns`.
+
+    `dtypes` maps column names to their types; columns of type str have surrounding
+    whitespace removed if `strip` is True. An empty file gives an empty DataFrame.
+    """
+    try:
+        frame = pd.read_csv(
+            path,
+            header=None,
+            names=columns,
+            usecols=range(len(columns)),
+            dtype=dtypes,
+            keep_default_na=False,
+            na_filter=False,
+            engine="c",
+        )
+    except pd.errors.EmptyDataError:
+        frame = pd.DataFrame(
+            {
+                column: pd.Series([], dtype=dtypes.get(column, str))
+                for column in columns
+            }
+        )
+
+    if strip:
+        for column in columns:
+            if dtypes.get(column) is str:
+                frame[column] = frame[column].str.strip()
+
+    return frame
+
+
+def read_edges(path, value_dtype=float, strip=True):
+    """
+    Read a file of (paperID, userID, value) rows into a DataFrame with columns
+    `paper`, `reviewer` and `value`. The format is picked from the file extension;
+    anything unrecognized is read as CSV, with IDs stripped if `strip` is True.
+    """
+    extension = _extension(path)
+    if extension in PARQUET_EXTENSIONS:
+        frame = pd.read_parquet(path)
+    elif extension in FEATHER_EXTENSIONS:
+        frame = pd.read_feather(path)
+    elif extension in NPZ_EXTENSIONS:
+        return _read_npz_edges(path, value_dtype)
+    else:
+        return read_table(
+            path,
+            EDGE_COLUMNS,
+            {"paper": str, "reviewer": str, "value": value_dtype},
+            strip=strip,
+        )
+
+    frame = frame.iloc[:, : len(EDGE_COLUMNS)]
+    frame.columns = EDGE_COLUMNS
+    frame["value"] = frame["value"].astype(value_dtype)
+    return frame
+
+
+def _read_npz_edges(path, value_dtype):
+    """Read edges saved by `write_edges` to a .npz file, keeping IDs as Categoricals."""
+    with np.load(path) as arrays:
+        return pd.DataFrame(
+            {
+                "paper": pd.Categorical.from_codes(
+                    arrays["paper_codes"], categories=arrays["paper_ids"]
+                ),
+                "reviewer": pd.Categorical.from_codes(
+                    arrays["reviewer_codes"], categories=arrays["reviewer_ids"]
+                ),
+                "value": arrays["values"].astype(value_dtype, copy=False),
+            }
+        )
+
+
+def write_edges(frame, path):
+    """
+    Write an edge DataFrame (as returned by `read_edges`) to `path`, in the binary
+    format given by its extension: Parquet, Feather or .npz. IDs are stored
+    dictionary-encoded.
+    """
+    frame = frame[EDGE_COLUMNS].copy()
+    extension = _extension(path)
+    if extension in NPZ_EXTENSIONS:
+        paper_codes, paper_ids = pd.factorize(frame["paper"])
+        reviewer_codes, reviewer_ids = pd.factorize(frame["reviewer"])
+        np.savez_compressed(
+            path,
+            paper_ids=np.asarray(paper_ids, dtype=str),
+            reviewer_ids=np.asarray(reviewer_ids, dtype=str),
+            paper_codes=paper_codes.astype(np.int32),
+            reviewer_codes=reviewer_codes.astype(np.int32),
+            values=frame["value"].to_numpy(),
+        )
+        return
+
+    for column in ["paper", "reviewer"]:
+        frame[column] = frame[column].astype("category")
+    if extension in PARQUET_EXTENSIONS:
+        frame.to_parquet(path, index=False)
+    elif extension in FEATHER_EXTENSIONS:
+        frame.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(
+            "Unsupported edge file format {!r}, use one of {}".format(
+                extension,
+                PARQUET_EXTENSIONS + FEATHER_EXTENSIONS + NPZ_EXTENSIONS,
+            )
+        )
+
+
+def read_edge_files(paths, value_dtype=float, strip=True, max_workers=None):
+    """
+    Read several edge files concurrently (the C parser releases the GIL).
+    Returns a dict of DataFrames keyed on path, in the order of `paths`.
+    """
+    paths = list(paths)
+    if len(paths) <= 1:
+        return {
+            path: read_edges(path, value_dtype=value_dtype, strip=strip)
+            for path in paths
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(paths)) as pool:
+        frames = pool.map(
+            lambda path: read_edges(path, value_dtype=value_dtype, strip=strip),
+            paths,
+        )
+        return dict(zip(paths, frames))
+
+
+def unique_ids(*columns):
+    """Return the set of distinct values of one or more ID columns."""
+    ids = set()
+    for column in columns:
+        ids.update(pd.unique(column))
+    return ids
+
+
+def index_edges(
+    frame, papers, reviewers, logger=logging.getLogger(__name__)
+):
+    """
+    Map the IDs of an edge DataFrame to their indexes in `papers` and `reviewers`
+    (pandas Indexes, or lists of IDs) and return IndexedEdges.
+
+    Rows whose paper or reviewer is not listed are dropped.
+    """
+    papers = pd.Index(papers)
+    reviewers = pd.Index(reviewers)
+    paper_idx = papers.get_indexer(frame["paper"])
+    reviewer_idx = reviewers.get_indexer(frame["reviewer"])
+    values = frame["value"].to_numpy()
+
+    known = (paper_idx >= 0) & (reviewer_idx >= 0)
+    if not known.all():
+        logger.info(
+            "Dropping {} edges with an unknown paper or reviewer".format(
+                len(known) - np.count_nonzero(known)
+            )
+        )
+        paper_idx = paper_idx[known]
+        reviewer_idx = reviewer_idx[known]
+        values = values[known]
+
+    return IndexedEdges(
+        paper_idx.astype(np.intp, copy=False),
+        reviewer_idx.astype(np.intp, copy=False),
+        values,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Convert edge files (paperID, userID, value) to a binary format"
+    )
+    parser.add_argument("input", help="edge file to convert, e.g. scores.csv")
+    parser.add_argument(
+        "output",
+        help="output path; .parquet, .feather or .npz picks the format",
+    )
+    args = parser.parse_args()
+
+    write_edges(read_edges(args.input), args.output)
@@ -0,0 +1,100 @@
+"""
+Per-stage profiling of a matcher run.
+
+A Profiler records the wall time, CPU time and memory of every stage entered with
+`Profiler.stage`, and writes them as a JSON report. The operating system only tracks
+the peak resident set size of the whole process, so each stage reports how much it
+raised that peak (`peak_rss_increase_mb`; 0 if an earlier stage peaked higher) and
+the process peak at its end (`process_peak_rss_mb`). Stages may optionally be run
+under cProfile, with the statistics dumped to a file for `pstats` or snakeviz.
+A disabled Profiler records nothing, so callers can enter stages unconditionally.
+"""
+
+import cProfile
+from contextlib import contextmanager
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / 2**20
+    return peak / 2**10
+
+
+class Profiler:
+    """
+    Collects timings of named stages.
+
+    Arguments:
+    - `enabled`: if False, `stage` does nothing and the report is empty.
+    - `cprofile_path`: file to dump cProfile statistics of the stages entered with
+      `cprofile=True` to. No cProfile is run if None.
+    """
+
+    def __init__(self, enabled=True, cprofile_path=None):
+        self.enabled = enabled
+        self.cprofile_path = cprofile_path
+        self.stages = []
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def stage(self, name, cprofile=False):
+        """Record the wall time, CPU time and peak RSS increase of the enclosed block as `name`."""
+        if not self.enabled:
+            yield
+            return
+
+        profile = None
+        if cprofile and self.cprofile_path:
+            profile = cProfile.Profile()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        peak_start = peak_rss_mb()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+                profile.dump_stats(self.cprofile_path)
+            peak_end = peak_rss_mb()
+            self.stages.append(
+                {
+                    "stage": name,
+                    "wall_time": time.perf_counter() - wall_start,
+                    "cpu_time": time.process_time() - cpu_start,
+                    "peak_rss_increase_mb": (
+                        None if peak_end is None else peak_end - peak_start
+                    ),
+                    "process_peak_rss_mb": peak_end,
+                }
+            )
+
+    def report(self):
+        """Return the recorded stages and the totals since the Profiler was created."""
+        return {
+            "stages": self.stages,
+            "total_wall_time": time.perf_counter() - self._start,
+            "total_cpu_time": time.process_time() - self._cpu_start,
+            "process_peak_rss_mb": peak_rss_mb(),
+        }
+
+    def write(self, path):
+        """Write the report to `path` as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
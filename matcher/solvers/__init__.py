@@ -1,10 +1,41 @@
-"""A module for paper-reviewer assignment solvers"""
+"""
+A module for paper-reviewer assignment solvers
+
+Solver classes are imported on first access (e.g. `from matcher.solvers import FairIR`),
+so importing the package does not load the dependencies of every solver, such as
+gurobipy, OR-Tools or the compiled BVN extension.
+"""
+
+import importlib
 
 from .core import SolverException
-from .minmax_solver import MinMaxSolver
-from .simple_solver import SimpleSolver
-from .randomized_solver import RandomizedSolver
-from .fairflow import FairFlow
-from .fairsequence import FairSequence
-from .fairir import FairIR
-from .perturbed_maximization_solver import PerturbedMaximizationSolver
\ No newline at end of file
+
+# the module defining each solver class
+SOLVER_MODULES = {
+    "MinMaxSolver": ".minmax_solver",
+    "SimpleSolver": ".simple_solver",
+    "RandomizedSolver": ".randomized_solver",
+    "FractionalLPSolver": ".lp_solver",
+    "FairFlow": ".fairflow",
+    "FairSequence": ".fairsequence",
+    "FairIR": ".fairir",
+    "PerturbedMaximizationSolver": ".perturbed_maximization_solver",
+}
+
+__all__ = ["SolverException"] + list(SOLVER_MODULES)
+
+
+def __getattr__(name):
+    if name not in SOLVER_MODULES:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name)
+        )
+    solver_class = getattr(
+        importlib.import_module(SOLVER_MODULES[name], __name__), name
+    )
+    globals()[name] = solver_class
+    return solver_class
+
+
+def __dir__():
+    return sorted(set(globals()) | set(SOLVER_MODULES))
@@ -3,4 +3,121 @@ A C extension that implements a sampling algorithm based on the Birkhoff-von Neu
 theorem, used in randomized_solver.
 """
 
-from _bvn_extension.lib import run_bvn
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from _bvn_extension import ffi
+from _bvn_extension.lib import run_bvn, run_bvn_sparse
+
+
+def draw_seeds(n, seed=None):
+    """
+    Return `n` independent 64-bit seeds for the sampler, derived from `seed` (or from
+    fresh entropy if `seed` is None).
+    """
+    return [
+        int(value)
+        for value in np.random.SeedSequence(seed).generate_state(n, np.uint64)
+    ]
+
+
+def sample_bvn(flows, one, seed=None):
+    """
+    Sample a deterministic assignment from the fractional assignment `flows`: a
+    #papers by #reviewers integer matrix of marginal probabilities scaled up by `one`.
+
+    A dense matrix is copied once into a contiguous numpy.intc buffer, which the
+    extension reads and overwrites in place through `ffi.from_buffer`; `flows` is left
+    unchanged. The buffer is returned as a #papers by #reviewers numpy.intc matrix of
+    0s and 1s. If `flows` is a scipy.sparse matrix, only its stored pairs are passed
+    to the extension, so time and memory grow with the support of the fractional
+    assignment rather than with its shape, and the sampled pairs are returned as a
+    scipy.sparse CSR numpy.intc matrix.
+
+    The same `seed` always gives the same sample, for dense and sparse `flows` alike.
+    The extension keeps its state per call and cffi releases the GIL while it runs, so
+    samples can be drawn concurrently from several threads.
+    """
+    if seed is None:
+        seed = draw_seeds(1)[0]
+    if sparse.issparse(flows):
+        return _sample_bvn_sparse(flows, one, seed)
+
+    num_paps, num_revs = np.shape(flows)
+    buffer = np.array(flows, dtype=np.intc, order="C", copy=True).reshape(-1)
+    subsets = np.ones(num_revs, dtype=np.intc)
+    status = run_bvn(
+        ffi.from_buffer("int[]", buffer, require_writable=True),
+        ffi.from_buffer("int[]", subsets, require_writable=True),
+        num_paps,
+        num_revs,
+        one,
+        seed,
+    )
+    if status:
+        raise MemoryError(
+            "Could not allocate the BVN flow graph of {} papers and {} reviewers".format(
+                num_paps, num_revs
+            )
+        )
+    return buffer.reshape(num_paps, num_revs)
+
+
+def _sample_bvn_sparse(flows, one, seed):
+    num_paps, num_revs = flows.shape
+    flows = _canonical_support(flows)
+    papers = np.repeat(
+        np.arange(num_paps, dtype=np.intc), np.diff(flows.indptr)
+    )
+    reviewers = flows.indices.astype(np.intc)
+    buffer = flows.data.astype(np.intc)
+    subsets = np.ones(num_revs, dtype=np.intc)
+    status = run_bvn_sparse(
+        ffi.from_buffer("int[]", papers),
+        ffi.from_buffer("int[]", reviewers),
+        ffi.from_buffer("int[]", buffer, require_writable=True),
+        len(buffer),
+        ffi.from_buffer("int[]", subsets, require_writable=True),
+        num_paps,
+        num_revs,
+        one,
+        seed,
+    )
+    if status:
+        raise MemoryError(
+            "Could not allocate the BVN flow graph of {} pairs".format(len(buffer))
+        )
+    sampled = buffer == 1
+    return sparse.csr_matrix(
+        (buffer[sampled], (papers[sampled], reviewers[sampled])),
+        shape=(num_paps, num_revs),
+    )
+
+
+def _canonical_support(flows):
+    """Return `flows` as a CSR matrix of distinct pairs in row-major order."""
+    flows = sparse.csr_matrix(flows)
+    if not flows.has_canonical_format:
+        flows = flows.copy()
+        flows.sum_duplicates()
+    return flows
+
+
+def sample_bvn_batch(flows, one, seeds, max_workers=None):
+    """
+    Draw one sample of `flows` (see sample_bvn) for each seed in `seeds`, spread over
+    up to `max_workers` threads (by default, one per CPU). Returns the samples in the
+    order of `seeds`.
+    """
+    if sparse.issparse(flows):
+        flows = _canonical_support(flows)
+    else:
+        flows = np.ascontiguousarray(flows, dtype=np.intc)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(seeds))
+    if max_workers <= 1:
+        return [sample_bvn(flows, one, seed) for seed in seeds]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda seed: sample_bvn(flows, one, seed), seeds))
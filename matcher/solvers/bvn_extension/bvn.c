@@ -14,58 +14,68 @@
 
 #include <stdio.h>
 #include <stdlib.h>
+#include <stdint.h>
 #include <string.h>
-#include <time.h>
 #include <math.h>
 #include <assert.h>
 
 #define debug 0
 
-int one;
-
 /* STATE VARIABLES */
 
-// flow tracking
-int *f, *c, *ci; // f: current flow on an edge, c: total load of a vertex (positive for reviewers, negative for papers), ci: total load of a paper-instution pair
-int fw, bw; // (fw, bw): maximum amount of flow that can be added in the forward / backward direction on current path / cycle
-int m; // m: number of remaining (fractional) edges
+// all state of one sampling run, so that runs on different threads do not interfere
+struct bvn_state
+{
+    int one; // scale of flows
 
-// (simulated) linked lists of adjacent edges
-int *h, *u, *v, *l, *se; // h: heads, (u, v): starting and ending points of an edge, l: pointer to next edge, se: whether edge has been visited
-int tot; // tot: total number of edges ever added
-int *s, *ri; // s: whether vertex has been visited, ri: instituion a reviewer belongs to
+    // flow tracking
+    int *f, *c, *ci; // f: current flow on an edge, c: total load of a vertex (positive for reviewers, negative for papers), ci: total load of a paper-instution pair
+    int fw, bw; // (fw, bw): maximum amount of flow that can be added in the forward / backward direction on current path / cycle
+    int m; // m: number of remaining (fractional) edges
 
-// (simulated) linked lists of adjacent institutions
-int *hi, *vi, *li, *si; // hi: heads, vi: name / number of insitution, li: pointer to next institution, si: whether an institution has been visited at this paper
-int ti; // ti: total number of paper-institution pairs ever added
+    // (simulated) linked lists of adjacent edges
+    int *h, *u, *v, *l, *se; // h: heads, (u, v): starting and ending points of an edge, l: pointer to next edge, se: whether edge has been visited
+    int tot; // tot: total number of edges ever added
+    int *s, *ri; // s: whether vertex has been visited, ri: instituion a reviewer belongs to
 
-// stack for tracking path / cycle to clear
-int *st; // st: stack of pointers
-int top, btm; // top: top, btm: where path / cycle starts
+    // (simulated) linked lists of adjacent institutions
+    int *hi, *vi, *li, *si; // hi: heads, vi: name / number of insitution, li: pointer to next institution, si: whether an institution has been visited at this paper
+    int ti; // ti: total number of paper-institution pairs ever added
 
+    // stack for tracking path / cycle to clear
+    int *st; // st: stack of pointers
+    int top, btm; // top: top, btm: where path / cycle starts
 
-/* FUNCTION PROTOTYPES */
+    // random number generation
+    uint64_t rng; // rng: state of the splitmix64 generator
+};
 
-int go(int x, int y, int p);
 
-void ae(int x, int y, int z);
-int fi(int p, int i);
-void ai(int p, int i, int w);
-void re(int x);
-int tr(int x, int i);
-void cnr(int x);
-void upd(int x, int y);
+/* FUNCTION PROTOTYPES */
 
-int idx_to_rev(int i, int npaps, int nrevs);
-int idx_to_pap(int i, int npaps, int nrevs);
-int pap_rev_to_idx(int p, int r, int npaps, int nrevs);
-int min(int a, int b);
-int fl(int x);
-int ce(int x);
-int in(int x);
-void initialize_state(int vsize, int esize);
-int* alloc_int(int size);
-void free_buffers(void);
+static void add_flow(struct bvn_state *g, int x, int y, int z);
+static void round_flows(struct bvn_state *g, int n);
+static int go(struct bvn_state *g, int x, int y, int p);
+
+static void ae(struct bvn_state *g, int x, int y, int z);
+static int fi(struct bvn_state *g, int p, int i);
+static void ai(struct bvn_state *g, int p, int i, int w);
+static void re(struct bvn_state *g, int x);
+static int tr(struct bvn_state *g, int x, int i);
+static void cnr(struct bvn_state *g, int x);
+static void upd(struct bvn_state *g, int x, int y);
+
+static int idx_to_rev(int i, int npaps, int nrevs);
+static int idx_to_pap(int i, int npaps, int nrevs);
+static int pap_rev_to_idx(int p, int r, int npaps, int nrevs);
+static int min(int a, int b);
+static int fl(struct bvn_state *g, int x);
+static int ce(struct bvn_state *g, int x);
+static int in(struct bvn_state *g, int x);
+static double uniform(struct bvn_state *g);
+static int initialize_state(struct bvn_state *g, int vsize, int esize);
+static int* alloc_int(int size);
+static void free_buffers(struct bvn_state *g);
 
 
 /* ALGORITHM LOGIC FUNCTIONS */
@@ -83,58 +93,36 @@ void free_buffers(void);
  * - npaps: Number of papers.
  * - nrevs: Number of reviewers.
  * - one_: Scale of flows.
+ * - seed: Seed of the random number generator; the same seed gives the same sample.
+ * All state is local to the call, so several calls can run at once on different
+ * threads. Returns 0, or -1 if memory for the flow graph could not be allocated.
  */
-int run_bvn(int* flows, int* subsets, int npaps, int nrevs, int one_)
+int run_bvn(int* flows, int* subsets, int npaps, int nrevs, int one_, uint64_t seed)
 {
-    srand(clock()); // set random seed to current clock time
-    rand(); // throw away first random number
+    struct bvn_state state;
+    struct bvn_state *g = &state;
+    g->rng = seed;
 
     int n = npaps + nrevs;
-	one = one_;
+	g->one = one_;
 
 	// allocate space for n vertices, and 2*p*r maximum edges
-	initialize_state(n + 1, (2 * npaps * nrevs) + 1);
+	if(initialize_state(g, n + 1, (2 * npaps * nrevs) + 1))
+	{
+		free_buffers(g);
+		return -1;
+	}
 
-    for(int i = 1; i <= nrevs; i++) ri[i] = subsets[i-1];
+    for(int i = 1; i <= nrevs; i++) g->ri[i] = subsets[i-1];
 
     for(int i = 0; i < npaps*nrevs; i++)
     {
 		int x = idx_to_rev(i, npaps, nrevs);
 		int y = idx_to_pap(i, npaps, nrevs);
-		int z = flows[i];//round(flows[i] * one);
-
-        c[x] += z; // update load counters at vertices
-        c[y] -= z;
-        if(z != 0) // if flow is nonzero, add edge
-        {
-            ae(x, y, z);
-            ae(y, x, one - z);
-
-            ai(y, ri[x], z); // and update flow counter for paper-institution pair
-
-            cnr(tot); // remove edge if flow is already integral
-        }
-
+		add_flow(g, x, y, flows[i]);
     }
 
-    while(m) // while there are still fractional edges left
-    {
-        if(debug) printf("%d\n", m);
-        memset(s, 0, (n + 1) * sizeof(int)); // mark all vertices unvisited
-        for(int i = 1; i <= n; i++) // try to find paths / cycles starting from vertices with fractional load
-            if(!in(c[i]))
-            {
-                top = 0;
-                if(go(i, 0, 1)) break;
-            }
-
-        memset(s, 0, (n + 1) * sizeof(int)); // mark all vertices unvisited
-        for(int i = 1; i <= n; i++) // now try to find cycles only starting from all vertices
-        {
-            top = 0;
-            if(go(i, 0, 0)) break;
-        }
-    }
+    round_flows(g, n);
 
 	// set all flows to 0 for output
     for(int i = 0; i < npaps * nrevs; i++)
@@ -142,197 +130,289 @@ int run_bvn(int* flows, int* subsets, int npaps, int nrevs, int one_)
 		flows[i] = 0;
 	}
 
-    for(int i = 2; i <= tot; i++)
+    for(int i = 2; i <= g->tot; i++)
 	{
-        if(u[i] < v[i] && f[i] == one) // output all edges whose final flow is one -- these constitute the integral matching
+        if(g->u[i] < g->v[i] && g->f[i] == g->one) // output all edges whose final flow is one -- these constitute the integral matching
 		{
-			int idx = pap_rev_to_idx(v[i], u[i], npaps, nrevs);
+			int idx = pap_rev_to_idx(g->v[i], g->u[i], npaps, nrevs);
 			flows[idx] = 1;
 		}
 	}
 
-	free_buffers();
+	free_buffers(g);
     return 0;
 }
 
+/*
+ * Like run_bvn, but reads only the support of the fractional assignment, so that
+ * time and memory grow with the number of pairs with nonzero flow rather than with
+ * npaps * nrevs. Arguments:
+ * - papers, reviewers, flows: The support as coordinate arrays of size nnz, with
+ *   the flow of each (paper, reviewer) pair scaled up by one_ to be an integer.
+ *   Pairs must be distinct. The function modifies flows so that it contains 1 for
+ *   the pairs of the sampled assignment and 0 for the others. Listing the pairs in
+ *   row-major order gives the same sample as run_bvn for the same seed.
+ * - nnz: Number of pairs.
+ * - subsets, npaps, nrevs, one_, seed: As in run_bvn.
+ * Returns 0, or -1 if memory for the flow graph could not be allocated.
+ */
+int run_bvn_sparse(int* papers, int* reviewers, int* flows, int nnz, int* subsets, int npaps, int nrevs, int one_, uint64_t seed)
+{
+    struct bvn_state state;
+    struct bvn_state *g = &state;
+    g->rng = seed;
+
+    int n = npaps + nrevs;
+	g->one = one_;
+
+	// allocate space for n vertices, and 2*nnz maximum edges
+	int *ep = alloc_int(nnz + 1); // ep: pointer of the edge of each pair (0 if the pair has no flow)
+	if(initialize_state(g, n + 1, (2 * nnz) + 1) || !ep)
+	{
+		free(ep);
+		free_buffers(g);
+		return -1;
+	}
+
+    for(int i = 1; i <= nrevs; i++) g->ri[i] = subsets[i-1];
+
+    for(int i = 0; i < nnz; i++)
+    {
+		int x = reviewers[i] + 1; // reviewer numbers start at 1
+		int y = papers[i] + nrevs + 1; // paper numbers start at nrevs + 1
+		if(flows[i] != 0) ep[i] = g->tot + 1;
+		add_flow(g, x, y, flows[i]);
+    }
+
+    round_flows(g, n);
+
+    for(int i = 0; i < nnz; i++) // output whether the final flow of each pair is one
+    {
+        flows[i] = ep[i] && g->f[ep[i]] == g->one;
+    }
+
+    free(ep);
+    free_buffers(g);
+    return 0;
+}
+
+// add an edge with flow z from reviewer x to paper y to the flow graph
+static void add_flow(struct bvn_state *g, int x, int y, int z)
+{
+    g->c[x] += z; // update load counters at vertices
+    g->c[y] -= z;
+    if(z != 0) // if flow is nonzero, add edge
+    {
+        ae(g, x, y, z);
+        ae(g, y, x, g->one - z);
+
+        ai(g, y, g->ri[x], z); // and update flow counter for paper-institution pair
+
+        cnr(g, g->tot); // remove edge if flow is already integral
+    }
+}
+
+// push flow around paths / cycles of the graph with n vertices until every edge is integral
+static void round_flows(struct bvn_state *g, int n)
+{
+    while(g->m) // while there are still fractional edges left
+    {
+        if(debug) printf("%d\n", g->m);
+        memset(g->s, 0, (n + 1) * sizeof(int)); // mark all vertices unvisited
+        for(int i = 1; i <= n; i++) // try to find paths / cycles starting from vertices with fractional load
+            if(!in(g, g->c[i]))
+            {
+                g->top = 0;
+                if(go(g, i, 0, 1)) break;
+            }
+
+        memset(g->s, 0, (n + 1) * sizeof(int)); // mark all vertices unvisited
+        for(int i = 1; i <= n; i++) // now try to find cycles only starting from all vertices
+        {
+            g->top = 0;
+            if(go(g, i, 0, 0)) break;
+        }
+    }
+}
+
 // main algorithm logic, searches for a path/cycle and pushes flow when found
-int go(int x, int y, int p) // x: current vertex, y: previous edge, p: whether finding a path
+static int go(struct bvn_state *g, int x, int y, int p) // x: current vertex, y: previous edge, p: whether finding a path
 {
-    if(debug) printf("%d %d %d %d\n", x, y, p, top);
-    if(y) st[++top] = y; // push incoming edge into stack
+    if(debug) printf("%d %d %d %d\n", x, y, p, g->top);
+    if(y) g->st[++g->top] = y; // push incoming edge into stack
     int ret = 0, t = 0, yi = 0, zi = 0;
 
-    if(!hi[x]) // x is a reviewer
+    if(!g->hi[x]) // x is a reviewer
     {
-        if(debug) printf("c: %d\n", c[x]);
-        if(s[x]) // found a cycle
+        if(debug) printf("c: %d\n", g->c[x]);
+        if(g->s[x]) // found a cycle
         {
-            fw = bw = one;
-            btm = 0;
+            g->fw = g->bw = g->one;
+            g->btm = 0;
 
-            for(int i = 1; i <= top; i++) // cycle starts from previous edge leaving x
-                if(u[st[i]] == x)
+            for(int i = 1; i <= g->top; i++) // cycle starts from previous edge leaving x
+                if(g->u[g->st[i]] == x)
                 {
-                    btm = i;
+                    g->btm = i;
                     break;
                 }
 
-            if(debug) printf("r cycle: %d\n", btm);
+            if(debug) printf("r cycle: %d\n", g->btm);
 
             return 1;
         }
 
-        if(y && p && (!in(c[x]))) // found a path
+        if(y && p && (!in(g, g->c[x]))) // found a path
         {
-            fw = ce(c[x]) - c[x];
-            bw = c[x] - fl(c[x]);
-            btm = 1; // path always starts from first edge
-            if(debug) printf("r path: %d\n", btm);
+            g->fw = ce(g, g->c[x]) - g->c[x];
+            g->bw = g->c[x] - fl(g, g->c[x]);
+            g->btm = 1; // path always starts from first edge
+            if(debug) printf("r path: %d\n", g->btm);
             return 1;
         }
 
-        s[x] = 1; // mark reviewer visited
-        t = tr(x, 0);
+        g->s[x] = 1; // mark reviewer visited
+        t = tr(g, x, 0);
 
         if(!t) // for some reason no fractional edge is available (should only happen when y = 0)
         {
             if(debug && y) printf("r dead end\n");
-            fw = bw = 0;
+            g->fw = g->bw = 0;
             return 0;
         }
-        if(debug) printf("f[t]: %d\n", f[t]);
-        se[t] = se[t ^ 1] = 1; // mark outgoing edge visited
-        ret = go(v[t], t, p); // go to next vertex (which should be a paper)
-        se[t] = se[t ^ 1] = 0; // and then unmark
-        fw = min(fw, f[t]);
-        bw = min(bw, f[t ^ 1]);
+        if(debug) printf("f[t]: %d\n", g->f[t]);
+        g->se[t] = g->se[t ^ 1] = 1; // mark outgoing edge visited
+        ret = go(g, g->v[t], t, p); // go to next vertex (which should be a paper)
+        g->se[t] = g->se[t ^ 1] = 0; // and then unmark
+        g->fw = min(g->fw, g->f[t]);
+        g->bw = min(g->bw, g->f[t ^ 1]);
     }
     else // x is a paper
     {
-        yi = fi(x, ri[u[y]]); // set yi to institution of incoming edge
+        yi = fi(g, x, g->ri[g->u[y]]); // set yi to institution of incoming edge
 
-        if(debug) printf("c: %d, ci: %d\n", c[x], ci[yi]);
+        if(debug) printf("c: %d, ci: %d\n", g->c[x], g->ci[yi]);
 
-        if(si[yi]) // found an ``even'' cycle (never happens when y = yi = 0)
+        if(g->si[yi]) // found an ``even'' cycle (never happens when y = yi = 0)
         {
-            fw = bw = one;
-            btm = 0;
+            g->fw = g->bw = g->one;
+            g->btm = 0;
 
-            for(int i = 1; i <= top; i++)
-                if(u[st[i]] == x && ri[v[st[i]]] == vi[yi]) // find first edge in stack (1) leaving x and (2) going to institution of incoming edge -- cycle starts there
+            for(int i = 1; i <= g->top; i++)
+                if(g->u[g->st[i]] == x && g->ri[g->v[g->st[i]]] == g->vi[yi]) // find first edge in stack (1) leaving x and (2) going to institution of incoming edge -- cycle starts there
                 {
-                    btm = i;
+                    g->btm = i;
                     break;
                 }
 
-            if(debug) printf("p even cycle: %d\n", btm);
+            if(debug) printf("p even cycle: %d\n", g->btm);
 
             return 1;
         }
 
-        if(s[x] && !in(ci[yi])) // found an ``odd'' cycle
+        if(g->s[x] && !in(g, g->ci[yi])) // found an ``odd'' cycle
         {
-            fw = ci[yi] - fl(ci[yi]);
-            bw = ce(ci[yi]) - ci[yi];
-            btm = 0;
+            g->fw = g->ci[yi] - fl(g, g->ci[yi]);
+            g->bw = ce(g, g->ci[yi]) - g->ci[yi];
+            g->btm = 0;
 
             int wi = 0;
 
-            for(int i = 1; i <= top; i++) // cycle starts from first edge leaving x which belongs to a fractional institution
-                if(u[st[i]] == x)
+            for(int i = 1; i <= g->top; i++) // cycle starts from first edge leaving x which belongs to a fractional institution
+                if(g->u[g->st[i]] == x)
                 {
-                    wi = fi(x, ri[v[st[i]]]);
-                    if(!in(ci[wi]))
+                    wi = fi(g, x, g->ri[g->v[g->st[i]]]);
+                    if(!in(g, g->ci[wi]))
                     {
-                        btm = i;
+                        g->btm = i;
                         break;
                     }
                 }
 
-            fw = min(fw, ce(ci[wi]) - ci[wi]);
-            bw = min(bw, ci[wi] - fl(ci[wi]));
+            g->fw = min(g->fw, ce(g, g->ci[wi]) - g->ci[wi]);
+            g->bw = min(g->bw, g->ci[wi] - fl(g, g->ci[wi]));
 
-            if(debug) printf("p odd cycle: %d\n", btm);
+            if(debug) printf("p odd cycle: %d\n", g->btm);
 
             return 1;
         }
 
-        if(y && p && (!in(c[x])) && (!in(ci[yi]))) // found a path
+        if(y && p && (!in(g, g->c[x])) && (!in(g, g->ci[yi]))) // found a path
         {
-            fw = ce(c[x]) - c[x];
-            bw = c[x] - fl(c[x]);
-            fw = min(fw, ci[yi] - fl(ci[yi]));
-            bw = min(bw, ce(ci[yi]) - ci[yi]);
-            btm = 1; // path always starts from first edge
-            if(debug) printf("p path: %d\n", btm);
+            g->fw = ce(g, g->c[x]) - g->c[x];
+            g->bw = g->c[x] - fl(g, g->c[x]);
+            g->fw = min(g->fw, g->ci[yi] - fl(g, g->ci[yi]));
+            g->bw = min(g->bw, ce(g, g->ci[yi]) - g->ci[yi]);
+            g->btm = 1; // path always starts from first edge
+            if(debug) printf("p path: %d\n", g->btm);
             return 1;
         }
 
-        if(in(ci[yi])) // integral institution load -- leave through the same institution (equivalent to the other case when y = yi = 0)
-            t = tr(x, vi[yi]);
+        if(in(g, g->ci[yi])) // integral institution load -- leave through the same institution (equivalent to the other case when y = yi = 0)
+            t = tr(g, x, g->vi[yi]);
         else // leave through any fractional institution
-            t = tr(x, 0);
+            t = tr(g, x, 0);
 
         if(!t) // should only happen when y = 0
         {
-            fw = bw = 0;
+            g->fw = g->bw = 0;
             if(debug && y) printf("p dead end\n");
             return 0;
         }
 
-        if(debug) printf("f[t]: %d\n", f[t]);
+        if(debug) printf("f[t]: %d\n", g->f[t]);
 
-        zi = fi(x, ri[v[t]]); // set zi to instituion of outgoing edge
-        si[zi] = 1; // mark paper-instution pair visited
-        se[t] = se[t ^ 1] = 1; // mark edge visited
-        if(!in(ci[zi])) s[x] = 1; // and if leaving through a fractional instituion -- mark vertex visited
+        zi = fi(g, x, g->ri[g->v[t]]); // set zi to instituion of outgoing edge
+        g->si[zi] = 1; // mark paper-instution pair visited
+        g->se[t] = g->se[t ^ 1] = 1; // mark edge visited
+        if(!in(g, g->ci[zi])) g->s[x] = 1; // and if leaving through a fractional instituion -- mark vertex visited
 
-        ret = go(v[t], t, p); // go to next vertex (which should be a reviewer)
+        ret = go(g, g->v[t], t, p); // go to next vertex (which should be a reviewer)
 
-        si[zi] = 0; // unmark institution
-        se[t] = se[t ^ 1] = 0; // and unmark edge
+        g->si[zi] = 0; // unmark institution
+        g->se[t] = g->se[t ^ 1] = 0; // and unmark edge
 
-        fw = min(fw, f[t]);
-        bw = min(bw, f[t ^ 1]);
+        g->fw = min(g->fw, g->f[t]);
+        g->bw = min(g->bw, g->f[t ^ 1]);
     }
 
-    if(t == st[btm] && fw + bw != 0) // if path / cycle starts from current edge, clear path / cycle
+    if(t == g->st[g->btm] && g->fw + g->bw != 0) // if path / cycle starts from current edge, clear path / cycle
     {
         if((!y) && p) // it's a path
         {
-            fw = min(fw, c[x] - fl(c[x]));
-            bw = min(bw, ce(c[x]) - c[x]);
-            if(hi[x]) // need to consider load of paper-insitution pair of outgoing edge too
+            g->fw = min(g->fw, g->c[x] - fl(g, g->c[x]));
+            g->bw = min(g->bw, ce(g, g->c[x]) - g->c[x]);
+            if(g->hi[x]) // need to consider load of paper-insitution pair of outgoing edge too
             {
-                int yi = fi(x, ri[v[t]]);
-                fw = min(fw, ce(ci[yi]) - ci[yi]);
-                bw = min(bw, ci[yi] - fl(ci[yi]));
+                int yi = fi(g, x, g->ri[g->v[t]]);
+                g->fw = min(g->fw, ce(g, g->ci[yi]) - g->ci[yi]);
+                g->bw = min(g->bw, g->ci[yi] - fl(g, g->ci[yi]));
             }
         }
-        if(debug) printf("clearing a path/cycle: %d %d\n", fw, bw);
+        if(debug) printf("clearing a path/cycle: %d %d\n", g->fw, g->bw);
         int r, d;
-        if(((double)rand()) / RAND_MAX < ((double)bw) / (fw + bw)) // update forward wp bw / (fw + bw), etc
+        if(uniform(g) < ((double)g->bw) / (g->fw + g->bw)) // update forward wp bw / (fw + bw), etc
         {
             d = 1;
-            r = fw;
+            r = g->fw;
         }
         else
         {
             d = -1;
-            r = bw;
+            r = g->bw;
         }
 
-        for(int i = btm; i <= top; i++) upd(st[i], r * d); // update every edge on path / cycle
-        fw = bw = 0;
+        for(int i = g->btm; i <= g->top; i++) upd(g, g->st[i], r * d); // update every edge on path / cycle
+        g->fw = g->bw = 0;
     }
 
-    if(hi[x] && yi != zi) // this part of update must happen after clearing cycle / path
+    if(g->hi[x] && yi != zi) // this part of update must happen after clearing cycle / path
     {
-        fw = min(fw, ce(ci[zi]) - ci[zi]);
-        bw = min(bw, ci[zi] - fl(ci[zi]));
+        g->fw = min(g->fw, ce(g, g->ci[zi]) - g->ci[zi]);
+        g->bw = min(g->bw, g->ci[zi] - fl(g, g->ci[zi]));
 
-        fw = min(fw, ci[yi] - fl(ci[yi]));
-        bw = min(bw, ce(ci[yi]) - ci[yi]);
+        g->fw = min(g->fw, g->ci[yi] - fl(g, g->ci[yi]));
+        g->bw = min(g->bw, ce(g, g->ci[yi]) - g->ci[yi]);
     }
 
     return ret;
@@ -341,182 +421,194 @@ int go(int x, int y, int p) // x: current vertex, y: previous edge, p: whether f
 
 /* FLOW GRAPH MODIFICATION FUNCTIONS */
 
-void ae(int x, int y, int z) // add an edge from x to y with flow z (and implicitly with capacity 1); also add a co-edge from y to x; note that co-edge of an edge with pointer p has pointer p ^ 1
+static void ae(struct bvn_state *g, int x, int y, int z) // add an edge from x to y with flow z (and implicitly with capacity 1); also add a co-edge from y to x; note that co-edge of an edge with pointer p has pointer p ^ 1
 {
-    ++m;
-    u[++tot] = x;
-    v[tot] = y;
-    f[tot] = z;
-    l[tot] = h[x];
-    h[x] = tot;
+    ++g->m;
+    g->u[++g->tot] = x;
+    g->v[g->tot] = y;
+    g->f[g->tot] = z;
+    g->l[g->tot] = g->h[x];
+    g->h[x] = g->tot;
 }
 
-int fi(int p, int i) // find the pointer at paper p for instution i
+static int fi(struct bvn_state *g, int p, int i) // find the pointer at paper p for instution i
 {
-    for(int j = hi[p]; j; j = li[j])
-        if(vi[j] == i) return j;
+    for(int j = g->hi[p]; j; j = g->li[j])
+        if(g->vi[j] == i) return j;
     return 0;
 }
 
-void ai(int p, int i, int w) // add an amount of load, w, to a paper-instution pair (p, i)
+static void ai(struct bvn_state *g, int p, int i, int w) // add an amount of load, w, to a paper-instution pair (p, i)
 {
-    int j = fi(p, i);
+    int j = fi(g, p, i);
     if(j)
-        ci[j] += w;
+        g->ci[j] += w;
     else
     {
-        vi[++ti] = i;
-        li[ti] = hi[p];
-        ci[ti] = w;
-        hi[p] = ti;
+        g->vi[++g->ti] = i;
+        g->li[g->ti] = g->hi[p];
+        g->ci[g->ti] = w;
+        g->hi[p] = g->ti;
     }
 }
 
-void re(int x) // remove edge with pointer x
+static void re(struct bvn_state *g, int x) // remove edge with pointer x
 {
-    --m;
-    int t = u[x];
-    if(x == h[t])
+    --g->m;
+    int t = g->u[x];
+    if(x == g->h[t])
     {
-        h[t] = l[x];
+        g->h[t] = g->l[x];
         return;
     }
-    int i = h[t];
-    while(l[i] != x)
-        i = l[i];
-    l[i] = l[x];
+    int i = g->h[t];
+    while(g->l[i] != x)
+        i = g->l[i];
+    g->l[i] = g->l[x];
 }
 
-int tr(int x, int i) // find a fractional edge adjacent to x not visited yet belonging to institution i (or any insitution with fractional paper-instituion load when i = 0)
+static int tr(struct bvn_state *g, int x, int i) // find a fractional edge adjacent to x not visited yet belonging to institution i (or any insitution with fractional paper-instituion load when i = 0)
 {
-    if(!hi[x])
+    if(!g->hi[x])
     {
-        for(int j = h[x]; j; j = l[j])
-            if(!se[j]) return j;
+        for(int j = g->h[x]; j; j = g->l[j])
+            if(!g->se[j]) return j;
     }
     else if(!i)
     {
-        for(int j = hi[x]; j; j = li[j])
-            if(!in(ci[j]))
+        for(int j = g->hi[x]; j; j = g->li[j])
+            if(!in(g, g->ci[j]))
             {
-                int t = tr(x, vi[j]);
+                int t = tr(g, x, g->vi[j]);
                 if(t) return t;
             }
     }
     else
-        for(int j = h[x]; j; j = l[j])
-            if(ri[v[j]] == i && !se[j]) return j;
+        for(int j = g->h[x]; j; j = g->l[j])
+            if(g->ri[g->v[j]] == i && !g->se[j]) return j;
     return 0;
 }
 
-void cnr(int x) // if edge with pointer x has flow 0 or 1, then remove it and its co-edge
+static void cnr(struct bvn_state *g, int x) // if edge with pointer x has flow 0 or 1, then remove it and its co-edge
 {
-    if(f[x] == 0 || f[x] == one)
+    if(g->f[x] == 0 || g->f[x] == g->one)
     {
-        re(x);
-        re(x ^ 1);
+        re(g, x);
+        re(g, x ^ 1);
     }
 }
 
-void upd(int x, int y) // add flow y to edge with pointer x; update all load counters associated with the edge
+static void upd(struct bvn_state *g, int x, int y) // add flow y to edge with pointer x; update all load counters associated with the edge
 {
-    f[x] -= y;
-    f[x ^ 1] += y;
-    c[u[x]] -= y;
-    c[v[x]] += y;
+    g->f[x] -= y;
+    g->f[x ^ 1] += y;
+    g->c[g->u[x]] -= y;
+    g->c[g->v[x]] += y;
 
-    if(hi[v[x]])
-        ai(v[x], ri[u[x]], -y);
+    if(g->hi[g->v[x]])
+        ai(g, g->v[x], g->ri[g->u[x]], -y);
     else
-        ai(u[x], ri[v[x]], y);
+        ai(g, g->u[x], g->ri[g->v[x]], y);
 
-    cnr(x);
+    cnr(g, x);
 }
 
 
 /* GENERAL UTILITY FUNCTIONS */
 
-int idx_to_rev(int i, int npaps, int nrevs) // flat idx -> reviewer number, which starts at 1
+static int idx_to_rev(int i, int npaps, int nrevs) // flat idx -> reviewer number, which starts at 1
 {
 	return (i % nrevs) + 1;
 }
 
-int idx_to_pap(int i, int npaps, int nrevs) // flat idx -> paper number, which starts at nrevs + 1
+static int idx_to_pap(int i, int npaps, int nrevs) // flat idx -> paper number, which starts at nrevs + 1
 {
 	return ((int) (i / nrevs)) + nrevs + 1;
 }
 
-int pap_rev_to_idx(int p, int r, int npaps, int nrevs) // (pap, rev) -> flat idx, which starts at 0
+static int pap_rev_to_idx(int p, int r, int npaps, int nrevs) // (pap, rev) -> flat idx, which starts at 0
 {
 	return ((p - nrevs - 1) * nrevs) + (r - 1);
 }
 
-int min(int a, int b)
+static int min(int a, int b)
 {
 	return (a <= b) ? a : b;
 }
 
-int fl(int x) // floor
+static int fl(struct bvn_state *g, int x) // floor
+{
+    return floor(((double)x) / g->one) * g->one;
+}
+
+static int ce(struct bvn_state *g, int x) // ceiling
 {
-    return floor(((double)x) / one) * one;
+    return ceil(((double)x) / g->one) * g->one;
 }
 
-int ce(int x) // ceiling
+static int in(struct bvn_state *g, int x) // whether a number is ``integral''
 {
-    return ceil(((double)x) / one) * one;
+    return x == fl(g, x) || x == ce(g, x);
 }
 
-int in(int x) // whether a number is ``integral''
+static double uniform(struct bvn_state *g) // next number of the splitmix64 generator, as a double in [0, 1)
 {
-    return x == fl(x) || x == ce(x);
+    uint64_t z = (g->rng += 0x9E3779B97F4A7C15ULL);
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    z = z ^ (z >> 31);
+    return (z >> 11) * (1.0 / 9007199254740992.0);
 }
 
-void initialize_state(int vsize, int esize)
+static int initialize_state(struct bvn_state *g, int vsize, int esize) // returns -1 if any buffer could not be allocated
 {
-	h = alloc_int(vsize);
-	u = alloc_int(esize);
-	v = alloc_int(esize);
-	l = alloc_int(esize);
-	se = alloc_int(esize);
-	s = alloc_int(vsize);
-	ri = alloc_int(vsize);
-	hi = alloc_int(vsize);
-	vi = alloc_int(esize);
-	li = alloc_int(esize);
-	si = alloc_int(esize);
-	st = alloc_int(esize);
-	f = alloc_int(esize);
-	c = alloc_int(vsize);
-	ci = alloc_int(esize);
-	fw = 0;
-	bw = 0;
-	m = 0;
-	ti = 0;
-	top = 0;
-	btm = 0;
-	tot = 1;
+	g->h = alloc_int(vsize);
+	g->u = alloc_int(esize);
+	g->v = alloc_int(esize);
+	g->l = alloc_int(esize);
+	g->se = alloc_int(esize);
+	g->s = alloc_int(vsize);
+	g->ri = alloc_int(vsize);
+	g->hi = alloc_int(vsize);
+	g->vi = alloc_int(esize);
+	g->li = alloc_int(esize);
+	g->si = alloc_int(esize);
+	g->st = alloc_int(esize);
+	g->f = alloc_int(esize);
+	g->c = alloc_int(vsize);
+	g->ci = alloc_int(esize);
+	g->fw = 0;
+	g->bw = 0;
+	g->m = 0;
+	g->ti = 0;
+	g->top = 0;
+	g->btm = 0;
+	g->tot = 1;
+	if(!(g->h && g->u && g->v && g->l && g->se && g->s && g->ri && g->hi && g->vi && g->li && g->si && g->st && g->f && g->c && g->ci))
+		return -1;
+	return 0;
 }
 
-int* alloc_int(int size)
+static int* alloc_int(int size)
 {
 	return (int*) calloc(size, sizeof(int));
 }
 
-void free_buffers(void)
+static void free_buffers(struct bvn_state *g)
 {
-	free(h);
-	free(u);
-	free(v);
-	free(l);
-	free(se);
-	free(s);
-	free(ri);
-	free(hi);
-	free(vi);
-	free(li);
-	free(si);
-	free(st);
-	free(f);
-	free(c);
-	free(ci);
+	free(g->h);
+	free(g->u);
+	free(g->v);
+	free(g->l);
+	free(g->se);
+	free(g->s);
+	free(g->ri);
+	free(g->hi);
+	free(g->vi);
+	free(g->li);
+	free(g->si);
+	free(g->st);
+	free(g->f);
+	free(g->c);
+	free(g->ci);
 }
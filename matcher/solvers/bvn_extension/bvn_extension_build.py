@@ -7,7 +7,9 @@ from cffi import FFI
 ffibuilder = FFI()
 
 header = (
-    "int run_bvn(int* flows, int* subsets, int nrevs, int npaps, int one_);"
+    "int run_bvn(int* flows, int* subsets, int nrevs, int npaps, int one_, uint64_t seed);"
+    "int run_bvn_sparse(int* papers, int* reviewers, int* flows, int nnz, int* subsets,"
+    " int npaps, int nrevs, int one_, uint64_t seed);"
 )
 ffibuilder.cdef(header)
 ffibuilder.set_source(
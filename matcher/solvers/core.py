@@ -1,4 +1,79 @@
+import numpy as np
+from collections import namedtuple
+from scipy import sparse
+
+# one draw of a randomized solver: the seed it was sampled with, the #papers by
+# #reviewers matrix of 0s and 1s, its cost, and whether it meets the paper
+# demands and reviewer loads
+SampledAssignment = namedtuple(
+    "SampledAssignment", ["seed", "assignment", "cost", "valid"]
+)
+
+
 class SolverException(Exception):
     """Exception wrapper class for errors related to the SimpleSolver"""
 
     pass
+
+
+def check_candidate_counts(candidates_per_paper, candidates_per_reviewer):
+    """
+    Raise a SolverException unless each number of candidates of a pruned graph is None
+    or an integer of at least 1.
+    """
+    for name, count in [
+        ("candidates_per_paper", candidates_per_paper),
+        ("candidates_per_reviewer", candidates_per_reviewer),
+    ]:
+        if count is None:
+            continue
+        if (
+            isinstance(count, bool)
+            or not isinstance(count, (int, np.integer))
+            or count < 1
+        ):
+            raise SolverException(
+                "{} must be an integer of at least 1, not {!r}".format(name, count)
+            )
+
+
+def matrix_values(matrix, rows, cols):
+    """
+    Return the entries of a dense or scipy.sparse `matrix` at the given
+    (row, column) coordinates as a flat numpy array.
+    """
+    return np.asarray(matrix[rows, cols]).ravel()
+
+
+def matrix_sum(matrix, axis):
+    """Sum a dense or scipy.sparse `matrix` along `axis` into a flat numpy array."""
+    return np.asarray(matrix.sum(axis=axis)).ravel()
+
+
+def reviewers_without_known_affinity(cost_matrix, constraint_matrix):
+    """
+    Return the indices of reviewers with no non-zero cost on any unconstrained
+    (constraint == 0) paper. Works on dense and scipy.sparse matrices.
+    """
+    if sparse.issparse(cost_matrix) or sparse.issparse(constraint_matrix):
+        known = sparse.csr_matrix(cost_matrix != 0, dtype=np.int8)
+        known = known - known.multiply(sparse.csr_matrix(constraint_matrix) != 0)
+        return np.where(matrix_sum(known, axis=0) == 0)[0]
+
+    return np.where(
+        np.all((cost_matrix * (constraint_matrix == 0)) == 0, axis=0)
+    )[0]
+
+
+def densify(matrix, fill_value=0):
+    """
+    Return a dense numpy copy of a scipy.sparse `matrix`, with `fill_value` in
+    every pair that is not stored. Dense inputs are returned unchanged.
+    """
+    if not sparse.issparse(matrix):
+        return matrix
+
+    coo = matrix.tocoo()
+    dense = np.full(matrix.shape, fill_value, dtype=matrix.dtype)
+    dense[coo.row, coo.col] = coo.data
+    return dense
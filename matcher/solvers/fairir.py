@@ -5,7 +5,7 @@ import logging
 import math
 import json
 import psutil
-from .core import SolverException
+from .core import SolverException, reviewers_without_known_affinity
 
 from .basic_gurobi import Basic
 from gurobipy import *
@@ -48,24 +48,30 @@ class FairIR(Basic):
         # TODO: To allow zero score assignment, add small epsilon to all zero valued entries to avoid loss of data
         #     : during sparsification
 
-        conflict_sims = encoder.constraint_matrix.T * (encoder.constraint_matrix <= -1).T ## -1 where constraints are -1, 0 else
         forced_matrix = (encoder.constraint_matrix >= 1).T ## 1 where constraints are 1, 0 else
-        allowed_sims = encoder.aggregate_score_matrix.transpose() * (encoder.constraint_matrix >= 0).T ## unconstrained sims
+        if sparse.issparse(encoder.aggregate_score_matrix):
+            ## sparse encoder: drop conflicted sims without materializing the dense mask
+            scores = sparse.csr_matrix(encoder.aggregate_score_matrix)
+            allowed_sims = (scores - scores.multiply(encoder.constraint_matrix < 0)).T
+        else:
+            conflict_sims = encoder.constraint_matrix.T * (encoder.constraint_matrix <= -1).T ## -1 where constraints are -1, 0 else
+            allowed_sims = encoder.aggregate_score_matrix.transpose() * (encoder.constraint_matrix >= 0).T ## unconstrained sims
         #weights = conflict_sims + allowed_sims ## R x P ## TODO: sparsify weights, build set of sparse tuples? group by paper?
         weights = allowed_sims
 
         # Sparsify weights
         sparse_weights = sparse.coo_matrix(weights)
-        zero_weights = not np.any(weights)
+        sparse_weights.eliminate_zeros()
+        zero_weights = sparse_weights.nnz == 0
 
         if not zero_weights:
             weights_list = sparse_weights.data
             reviewer_idxs = sparse_weights.row
             paper_idxs = sparse_weights.col
         else:
-            weights_list = [0] * np.size(weights)
+            weights_list = [0] * (weights.shape[0] * weights.shape[1])
             reviewer_idxs, paper_idxs = [], []
-            for t in list(product(range(np.size(weights, axis=0)), range(np.size(weights, axis=1)))):
+            for t in list(product(range(weights.shape[0]), range(weights.shape[1]))):
                 reviewer_idxs.append(t[0])
                 paper_idxs.append(t[1])
 
@@ -81,8 +87,8 @@ class FairIR(Basic):
             self.reviewers_by_paper[p].append(r)
 
         self.logger = logger
-        self.n_rev = np.size(weights, axis=0)
-        self.n_pap = np.size(weights, axis=1)
+        self.n_rev = weights.shape[0]
+        self.n_pap = weights.shape[1]
         self.solved = False
         self.loads = maximums
         self.loads_lb = minimums
@@ -111,13 +117,9 @@ class FairIR(Basic):
 
         if not self.allow_zero_score_assignments:
             # Find reviewers with no non-zero affinity edges after constraints are applied and remove their load_lb
-            bad_affinity_reviewers = np.where(
-                np.all(
-                    (encoder.aggregate_score_matrix.T * (encoder.constraint_matrix == 0).T)
-                    == 0,
-                    axis=1,
-                )
-            )[0]
+            bad_affinity_reviewers = reviewers_without_known_affinity(
+                encoder.aggregate_score_matrix, encoder.constraint_matrix
+            )
             logging.debug(
                 "Setting minimum load for {} reviewers to 0 "
                 "because they do not have known affinity with any paper".format(
@@ -163,7 +165,7 @@ class FairIR(Basic):
         for rev_idx, i in enumerate(self.papers_by_reviewer.keys()):
             papers = self.papers_by_reviewer[i]
             for paper_idx, j in enumerate(papers):
-                obj += self.weights[i][j] * self.lp_vars[rev_idx][paper_idx]
+                obj += self.weights_by_rp[(i, j)] * self.lp_vars[rev_idx][paper_idx]
         self.m.setObjective(obj, GRB.MAXIMIZE)
         self._log_and_profile('#info FairIR:Time to set obj %s' % (time.time() - start))
 
@@ -236,7 +238,7 @@ class FairIR(Basic):
         # makespan constraints.
         for p in range(self.n_pap):
             reviewers = self.reviewers_by_paper[p]
-            self.m.addConstr(sum([self.lp_vars[self.r_to_lp_idx[i]][self._paper_number_to_lp_idx(i, p)] * self.weights[i][p]
+            self.m.addConstr(sum([self.lp_vars[self.r_to_lp_idx[i]][self._paper_number_to_lp_idx(i, p)] * self.weights_by_rp[(i, p)]
                                   for i in reviewers]) >= self.makespan,
                              self.ms_constr_name(p))
         self.m.update()
@@ -328,7 +330,7 @@ class FairIR(Basic):
                 constraint_name = self.ms_constr_prefix + str(p)
                 if existing_makespans and constraint_name not in existing_makespans:
                     continue
-                self.m.addConstr(sum([self.lp_vars[self.r_to_lp_idx[i]][self._paper_number_to_lp_idx(i, p)] * self.weights[i][p]
+                self.m.addConstr(sum([self.lp_vars[self.r_to_lp_idx[i]][self._paper_number_to_lp_idx(i, p)] * self.weights_by_rp[(i, p)]
                                     for i in reviewers]) >= new_makespan,
                                 self.ms_constr_prefix + str(p))
             self.m.update()
@@ -413,7 +415,7 @@ class FairIR(Basic):
             Highest feasible makespan value found.
         """
         mn = 0.0
-        mx = np.max(self.weights) * np.max(self.coverages)
+        mx = self.weights.max() * np.max(self.coverages)
         ms = mx
         best = None
         self.change_makespan(ms)
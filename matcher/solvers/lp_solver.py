@@ -0,0 +1,330 @@
+"""
+Solves the fractional assignment of RandomizedSolver as a linear program, instead of
+a min-cost flow with every capacity scaled up.
+
+FractionalLPSolver is initialized with the following arguments:
+
+    "minimums" & "maximums":
+        lists of length #reviewers of the least and most number of reviews each
+        reviewer can be assigned.
+
+    "demands":
+        a list of integers of length #papers representing the number of
+        reviews the paper should be assigned.
+
+    "cost_matrix" & "constraint_matrix":
+        #papers by #reviewers numpy arrays (or scipy.sparse matrices), with the same
+        meaning as for SimpleSolver: costs are truncated to integers, pairs with a
+        constraint of -1 are never assigned, pairs with a constraint of 1 get a cost one
+        less than the least cost, and pairs with a (truncated) cost of 0 are only used if
+        allow_zero_score_assignments is True.
+
+    "limit_matrix":
+        a #papers by #reviewers numpy array (or scipy.sparse matrix) of the largest
+        marginal probability of each pair, already scaled up by "scale" and rounded to
+        integers (see RandomizedSolver.construct_solver).
+
+    "scale":
+        the integer the solution is scaled up by, for the sampling extension.
+
+The LP, with one variable per candidate pair, is
+
+    minimize sum(cost * x) subject to
+        sum of x over the reviewers of each paper == demand,
+        minimum <= sum of x over the papers of each reviewer <= maximum,
+        0 <= x <= limit,
+
+which is the problem of MinMaxSolver with single_solve=True. It is solved unscaled
+with the HiGHS solver of scipy, from sparse constraint matrices. The solution is
+then scaled up and rounded to integers by a small min-cost flow over the fractional
+remainders, which keeps every paper load an exact multiple of the scale and every
+reviewer load within its minimum and maximum, so the rounded solution can be sampled.
+"""
+
+import logging
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+from .core import SolverException, matrix_values
+
+# cost of rounding a pair up in the rounding flow, per unit of remainder
+ROUNDING_COST_SCALE = 1000
+
+# remainders below this (or above 1 minus this) are numerical noise of the LP
+ROUNDING_TOLERANCE = 1e-6
+
+# number of dense matrix entries scanned at a time when collecting the candidate pairs
+PAIR_BLOCK_SIZE = 2 ** 22
+
+
+class FractionalLPSolver:
+    """Solves the fractional assignment problem as a linear program."""
+
+    def __init__(
+        self,
+        minimums,
+        maximums,
+        demands,
+        cost_matrix,
+        constraint_matrix,
+        limit_matrix,
+        scale,
+        allow_zero_score_assignments=False,
+        logger=logging.getLogger(__name__),
+    ):
+        self.minimums = np.asarray(minimums, dtype=np.int64)
+        self.maximums = np.asarray(maximums, dtype=np.int64)
+        self.demands = np.asarray(demands, dtype=np.int64)
+        self.cost_matrix = cost_matrix
+        self.constraint_matrix = constraint_matrix
+        self.limit_matrix = limit_matrix
+        self.scale = scale
+        self.allow_zero_score_assignments = allow_zero_score_assignments
+        self.logger = logger
+        self.num_paps, self.num_revs = np.shape(cost_matrix)
+
+        self.solved = False
+        self.flow_matrix = None
+        self.optimal_cost = None  # LP objective, scaled up by scale
+        self.cost = None
+
+    def _candidate_pairs(self):
+        """
+        Return the (paper indices, reviewer indices, costs, limits) of the pairs that
+        get a variable, ordered by paper and then reviewer, following the rules of
+        SimpleSolver for constraints and (truncated) zero costs. Dense matrices are
+        scanned in blocks of about PAIR_BLOCK_SIZE entries.
+        """
+        if sparse.issparse(self.cost_matrix) or sparse.issparse(
+            self.constraint_matrix
+        ):
+            stored = sparse.csr_matrix(abs(self.cost_matrix)) + abs(
+                sparse.csr_matrix(self.constraint_matrix)
+            )
+            paper_indices, reviewer_indices = stored.nonzero()
+            pairs = self._keep_candidates(
+                paper_indices,
+                reviewer_indices,
+                matrix_values(self.cost_matrix, paper_indices, reviewer_indices),
+                matrix_values(
+                    self.constraint_matrix, paper_indices, reviewer_indices
+                ),
+            )
+        else:
+            block_size = max(1, PAIR_BLOCK_SIZE // max(1, self.num_revs))
+            blocks = []
+            for start in range(0, self.num_paps, block_size):
+                rows = slice(start, start + block_size)
+                block_costs = np.asarray(self.cost_matrix[rows])
+                num_rows = len(block_costs)
+                # every pair of the block, as flat (row-major) offsets
+                offsets = np.arange(num_rows * self.num_revs)
+                blocks.append(
+                    self._keep_candidates(
+                        offsets // self.num_revs + start,
+                        offsets % self.num_revs,
+                        block_costs.ravel(),
+                        np.asarray(self.constraint_matrix[rows]).ravel(),
+                    )
+                )
+            pairs = tuple(np.concatenate(arrays) for arrays in zip(*blocks))
+        paper_indices, reviewer_indices, costs, forced = pairs
+
+        if forced.any():
+            least_cost = (
+                self.cost_matrix.min()
+                if sparse.issparse(self.cost_matrix)
+                else np.min(self.cost_matrix)
+            )
+            costs[forced] = int(least_cost - 1)
+
+        limits = matrix_values(
+            self.limit_matrix, paper_indices, reviewer_indices
+        ).astype(np.int64)
+        return paper_indices, reviewer_indices, costs.astype(float), limits
+
+    def _keep_candidates(self, paper_indices, reviewer_indices, costs, constraints):
+        """
+        Return the (paper indices, reviewer indices, truncated costs, forced) of the
+        given pairs that get a variable.
+        """
+        costs = costs.astype(np.int64)
+        forced = constraints == 1
+        keep = constraints == 0
+        if not self.allow_zero_score_assignments:
+            keep &= costs != 0
+        keep |= forced
+        return (
+            paper_indices[keep],
+            reviewer_indices[keep],
+            costs[keep],
+            forced[keep],
+        )
+
+    def solve(self):
+        """
+        Solve the LP and round its solution to integers at the scale. Returns the
+        #papers by #reviewers flow matrix (scaled up), of the type of the cost matrix.
+        """
+        start_time = time.time()
+        paper_indices, reviewer_indices, costs, limits = self._candidate_pairs()
+        num_pairs = len(paper_indices)
+        self.logger.debug(
+            "Fractional LP with {} pairs started at={}".format(
+                num_pairs, start_time
+            )
+        )
+
+        # variables: one per pair, then one load per reviewer, bounded by its
+        # minimum and maximum
+        pairs = np.arange(num_pairs)
+        reviewers = np.arange(self.num_revs)
+        equalities = sparse.csr_matrix(
+            (
+                np.concatenate(
+                    [np.ones(2 * num_pairs), -np.ones(self.num_revs)]
+                ),
+                (
+                    np.concatenate(
+                        [
+                            paper_indices,
+                            self.num_paps + reviewer_indices,
+                            self.num_paps + reviewers,
+                        ]
+                    ),
+                    np.concatenate([pairs, pairs, num_pairs + reviewers]),
+                ),
+            ),
+            shape=(self.num_paps + self.num_revs, num_pairs + self.num_revs),
+        )
+        lower_bounds = np.concatenate([np.zeros(num_pairs), self.minimums])
+        upper_bounds = np.concatenate([limits / self.scale, self.maximums])
+        result = linprog(
+            np.concatenate([costs, np.zeros(self.num_revs)]),
+            A_eq=equalities,
+            b_eq=np.concatenate([self.demands, np.zeros(self.num_revs)]),
+            bounds=np.column_stack([lower_bounds, upper_bounds]),
+            method="highs",
+        )
+        stop_time = time.time()
+        self.logger.debug(
+            "Fractional LP finished at {} and took {} seconds: {}".format(
+                stop_time, stop_time - start_time, result.message
+            )
+        )
+        if result.status != 0:
+            self.solved = False
+            return None
+
+        self.optimal_cost = result.fun * self.scale
+        flows = self._round_to_scale(
+            paper_indices, reviewer_indices, result.x[:num_pairs], limits
+        )
+        if flows is None:
+            self.logger.debug("Fractional LP solution could not be rounded")
+            self.solved = False
+            return None
+        self.solved = True
+
+        if sparse.issparse(self.cost_matrix):
+            self.flow_matrix = sparse.csr_matrix(
+                (flows, (paper_indices, reviewer_indices)),
+                shape=(self.num_paps, self.num_revs),
+            )
+            self.flow_matrix.eliminate_zeros()
+            self.cost = self.flow_matrix.multiply(self.cost_matrix).sum()
+        else:
+            self.flow_matrix = np.zeros((self.num_paps, self.num_revs))
+            self.flow_matrix[paper_indices, reviewer_indices] = flows
+            self.cost = np.sum(self.flow_matrix * self.cost_matrix)
+        return self.flow_matrix
+
+    def _round_to_scale(self, paper_indices, reviewer_indices, values, limits):
+        """
+        Scale the LP solution up and round each pair down or up, so that every paper
+        load is exactly its scaled demand and every reviewer load stays within its
+        scaled minimum and maximum (and the rounding of its fractional load). Which
+        pairs are rounded up is decided by a min-cost flow from papers to reviewers
+        over the pairs with a fractional scaled value, preferring large remainders.
+        Returns the integer values, or None if no such rounding is found.
+        """
+        from ortools.graph.python import min_cost_flow
+
+        scaled = np.clip(values * self.scale, 0, limits)
+        floors = np.floor(scaled + ROUNDING_TOLERANCE)
+        remainders = scaled - floors
+        fractional = (remainders > ROUNDING_TOLERANCE) & (floors < limits)
+        floors = floors.astype(np.int64)
+
+        # units each paper must still get, and the range each reviewer may get
+        paper_units = self.demands * self.scale - np.bincount(
+            paper_indices, weights=floors, minlength=self.num_paps
+        ).astype(np.int64)
+        reviewer_floors = np.bincount(
+            reviewer_indices, weights=floors, minlength=self.num_revs
+        ).astype(np.int64)
+        reviewer_loads = np.clip(
+            np.bincount(
+                reviewer_indices, weights=scaled, minlength=self.num_revs
+            ),
+            self.minimums * self.scale,
+            self.maximums * self.scale,
+        )
+        reviewer_low = np.maximum(
+            np.floor(reviewer_loads + ROUNDING_TOLERANCE).astype(np.int64)
+            - reviewer_floors,
+            0,
+        )
+        reviewer_high = (
+            np.ceil(reviewer_loads - ROUNDING_TOLERANCE).astype(np.int64)
+            - reviewer_floors
+        )
+        if np.any(paper_units < 0) or np.any(reviewer_high < reviewer_low):
+            return None
+
+        # nodes: papers, then reviewers, then a sink; each reviewer supplies its
+        # lower bound to the sink itself and passes the rest along an arc
+        sink = self.num_paps + self.num_revs
+        tails = np.concatenate(
+            [paper_indices[fractional], self.num_paps + np.arange(self.num_revs)]
+        )
+        heads = np.concatenate(
+            [
+                self.num_paps + reviewer_indices[fractional],
+                np.full(self.num_revs, sink),
+            ]
+        )
+        capacities = np.concatenate(
+            [
+                np.ones(np.count_nonzero(fractional), dtype=np.int64),
+                reviewer_high - reviewer_low,
+            ]
+        )
+        unit_costs = np.concatenate(
+            [
+                -np.rint(
+                    remainders[fractional] * ROUNDING_COST_SCALE
+                ).astype(np.int64),
+                np.zeros(self.num_revs, dtype=np.int64),
+            ]
+        )
+        supplies = np.concatenate(
+            [paper_units, -reviewer_low, [reviewer_low.sum() - paper_units.sum()]]
+        )
+
+        rounding_flow = min_cost_flow.SimpleMinCostFlow()
+        rounding_flow.add_arcs_with_capacity_and_unit_cost(
+            tails, heads, capacities, unit_costs
+        )
+        rounding_flow.set_nodes_supplies(np.arange(sink + 1), supplies)
+        if rounding_flow.solve() != rounding_flow.OPTIMAL:
+            return None
+
+        rounded_up = rounding_flow.flows(
+            np.arange(np.count_nonzero(fractional))
+        )
+        floors[np.flatnonzero(fractional)] += rounded_up
+        return floors
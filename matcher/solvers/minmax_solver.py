@@ -12,11 +12,29 @@ except that the "num_reviews" argument is replaced by "minimums" and "maximums".
         integer representing the minimum/maximum number of reviews a reviewer
         should be assigned.
 
+"single_solve" (optional, False by default) replaces the two SimpleSolvers by a single one,
+which takes the minimums as lower bounds on the reviewer loads (see SimpleSolver). Its
+solution is optimal over all assignments within the minimums and maximums, whereas the
+two-stage solution fixes the optimal assignment of the minimums first.
+
+"candidates_per_paper" & "candidates_per_reviewer" (optional) prune the graphs of both
+SimpleSolvers to the cheapest candidates of each paper/reviewer, widening them until
+the solution is optimal for the full graph (see SimpleSolver).
+
+If the encoder holds scipy.sparse matrices, both SimpleSolvers work on the stored
+edges only and the resulting flow matrix is a scipy.sparse CSR matrix.
+
 """
 import numpy as np
 import logging
+from scipy import sparse
 from .simple_solver import SimpleSolver
-from .core import SolverException
+from .core import (
+    SolverException,
+    densify,
+    matrix_sum,
+    reviewers_without_known_affinity,
+)
 import time
 
 
@@ -32,33 +50,49 @@ class MinMaxSolver:
         allow_zero_score_assignments=False,
         logger=logging.getLogger(__name__),
         limit_matrix=None,
+        candidates_per_paper=None,
+        candidates_per_reviewer=None,
+        single_solve=False,
     ):
 
         self.minimums = minimums
         self.maximums = maximums
         self.demands = demands
         self.cost_matrix = encoder.cost_matrix
+        self.constraint_matrix = encoder.constraint_matrix
         self.allow_zero_score_assignments = allow_zero_score_assignments
-        if limit_matrix is None:
+        self.candidates_per_paper = candidates_per_paper
+        self.candidates_per_reviewer = candidates_per_reviewer
+        self.single_solve = single_solve
+
+        if sparse.issparse(self.cost_matrix):
+            if not self.cost_matrix.count_nonzero():
+                # no known edges at all: fall back to dense random costs, as below
+                self.cost_matrix = np.random.rand(*self.cost_matrix.shape)
+                self.constraint_matrix = densify(self.constraint_matrix)
+                if limit_matrix is not None:
+                    limit_matrix = densify(limit_matrix)
+        elif not self.cost_matrix.any():
+            self.cost_matrix = np.random.rand(*encoder.cost_matrix.shape)
+
+        if limit_matrix is not None:
+            self.limit_matrix = limit_matrix
+        elif sparse.issparse(self.cost_matrix):
+            # a limit of 1 on every stored edge; other pairs never get an arc
+            self.limit_matrix = sparse.csr_matrix(
+                abs(self.cost_matrix) + abs(sparse.csr_matrix(self.constraint_matrix)) != 0,
+                dtype=np.int64,
+            )
+        else:
             self.limit_matrix = np.ones(
                 np.shape(self.cost_matrix), dtype=np.int64
             )
-        else:
-            self.limit_matrix = limit_matrix
-
-        if not self.cost_matrix.any():
-            self.cost_matrix = np.random.rand(*encoder.cost_matrix.shape)
-
-        self.constraint_matrix = encoder.constraint_matrix
 
         if not self.allow_zero_score_assignments:
             # Find reviewers with no known cost edges (non-zero) after constraints are applied and remove their load_lb
-            bad_affinity_reviewers = np.where(
-                np.all(
-                    (self.cost_matrix * (self.constraint_matrix == 0)) == 0,
-                    axis=0,
-                )
-            )[0]
+            bad_affinity_reviewers = reviewers_without_known_affinity(
+                self.cost_matrix, self.constraint_matrix
+            )
             logging.debug(
                 "Setting minimum load for {} reviewers to 0 because "
                 "they do not have known affinity with any paper".format(
@@ -98,9 +132,53 @@ class MinMaxSolver:
         self.logger.debug("Finished checking graph inputs")
 
     def solve(self):
-        """Computes combined solution of two SimpleSolvers"""
+        """Computes the solution with one lower-bounded SimpleSolver, or two SimpleSolvers"""
         self._validate_input_range()
 
+        if self.single_solve:
+            self._solve_lower_bounded()
+        else:
+            self._solve_two_stage()
+
+        if sparse.issparse(self.flow_matrix):
+            self.cost = self.flow_matrix.multiply(self.cost_matrix).sum()
+        else:
+            self.cost = np.sum(self.flow_matrix * self.cost_matrix)
+
+        return self.flow_matrix
+
+    def _solve_lower_bounded(self):
+        """Solve a single SimpleSolver with the minimums as lower bounds on reviewer loads"""
+        start_time = time.time()
+        self.logger.debug("MinMax Solver started at={}".format(start_time))
+        solver = SimpleSolver(
+            self.maximums,
+            self.demands,
+            self.cost_matrix,
+            self.constraint_matrix,
+            allow_zero_score_assignments=self.allow_zero_score_assignments,
+            logger=self.logger,
+            limit_matrix=self.limit_matrix,
+            candidates_per_paper=self.candidates_per_paper,
+            candidates_per_reviewer=self.candidates_per_reviewer,
+            minimums=self.minimums,
+        )
+        self.flow_matrix = solver.solve()
+        stop_time = time.time()
+        self.logger.debug(
+            "MinMax Solver finished at {} and took {} seconds".format(
+                stop_time, stop_time - start_time
+            )
+        )
+
+        self.solved = solver.solved
+        self.optimal_cost = solver.min_cost_flow.optimal_cost()
+
+    def _solve_two_stage(self):
+        """
+        Solve a SimpleSolver for the minimums, then a second one for the rest of the
+        demands within the remaining maximums
+        """
         start_time = time.time()
         self.logger.debug("Min Solver started at={}".format(start_time))
         minimum_solver = SimpleSolver(
@@ -112,6 +190,8 @@ class MinMaxSolver:
             logger=self.logger,
             strict=False,
             limit_matrix=self.limit_matrix,
+            candidates_per_paper=self.candidates_per_paper,
+            candidates_per_reviewer=self.candidates_per_reviewer,
         )  # strict=False prevents errors from being thrown for supply/demand mismatch
         minimum_result = minimum_solver.solve()
         stop_time = time.time()
@@ -123,10 +203,10 @@ class MinMaxSolver:
 
         adjusted_constraints = self.constraint_matrix
         adjusted_limits = self.limit_matrix - minimum_solver.flow_matrix
-        adjusted_maximums = self.maximums - np.sum(
+        adjusted_maximums = self.maximums - matrix_sum(
             minimum_solver.flow_matrix, axis=0
         )
-        adjusted_demands = self.demands - np.sum(
+        adjusted_demands = self.demands - matrix_sum(
             minimum_solver.flow_matrix, axis=1
         )
 
@@ -140,6 +220,8 @@ class MinMaxSolver:
             allow_zero_score_assignments=self.allow_zero_score_assignments,
             logger=self.logger,
             limit_matrix=adjusted_limits,
+            candidates_per_paper=self.candidates_per_paper,
+            candidates_per_reviewer=self.candidates_per_reviewer,
         )
 
         maximum_result = maximum_solver.solve()
@@ -158,6 +240,3 @@ class MinMaxSolver:
         )
 
         self.flow_matrix = minimum_result + maximum_result
-        self.cost = np.sum(self.flow_matrix * self.cost_matrix)
-
-        return self.flow_matrix
@@ -11,9 +11,9 @@ a sampling program written in C.
 import logging
 import numpy as np
 import gurobipy as gp
-from cffi import FFI
-from .core import SolverException
-from .bvn_extension import run_bvn
+from scipy import sparse
+from .core import SampledAssignment, SolverException
+from .bvn_extension import draw_seeds, sample_bvn, sample_bvn_batch
 from .minmax_solver import MinMaxSolver
 
 class PerturbedMaximizationSolver:
@@ -49,9 +49,11 @@ class PerturbedMaximizationSolver:
 
         # Reduce the minimums of reviewers with no known affinity with any paper to 0
         if not self.allow_zero_score_assignments:
-            self.constraint_matrix[
-                np.where(self.cost_matrix == 0)
-            ] = -1
+            # build a new matrix rather than writing into the encoder's, which may
+            # be a read-only memory map
+            self.constraint_matrix = np.where(
+                self.cost_matrix == 0, -1, self.constraint_matrix
+            )
             bad_affinity_reviewers = np.where(
                 np.all(
                     (self.cost_matrix * (self.constraint_matrix >= 0)) == 0,
@@ -352,7 +354,7 @@ class PerturbedMaximizationSolver:
 
         self.logger.debug("[PerturbedMaximization]: Finished checking inputs")
 
-    def sample_assignment(self):
+    def sample_assignment(self, seed=None):
         """
         Sample an assignment from the fractional assignment matrix.
         """
@@ -368,32 +370,15 @@ class PerturbedMaximizationSolver:
     
         # Round the fractional assignment matrix to integers to a certain precision
         # in order to use the sampling program in C. See also the RandomizedSolver.
-        self.precision = 1000000
-        self.rounded_assignment_matrix = np.zeros(
-            (self.num_paps, self.num_revs), dtype=int
-        )
-        for i in range(self.num_paps):
-            for j in range(self.num_revs):
-                self.rounded_assignment_matrix[i][j] = np.round(
-                    self.fractional_assignment_matrix[i][j] * self.precision
-                )
+        self._round_fractional_assignment()
+
+        # Sample with the extension in C, which only reads the pairs with nonzero
+        # fractional assignment
+        self.sampled_assignment_matrix = sample_bvn(
+            sparse.csr_matrix(self.rounded_assignment_matrix), self.precision, seed
+        ).toarray().astype(float)
 
-        # Construct CFFI interface to use the sampling extension in C
-        ffi = FFI()
-        F = self.rounded_assignment_matrix.flatten()
-        Fbuf = ffi.new("int[]", self.num_paps * self.num_revs)
-        for i in range(F.size):
-            Fbuf[i] = F[i]
-        Sbuf = ffi.new("int[]", self.num_revs)
-        for i in range(self.num_revs):
-            Sbuf[i] = 1
-        run_bvn(Fbuf, Sbuf, self.num_paps, self.num_revs, self.precision)
-
-        # Obtain the sampled assignment matrix and compute properties
-        self.sampled_assignment_matrix = np.zeros((self.num_paps, self.num_revs))
-        for i in range(F.size):
-            coords = np.unravel_index(i, (self.num_paps, self.num_revs))
-            self.sampled_assignment_matrix[coords] = Fbuf[i]
+        # Compute properties of the sampled assignment
         self.sampled_assignment_cost = self._compute_expected_cost(self.sampled_assignment_matrix)
         sampled_cost_ratio = 1.0
         if self.deterministic_assignment_cost != 0:
@@ -416,6 +401,66 @@ class PerturbedMaximizationSolver:
                           f"score {-self.sampled_assignment_cost:.6f}, "
                           f"{sampled_cost_ratio:.2%} of the deterministic score")
     
+    def sample_assignments(self, n, seeds=None, max_workers=None):
+        """
+        Draw n assignments from the fractional assignment matrix without solving
+        again, spread over up to max_workers threads. Seeds is a list of n seeds,
+        or a single seed from which they are derived (by default, fresh ones are
+        drawn). Returns a list of SampledAssignment; the sampled assignment of the
+        solver itself is left unchanged.
+        """
+
+        self.logger.debug(f"[PerturbedMaximization]: Sampling {n} assignments ...")
+
+        # The fractional solver must be solved before sampling
+        if not self.solved:
+            self.logger.debug(
+                "[PerturbedMaximization]: ERROR: Fractional solver not solved yet"
+            )
+            raise SolverException("Fractional solver not solved yet")
+        if seeds is None or np.isscalar(seeds):
+            seeds = draw_seeds(n, seeds)
+        if len(seeds) != n:
+            raise SolverException(f"{len(seeds)} seeds given for {n} samples")
+
+        self._round_fractional_assignment()
+        samples = sample_bvn_batch(
+            sparse.csr_matrix(self.rounded_assignment_matrix),
+            self.precision,
+            seeds,
+            max_workers,
+        )
+        draws = []
+        for seed, sample in zip(seeds, samples):
+            assignment = sample.toarray().astype(float)
+            draws.append(SampledAssignment(
+                seed,
+                assignment,
+                self._compute_expected_cost(assignment),
+                self._assignment_is_valid(assignment),
+            ))
+
+        self.logger.debug(
+            "[PerturbedMaximization]: Finished sampling assignments, "
+            f"{sum(draw.valid for draw in draws)} of {n} valid"
+        )
+        return draws
+
+    def _round_fractional_assignment(self):
+        self.precision = 1000000
+        self.rounded_assignment_matrix = np.round(
+            np.asarray(self.fractional_assignment_matrix) * self.precision
+        ).astype(int)
+
+    def _assignment_is_valid(self, assignment):
+        pap_loads = np.sum(assignment, axis=1)
+        rev_loads = np.sum(assignment, axis=0)
+        return bool(
+            np.all(pap_loads == np.array(self.demands))
+            and np.all(rev_loads >= np.array(self.minimums))
+            and np.all(rev_loads <= np.array(self.maximums))
+        )
+
     def _compute_expected_cost(self, assignment):
         expected_cost = 0.0
         for i in range(self.num_paps):
@@ -10,16 +10,46 @@ the CFFI library. This algorithm is detailed in Jecmen et al 2020.
 
 Alternates are also selected probabilistically so that the probability limits
 are maintained even if all alternates are used.
+
+If the encoder holds scipy.sparse matrices, the fractional and sampled assignments
+are kept as scipy.sparse CSR matrices and alternates are only drawn from the stored
+edges. Either way, the sampling extension only receives the pairs with nonzero
+fractional assignment.
+
+The fractional assignment is found by a min-cost flow with every capacity scaled up
+by `one` (fractional_backend="flow", the default), or by solving the LP directly and
+rounding its solution to that scale (fractional_backend="lp", see lp_solver.py). The
+LP finds the optimum over all reviewer loads within the minimums and maximums, like
+single_solve, and so the deterministic baseline is then solved with single_solve.
+
+The optimal deterministic assignment, which only serves get_fraction_of_opt, is solved
+after the fractional assignment. With concurrent_baseline=True it is solved on a
+second thread alongside it instead, which only shortens the run on a machine with
+more than one core; skip_deterministic_baseline=True skips it.
 """
 
 from .minmax_solver import MinMaxSolver
-from .core import SolverException
-from .bvn_extension import run_bvn
+from .lp_solver import FractionalLPSolver
+from .core import (
+    SampledAssignment,
+    SolverException,
+    densify,
+    matrix_sum,
+    matrix_values,
+    reviewers_without_known_affinity,
+)
+from .bvn_extension import draw_seeds, sample_bvn, sample_bvn_batch
 from ortools.linear_solver import pywraplp
-from cffi import FFI
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
 import logging
 import numpy as np
-from itertools import product
+
+# number of non-integral LP values listed in the log
+NON_INTEGRAL_SAMPLE_SIZE = 10
+
+# ways of finding the fractional assignment
+FRACTIONAL_BACKENDS = ("flow", "lp")
 
 
 class RandomizedSolver:
@@ -31,6 +61,12 @@ class RandomizedSolver:
         encoder,
         allow_zero_score_assignments=False,
         logger=logging.getLogger(__name__),
+        candidates_per_paper=None,
+        candidates_per_reviewer=None,
+        single_solve=False,
+        fractional_backend="flow",
+        skip_deterministic_baseline=False,
+        concurrent_baseline=False,
     ):
         self.minimums = minimums
         self.maximums = maximums
@@ -39,24 +75,38 @@ class RandomizedSolver:
         self.num_paps, self.num_revs = self.cost_matrix.shape
         self.allow_zero_score_assignments = allow_zero_score_assignments
         self.logger = logger
+        self.candidates_per_paper = candidates_per_paper
+        self.candidates_per_reviewer = candidates_per_reviewer
+        self.single_solve = single_solve
+        self.fractional_backend = fractional_backend
+        self.skip_deterministic_baseline = skip_deterministic_baseline
+        self.concurrent_baseline = concurrent_baseline
         self.encoder = (
             encoder  # for passing cost and constraint matrices to MinMaxSolver
         )
 
-        if not self.cost_matrix.any():
-            self.cost_matrix = np.random.rand(*encoder.cost_matrix.shape)
-
         self.constraint_matrix = encoder.constraint_matrix
 
         self.prob_limit_matrix = encoder.prob_limit_matrix
 
-        if not self.allow_zero_score_assignments:
-            bad_affinity_reviewers = np.where(
-                np.all(
-                    (self.cost_matrix * (self.constraint_matrix == 0)) == 0,
-                    axis=0,
+        if sparse.issparse(self.cost_matrix):
+            if not self.cost_matrix.count_nonzero():
+                # no known edges at all: fall back to dense random costs, as below
+                self.cost_matrix = np.random.rand(*encoder.cost_matrix.shape)
+                self.constraint_matrix = densify(self.constraint_matrix)
+                self.prob_limit_matrix = densify(
+                    self.prob_limit_matrix,
+                    getattr(encoder, "prob_limit_default", 1.0),
                 )
-            )[0]
+        elif not self.cost_matrix.any():
+            self.cost_matrix = np.random.rand(*encoder.cost_matrix.shape)
+
+        self.sparse = sparse.issparse(self.cost_matrix)
+
+        if not self.allow_zero_score_assignments:
+            bad_affinity_reviewers = reviewers_without_known_affinity(
+                self.cost_matrix, self.constraint_matrix
+            )
             self.logger.debug(
                 "Setting minimum load for {} reviewers to 0 because "
                 "they do not have known affinity with any paper".format(
@@ -83,12 +133,24 @@ class RandomizedSolver:
         self.one = 100000  # precision of fractional assignment
 
         self._check_inputs()
-        self.fractional_assignment_solver = self.construct_solver(
-            self.prob_limit_matrix, self.one
-        )
-        self.deterministic_assignment_solver = self.construct_solver(
-            np.ones_like(self.prob_limit_matrix), 1
-        )
+        if self.fractional_backend == "lp":
+            self.fractional_assignment_solver = self.construct_lp_solver(
+                self.prob_limit_matrix, self.one
+            )
+        else:
+            self.fractional_assignment_solver = self.construct_solver(
+                self.prob_limit_matrix, self.one
+            )
+        self.deterministic_assignment_solver = None
+        if not self.skip_deterministic_baseline:
+            if self.sparse:
+                no_limits = self.prob_limit_matrix.copy()
+                no_limits.data = np.ones_like(no_limits.data)
+            else:
+                no_limits = np.ones_like(self.prob_limit_matrix)
+            self.deterministic_assignment_solver = self.construct_solver(
+                no_limits, 1
+            )
 
     def _check_inputs(self):
         """Validate inputs (e.g. that matrix and array dimensions are correct)"""
@@ -99,9 +161,11 @@ class RandomizedSolver:
             self.constraint_matrix,
             self.prob_limit_matrix,
         ]:
-            if not isinstance(matrix, np.ndarray):
+            if not isinstance(matrix, np.ndarray) and not sparse.issparse(
+                matrix
+            ):
                 raise SolverException(
-                    "cost, constraint, and probability limit matrices must be of type numpy.ndarray"
+                    "cost, constraint, and probability limit matrices must be of type numpy.ndarray or scipy.sparse"
                 )
 
         if (
@@ -137,13 +201,21 @@ class RandomizedSolver:
             )
 
         # check that probabilities are legal
-        if np.any(
-            np.logical_or(
-                self.prob_limit_matrix > 1, self.prob_limit_matrix < 0
-            )
-        ):
+        limits = (
+            self.prob_limit_matrix.data
+            if sparse.issparse(self.prob_limit_matrix)
+            else self.prob_limit_matrix
+        )
+        if np.any(np.logical_or(limits > 1, limits < 0)):
             raise SolverException("Some probability limits are not in [0, 1]")
 
+        if self.fractional_backend not in FRACTIONAL_BACKENDS:
+            raise SolverException(
+                "fractional_backend must be one of {}, not {!r}".format(
+                    ", ".join(FRACTIONAL_BACKENDS), self.fractional_backend
+                )
+            )
+
         self.logger.debug("Finished checking graph inputs")
 
     def _validate_input_range(self):
@@ -169,6 +241,17 @@ class RandomizedSolver:
 
         self.logger.debug("Finished checking if demand is in range")
 
+    def _scaled_limits(self, limit_matrix, scale):
+        """Scale the limits up and round them to integer capacities."""
+        scaled_limits = scale * limit_matrix
+        # round them, since int() would truncate e.g.
+        # 0.29 * 100000 = 28999.999999999996 (or a float32 limit) down by one
+        if sparse.issparse(scaled_limits):
+            scaled_limits.data = np.rint(scaled_limits.data)
+        else:
+            scaled_limits = np.rint(scaled_limits)
+        return scaled_limits
+
     def construct_solver(self, limit_matrix, scale):
         """LP is solved with all probabilities scaled up by scale. Solution is assumed to be integral."""
         self.logger.debug("construct_solver")
@@ -176,7 +259,10 @@ class RandomizedSolver:
         scaled_minimums = scale * np.array(self.minimums)
         scaled_maximums = scale * np.array(self.maximums)
         scaled_demands = scale * np.array(self.demands)
-        scaled_limits = scale * limit_matrix
+        scaled_limits = self._scaled_limits(limit_matrix, scale)
+        # the LP backend solves minimums and demands together, so the deterministic
+        # baseline must too, or get_fraction_of_opt compares different problems
+        single_solve = self.single_solve or self.fractional_backend == "lp"
         solver = MinMaxSolver(
             scaled_minimums,
             scaled_maximums,
@@ -185,11 +271,29 @@ class RandomizedSolver:
             self.allow_zero_score_assignments,
             self.logger,
             scaled_limits,
+            candidates_per_paper=self.candidates_per_paper,
+            candidates_per_reviewer=self.candidates_per_reviewer,
+            single_solve=single_solve,
         )
 
         self.logger.debug("Finished construct_solver")
         return solver
 
+    def construct_lp_solver(self, limit_matrix, scale):
+        """LP is solved unscaled, and its solution rounded to integers at scale."""
+        self.logger.debug("construct_lp_solver")
+        return FractionalLPSolver(
+            self.minimums,
+            self.maximums,
+            self.demands,
+            self.cost_matrix,
+            self.constraint_matrix,
+            self._scaled_limits(limit_matrix, scale),
+            scale,
+            self.allow_zero_score_assignments,
+            self.logger,
+        )
+
     def solve(self):
         self.logger.debug("solve")
 
@@ -199,33 +303,143 @@ class RandomizedSolver:
             self, "fractional_assignment_solver"
         ), "Solver not constructed. Run self.construct_solver(self.probability_limit_matrix) first."
 
-        self.logger.debug("start fractional_assignment_solver")
+        concurrent = (
+            self.concurrent_baseline
+            and self.deterministic_assignment_solver is not None
+        )
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                self.logger.debug("start deterministic_assignment_solver")
+                deterministic_solve = pool.submit(
+                    self.deterministic_assignment_solver.solve
+                )
+                self.logger.debug("start fractional_assignment_solver")
+                result_matrix = self.fractional_assignment_solver.solve()
+                deterministic_solve.result()
+        else:
+            self.logger.debug("start fractional_assignment_solver")
+            result_matrix = self.fractional_assignment_solver.solve()
 
-        result_matrix = self.fractional_assignment_solver.solve()
         self.solved = self.fractional_assignment_solver.solved
-        self.expected_cost = self.fractional_assignment_solver.cost / self.one
         if not self.solved:
             self.logger.debug("fractional_assignment solving failed")
             return
+        self.expected_cost = self.fractional_assignment_solver.cost / self.one
+
+        if self.sparse:
+            self._round_sparse_fractional_assignment(result_matrix)
+        else:
+            self._round_fractional_assignment(result_matrix)
+        if not self.solved:
+            return
+
+        if self.deterministic_assignment_solver is not None:
+            if not concurrent:
+                self.logger.debug("start deterministic_assignment_solver")
+                self.deterministic_assignment_solver.solve()
+            self.opt_solved = self.deterministic_assignment_solver.solved
+            self.opt_cost = self.deterministic_assignment_solver.cost
+
+        self.logger.debug("set alternate_probability_matrix")
+        # set alternate probability to guarantee that
+        # P[(p, r) assigned OR alternate] <= self.prob_limit_matrix[p, r]
+        # by setting P[alternate] = (prob_limit - P[assign]) / (1 - P[assign])
+        if self.sparse:
+            # evaluated on the stored edges of the probability limits, which
+            # include every edge that can carry fractional flow
+            rows, cols = self.prob_limit_matrix.nonzero()
+            limits = matrix_values(self.prob_limit_matrix, rows, cols)
+            fractions = matrix_values(
+                self.fractional_assignment_matrix, rows, cols
+            )
+            alternate_probabilities = np.divide(
+                limits - fractions,
+                1 - fractions,
+                out=np.zeros_like(limits),
+                where=(fractions != 1),
+            )
+            self.alternate_probability_matrix = sparse.csr_matrix(
+                (alternate_probabilities, (rows, cols)),
+                shape=(self.num_paps, self.num_revs),
+            )
+        else:
+            self.alternate_probability_matrix = np.divide(
+                self.prob_limit_matrix - self.fractional_assignment_matrix,
+                1 - self.fractional_assignment_matrix,
+                out=(
+                    np.zeros_like(self.prob_limit_matrix)
+                ),  # if fractional assignment is 1, alternate probability is 0
+                where=(self.fractional_assignment_matrix != 1),
+            )
+
+        self.sample_assignment()
+        self.logger.debug("Finished solve")
+
+        return self.flow_matrix
+
+    def _log_non_integral(self, papers, reviewers, values):
+        """Log the number of non-integral LP values, with the first few of them."""
+        if not len(values):
+            return
+        self.logger.debug(
+            "LP solution not integral at {} cells, e.g. {}".format(
+                len(values),
+                ", ".join(
+                    "{},{} with value of {}".format(paper, reviewer, value)
+                    for paper, reviewer, value in zip(
+                        papers[:NON_INTEGRAL_SAMPLE_SIZE],
+                        reviewers[:NON_INTEGRAL_SAMPLE_SIZE],
+                        values[:NON_INTEGRAL_SAMPLE_SIZE],
+                    )
+                ),
+            )
+        )
 
-        self.logger.debug("start iterating papers and reviewers")
-        self.integer_fractional_assignment_matrix = np.zeros(
-            (self.num_paps, self.num_revs), dtype=np.intc
+    def _round_sparse_fractional_assignment(self, result_matrix):
+        """Round a sparse LP solution to integers, keeping it sparse."""
+        self.logger.debug("start rounding stored edges")
+        result_matrix = sparse.csr_matrix(result_matrix)
+        actual_values = result_matrix.data
+        rounded_values = np.round(actual_values)
+        positions = np.flatnonzero(np.abs(rounded_values - actual_values) > 1e-5)
+        self._log_non_integral(
+            np.searchsorted(result_matrix.indptr, positions, side="right") - 1,
+            result_matrix.indices[positions],
+            actual_values[positions],
         )
-        for i, j in product(range(self.num_paps), range(self.num_revs)):
-            actual_value = result_matrix[i, j]
-            if np.round(actual_value) - actual_value > 1e-5:
-                self.logger.debug(
-                    "LP solution not integral at "
-                    + str(i)
-                    + ","
-                    + str(j)
-                    + " with value of "
-                    + str(actual_value)
-                )
-            self.integer_fractional_assignment_matrix[i, j] = np.round(
-                actual_value
-            )  # assumes that round does not ruin paper load integrality
+        self.integer_fractional_assignment_matrix = sparse.csr_matrix(
+            (
+                rounded_values.astype(np.intc),
+                result_matrix.indices,
+                result_matrix.indptr,
+            ),
+            shape=(self.num_paps, self.num_revs),
+        )
+        self.integer_fractional_assignment_matrix.eliminate_zeros()
+        if not np.all(
+            np.asarray(
+                self.integer_fractional_assignment_matrix.sum(axis=1)
+            ).ravel()
+            % self.one
+            == 0
+        ):
+            self.logger.debug("Paper loads rounded")
+            self.solved = False
+            return
+
+        self.fractional_assignment_matrix = (
+            self.integer_fractional_assignment_matrix / self.one
+        ).tocsr()
+
+    def _round_fractional_assignment(self, result_matrix):
+        """Round a dense LP solution to integers."""
+        self.logger.debug("start rounding papers and reviewers")
+        actual_values = np.asarray(result_matrix)
+        rounded_values = np.round(actual_values)
+        papers, reviewers = np.nonzero(np.abs(rounded_values - actual_values) > 1e-5)
+        self._log_non_integral(papers, reviewers, actual_values[papers, reviewers])
+        # assumes that round does not ruin paper load integrality
+        self.integer_fractional_assignment_matrix = rounded_values.astype(np.intc)
         if not np.all(
             np.sum(self.integer_fractional_assignment_matrix, axis=1)
             % self.one
@@ -239,61 +453,92 @@ class RandomizedSolver:
             self.integer_fractional_assignment_matrix / self.one
         )
 
-        self.logger.debug("start deterministic_assignment_solver")
+    def sample_assignment(self, seed=None):
+        """Sample a deterministic assignment from the fractional assignment"""
+        self.logger.debug("sample_assignment")
 
-        result_matrix = self.deterministic_assignment_solver.solve()
-        self.opt_solved = self.deterministic_assignment_solver.solved
-        self.opt_cost = self.deterministic_assignment_solver.cost
+        assert (
+            self.solved
+        ), "Solver not solved. Run self.solve() before sampling."
 
-        self.logger.debug("set alternate_probability_matrix")
-        # set alternate probability to guarantee that
-        # P[(p, r) assigned OR alternate] <= self.prob_limit_matrix[p, r]
-        # by setting P[alternate] = (prob_limit - P[assign]) / (1 - P[assign])
-        self.alternate_probability_matrix = np.divide(
-            self.prob_limit_matrix - self.fractional_assignment_matrix,
-            1 - self.fractional_assignment_matrix,
-            out=(
-                np.zeros_like(self.prob_limit_matrix)
-            ),  # if fractional assignment is 1, alternate probability is 0
-            where=(self.fractional_assignment_matrix != 1),
+        self.flow_matrix = self._sampled_flow_matrix(
+            sample_bvn(
+                sparse.csr_matrix(self.integer_fractional_assignment_matrix),
+                self.one,
+                seed,
+            )
         )
+        self.cost = self._assignment_cost(self.flow_matrix)
 
-        self.sample_assignment()
-        self.logger.debug("Finished solve")
+        # check that sampled assignment is valid
+        if not self._assignment_is_valid(self.flow_matrix):
+            raise SolverException("Sampled assignment is invalid")
 
-        return self.flow_matrix
+        self.logger.debug("Finished sample_assignment")
 
-    def sample_assignment(self):
-        """Sample a deterministic assignment from the fractional assignment"""
-        self.logger.debug("sample_assignment")
+    def sample_assignments(self, n, seeds=None, max_workers=None):
+        """
+        Draw `n` deterministic assignments from the fractional assignment of the
+        last solve() without solving again, spread over up to `max_workers`
+        threads. `seeds` is a list of `n` seeds, or a single seed from which they
+        are derived (by default, fresh ones are drawn). Returns a list of
+        SampledAssignment; unlike sample_assignment, invalid draws are flagged
+        rather than raised, and the solver's own assignment is left unchanged.
+        """
+        self.logger.debug("sample_assignments")
 
         assert (
             self.solved
         ), "Solver not solved. Run self.solve() before sampling."
 
-        # construct CFFI interface to the sampling extension in C
-        ffi = FFI()
-        F = self.integer_fractional_assignment_matrix.flatten()
-        Fbuf = ffi.new("int[]", self.num_paps * self.num_revs)
-        for i in range(F.size):
-            Fbuf[i] = F[i]
-        Sbuf = ffi.new("int[]", self.num_revs)
-        for i in range(self.num_revs):
-            Sbuf[i] = 1
-
-        run_bvn(Fbuf, Sbuf, self.num_paps, self.num_revs, self.one)
-
-        self.flow_matrix = np.zeros((self.num_paps, self.num_revs))
-        for i in range(F.size):
-            coords = np.unravel_index(i, (self.num_paps, self.num_revs))
-            self.flow_matrix[coords] = Fbuf[i]
+        if seeds is None or np.isscalar(seeds):
+            seeds = draw_seeds(n, seeds)
+        if len(seeds) != n:
+            raise SolverException(
+                "{} seeds given for {} samples".format(len(seeds), n)
+            )
 
-        self.cost = np.sum(self.flow_matrix * self.cost_matrix)
+        samples = sample_bvn_batch(
+            sparse.csr_matrix(self.integer_fractional_assignment_matrix),
+            self.one,
+            seeds,
+            max_workers,
+        )
+        draws = []
+        for seed, sample in zip(seeds, samples):
+            flow_matrix = self._sampled_flow_matrix(sample)
+            draws.append(
+                SampledAssignment(
+                    seed,
+                    flow_matrix,
+                    self._assignment_cost(flow_matrix),
+                    self._assignment_is_valid(flow_matrix),
+                )
+            )
 
-        # check that sampled assignment is valid
-        pap_loads = np.sum(self.flow_matrix, axis=1)
-        rev_loads = np.sum(self.flow_matrix, axis=0)
-        if not (
+        self.logger.debug(
+            "Finished sample_assignments, {} of {} valid".format(
+                sum(draw.valid for draw in draws), n
+            )
+        )
+        return draws
+
+    def _sampled_flow_matrix(self, sample):
+        """Convert a sparse sample of the extension to the solver's matrix type."""
+        if self.sparse:
+            return sample.astype(float)
+        return sample.toarray().astype(float)
+
+    def _assignment_cost(self, flow_matrix):
+        if self.sparse:
+            return flow_matrix.multiply(self.cost_matrix).sum()
+        return np.sum(flow_matrix * self.cost_matrix)
+
+    def _assignment_is_valid(self, flow_matrix):
+        """Whether an assignment meets the paper demands and reviewer loads."""
+        pap_loads = matrix_sum(flow_matrix, axis=1)
+        rev_loads = matrix_sum(flow_matrix, axis=0)
+        return bool(
             np.all(pap_loads == np.array(self.demands))
             and np.all(
                 np.logical_and(
@@ -301,10 +546,7 @@ class RandomizedSolver:
                     rev_loads >= np.array(self.minimums),
                 )
             )
-        ):
-            raise SolverException("Sampled assignment is invalid")
-
-        self.logger.debug("Finished sample_assignment")
+        )
 
     def get_alternates(self, num_alternates):
         """Sample alternates in order to respect probability guarantees"""
@@ -316,6 +558,9 @@ class RandomizedSolver:
 
         rng = np.random.default_rng()
 
+        if self.sparse:
+            return self._get_sparse_alternates(num_alternates, rng)
+
         alternates_by_index = {}
         for i in range(self.num_paps):
             unassigned = []
@@ -333,13 +578,45 @@ class RandomizedSolver:
         self.logger.debug("Finished get_alternates")
         return alternates_by_index
 
+    def _get_sparse_alternates(self, num_alternates, rng):
+        """get_alternates over the stored edges of the sparse matrices only"""
+        alternate_probability_matrix = sparse.csr_matrix(
+            self.alternate_probability_matrix
+        )
+        alternates_by_index = {}
+        for i in range(self.num_paps):
+            start, end = alternate_probability_matrix.indptr[i : i + 2]
+            reviewers = alternate_probability_matrix.indices[start:end]
+            probabilities = alternate_probability_matrix.data[start:end]
+            papers = np.full(len(reviewers), i)
+            flows = matrix_values(self.flow_matrix, papers, reviewers)
+            costs = matrix_values(self.cost_matrix, papers, reviewers)
+
+            unassigned = []
+            for j, probability, flow, cost in zip(
+                reviewers, probabilities, flows, costs
+            ):
+                # only allow j as an alternate with limited probability
+                if flow == 0 and rng.random() < probability:
+                    unassigned.append((cost, j))
+            unassigned.sort()
+            alternates_by_index[i] = [
+                entry[1] for entry in unassigned[:num_alternates]
+            ]
+        self.logger.debug("Finished get_alternates")
+        return alternates_by_index
+
     def get_fraction_of_opt(self):
         """
         Return the fraction of the optimal score achieved by the randomized assignment (in expectation).
-        This is sensible as long as costs = score * -scale.
+        This is sensible as long as costs = score * -scale. Returns None if the deterministic
+        baseline was skipped.
         """
         self.logger.debug("get_fraction_of_opt")
 
+        if self.skip_deterministic_baseline:
+            return None
+
         assert (
             self.solved and self.opt_solved
         ), "Fractional and optimal solvers not solved. Run self.solve() before sampling."
@@ -14,11 +14,11 @@ SimpleSolver is initialized with the following arguments:
         reviews the paper should be assigned.
 
     "cost_matrix":
-        a #reviewers by #papers numpy array representing the cost of
-        each reviewer-paper combination.
+        a #reviewers by #papers numpy array (or scipy.sparse matrix) representing
+        the cost of each reviewer-paper combination.
 
     "constraint_matrix":
-        a #reviewers by #papers numpy array representing
+        a #reviewers by #papers numpy array (or scipy.sparse matrix) representing
         constraints on the match. Each cell can take a value of -1, 0, or 1:
 
         0: no constraint
@@ -35,7 +35,32 @@ SimpleSolver is initialized with the following arguments:
 
     "limit_matrix":
         a #papers by #reviewers numpy array representing the limit on the flow
-        between that reviewer and paper (usually 1)
+        between that reviewer and paper (usually 1). If None, every limit is 1.
+
+    "minimums":
+        None (default) or a list of length #reviewers of the least number of reviews
+        each reviewer must be assigned (num_reviews being the most). The lower bounds
+        are encoded with the standard transformation: each reviewer node supplies its
+        minimum itself, and its arc from the source only carries the reviews between
+        its minimum and its maximum.
+
+    "candidates_per_paper" & "candidates_per_reviewer":
+        None (default) or integers. If set, the graph only gets reviewer -> paper arcs
+        for the cheapest candidates_per_paper reviewers of each paper, the cheapest
+        candidates_per_reviewer papers of each reviewer, and the forced pairs.
+        After each solve, the solution is checked against the left-out pairs (none may
+        have a negative reduced cost under node potentials of the residual graph); if
+        the pruned graph is infeasible or the check fails, both numbers are doubled and
+        the graph is solved again, up to the full graph. The potentials are computed with
+        at most POTENTIAL_PASSES Bellman-Ford passes over the residual arcs; if they have
+        not settled by then, the full graph is solved instead. The optimal cost is thus
+        the same as without pruning, though ties may be broken differently.
+
+When the cost or constraint matrix is a scipy.sparse matrix, arcs are only built
+for its stored edges (pairs with a non-zero cost or a constraint), limits are only
+read at those edges, and the resulting flow matrix is a scipy.sparse CSR matrix.
+Sparse matrices cannot be combined with allow_zero_score_assignments=True, since
+every pair would then be a candidate arc.
 
 
 Node is a namedtuple that is used to represent nodes in the graph:
@@ -60,11 +85,34 @@ from __future__ import print_function, division
 from collections import namedtuple
 import logging
 import numpy as np
+from scipy import sparse
 from ortools.graph.python import min_cost_flow
-from .core import SolverException
+from .core import SolverException, check_candidate_counts, matrix_values
 
 Node = namedtuple("Node", ["number", "index", "supply"])
 
+# number of cost matrix entries scanned at a time when building reviewer -> paper arcs
+ARC_BLOCK_SIZE = 2 ** 22
+
+# most Bellman-Ford passes spent on the potentials of a pruned solution, so that checking
+# it stays a small multiple of building the graph (passes grow with the longest
+# shortest path of the residual graph, usually a few dozen arcs)
+POTENTIAL_PASSES = 64
+
+
+def _ranks_within(groups, keys):
+    """
+    Return the rank of every item among the items of the same group, ordered by
+    `keys` (ties keep their order).
+    """
+    order = np.lexsort((keys, groups))
+    sorted_groups = groups[order]
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order)) - np.searchsorted(
+        sorted_groups, sorted_groups
+    )
+    return ranks
+
 
 class SimpleSolver:
     """Main class that represents the graph"""
@@ -79,6 +127,9 @@ class SimpleSolver:
         logger=logging.getLogger(__name__),
         strict=True,
         limit_matrix=None,
+        candidates_per_paper=None,
+        candidates_per_reviewer=None,
+        minimums=None,
     ):
 
         self.logger = logger
@@ -88,21 +139,34 @@ class SimpleSolver:
         self.solved = False
         self.cost_matrix = cost_matrix
         self.constraint_matrix = constraint_matrix
-        self.flow_matrix = np.zeros(np.shape(self.cost_matrix))
+        self.sparse = sparse.issparse(cost_matrix) or sparse.issparse(
+            constraint_matrix
+        )
+        self.flow_matrix = (
+            sparse.csr_matrix(np.shape(self.cost_matrix))
+            if self.sparse
+            else np.zeros(np.shape(self.cost_matrix))
+        )
         self.num_reviews = num_reviews
+        self.minimums = (
+            np.zeros(len(num_reviews), dtype=np.int64)
+            if minimums is None
+            else np.asarray(minimums).astype(np.int64)
+        )
         self.demands = demands
-        self.num_papers = np.size(cost_matrix, axis=0)
-        self.num_reviewers = np.size(cost_matrix, axis=1)
+        self.num_papers = np.shape(cost_matrix)[0]
+        self.num_reviewers = np.shape(cost_matrix)[1]
         self.current_offset = 0
-        if limit_matrix is None:
-            limit_matrix = np.ones(np.shape(self.cost_matrix), dtype=np.int64)
+        self.limit_matrix = limit_matrix
+        self.candidates_per_paper = candidates_per_paper
+        self.candidates_per_reviewer = candidates_per_reviewer
+        self.pruned = (
+            candidates_per_paper is not None
+            or candidates_per_reviewer is not None
+        )
 
         self._check_inputs(strict)
 
-        self.start_nodes = []
-        self.end_nodes = []
-        self.capacities = []
-        self.costs = []
         self.node_by_number = {}
 
         total_supply = min(sum(self.num_reviews), sum(self.demands))
@@ -110,10 +174,14 @@ class SimpleSolver:
         # -- Add Nodes --
 
         # no index because the source isn't represented in the cost/constraint matrices.
-        self.source_node = self.add_node(index=None, supply=total_supply)
+        # reviewers supply their minimum reviews, the source the rest.
+        self.source_node = self.add_node(
+            index=None, supply=total_supply - self.minimums.sum()
+        )
 
         self.reviewer_nodes = [
-            self.add_node(i) for i in range(self.num_reviewers)
+            self.add_node(i, supply=self.minimums[i])
+            for i in range(self.num_reviewers)
         ]
         self.paper_nodes = [self.add_node(i) for i in range(self.num_papers)]
 
@@ -126,44 +194,72 @@ class SimpleSolver:
 
         # -- Add Edges --
 
-        # connect the source node to all reviewer nodes.
-        for r_node in self.reviewer_nodes:
-            capacity = self.num_reviews[r_node.index]
-            self.add_edge(self.source_node, r_node, capacity, cost=0)
-
-        for r_node in self.reviewer_nodes:
-            for p_node in self.paper_nodes:
-
-                coordinates = (p_node.index, r_node.index)
-                arc_cost = int(self.cost_matrix[coordinates])
-                arc_constraint = self.constraint_matrix[coordinates]
-
-                # a constraint of 0 means there's no constraint, so apply the cost as normal
-                # a constraint of 1 means that this user was explicitly assigned to this paper
-                # a constraint of anything other that 0 or 1 essentially indicates a conflict, so do not add an arc
-                if arc_constraint == 0 and (
-                    self.allow_zero_score_assignments or arc_cost != 0
-                ):
-                    self.add_edge(
-                        r_node, p_node, limit_matrix[coordinates], arc_cost
-                    )
-                elif arc_constraint == 1:
-                    # TODO: this should be handled as a hard constraint
-                    arc_cost = self._least_cost() - 1
-                    self.add_edge(
-                        r_node,
-                        p_node,
-                        limit_matrix[coordinates],
-                        int(arc_cost),
-                    )
-
-        # connect paper nodes to the sink node.
-        for p_node in self.paper_nodes:
-            capacity = self.demands[p_node.index]
-            self.add_edge(p_node, self.sink_node, capacity, cost=0)
-
+        self._add_arcs()
         self.construct_solver()
 
+    def _add_arcs(self):
+        """
+        Set the arcs, as aligned arrays of start and end node numbers, capacities and
+        costs: source -> every reviewer (the reviews beyond its minimum), reviewer -> paper
+        candidates (only the kept ones, if the graph is pruned), every paper -> sink.
+        """
+        first_reviewer = self.source_node.number + 1
+        first_paper = first_reviewer + self.num_reviewers
+
+        if self.pruned:
+            arcs = (
+                self._pruned_sparse_arcs()
+                if self.sparse
+                else self._pruned_dense_arcs()
+            )
+        elif self.sparse:
+            arcs = self._sparse_arcs(self.limit_matrix)
+        else:
+            arcs = self._dense_arcs(self.limit_matrix)
+        paper_indices, reviewer_indices, capacities, costs = arcs
+
+        # the reviewer -> paper arcs follow the source arcs; keep their matrix coordinates
+        # to scatter the solution into the flow matrix
+        self.assignment_arcs = slice(
+            self.num_reviewers, self.num_reviewers + len(paper_indices)
+        )
+        self.arc_paper_indices = paper_indices
+        self.arc_reviewer_indices = reviewer_indices
+
+        reviewer_numbers = np.arange(
+            first_reviewer, first_reviewer + self.num_reviewers
+        )
+        paper_numbers = np.arange(first_paper, first_paper + self.num_papers)
+
+        self.start_nodes = np.concatenate(
+            [
+                np.full(self.num_reviewers, self.source_node.number),
+                first_reviewer + reviewer_indices,
+                paper_numbers,
+            ]
+        ).astype(np.int32)
+        self.end_nodes = np.concatenate(
+            [
+                reviewer_numbers,
+                first_paper + paper_indices,
+                np.full(self.num_papers, self.sink_node.number),
+            ]
+        ).astype(np.int32)
+        self.capacities = np.concatenate(
+            [
+                np.asarray(self.num_reviews).astype(np.int64) - self.minimums,
+                capacities,
+                np.asarray(self.demands).astype(np.int64),
+            ]
+        ).astype(np.int64)
+        self.costs = np.concatenate(
+            [
+                np.zeros(self.num_reviewers, dtype=np.int64),
+                costs,
+                np.zeros(self.num_papers, dtype=np.int64),
+            ]
+        ).astype(np.int64)
+
     def _check_inputs(self, strict):
         """Validate inputs (e.g. that matrix and array dimensions are correct)"""
         self.logger.debug("Checking graph inputs")
@@ -172,11 +268,22 @@ class SimpleSolver:
         num_reviewers = np.size(self.cost_matrix, axis=1)
 
         for matrix in [self.cost_matrix, self.constraint_matrix]:
-            if not isinstance(matrix, np.ndarray):
+            if not isinstance(matrix, np.ndarray) and not sparse.issparse(
+                matrix
+            ):
                 raise SolverException(
-                    "cost and constraint matrices must be of type numpy.ndarray"
+                    "cost and constraint matrices must be of type numpy.ndarray or scipy.sparse"
                 )
 
+        if self.sparse and self.allow_zero_score_assignments:
+            raise SolverException(
+                "sparse cost and constraint matrices cannot be used with allow_zero_score_assignments"
+            )
+
+        check_candidate_counts(
+            self.candidates_per_paper, self.candidates_per_reviewer
+        )
+
         if not np.shape(self.cost_matrix) == np.shape(self.constraint_matrix):
             raise SolverException(
                 "cost {} and constraint {} matrices must be the same shape".format(
@@ -199,8 +306,26 @@ class SimpleSolver:
                 )
             )
 
+        if not len(self.minimums) == num_reviewers:
+            raise SolverException(
+                "minimums must be same length ({}) as number of reviewers ({})".format(
+                    len(self.minimums), num_reviewers
+                )
+            )
+
+        if np.any(self.minimums > np.asarray(self.num_reviews)):
+            raise SolverException(
+                "minimums must not exceed num_reviews for any reviewer"
+            )
+
         supply = sum(self.num_reviews)
         demand = sum(self.demands)
+        if self.minimums.sum() > min(supply, demand):
+            raise SolverException(
+                "Total minimum reviews ({}) must not exceed the total flow ({})".format(
+                    self.minimums.sum(), min(supply, demand)
+                )
+            )
         self.logger.debug(
             "Total supply of reviews is ({}) and total demands are ({})".format(
                 supply, demand
@@ -215,6 +340,348 @@ class SimpleSolver:
 
         self.logger.debug("Finished checking graph inputs")
 
+    def _forced_cost(self):
+        """The cost of forced (constraint == 1) arcs: one less than the least cost."""
+        # TODO: this should be handled as a hard constraint
+        return int(self._least_cost() - 1)
+
+    def _dense_arcs(self, limit_matrix):
+        """
+        Return the (paper indices, reviewer indices, capacities, costs) of the reviewer ->
+        paper arcs, ordered by reviewer and then paper.
+
+        A constraint of 0 means there's no constraint, so the pair gets an arc with its
+        (truncated) cost, unless that cost is 0 and zero score assignments are not allowed.
+        A constraint of 1 means that this user was explicitly assigned to this paper, so
+        the arc gets the forced cost. Any other constraint indicates a conflict: no arc.
+        Reviewers are scanned in blocks of about ARC_BLOCK_SIZE matrix entries.
+        """
+        block_size = max(1, ARC_BLOCK_SIZE // max(1, self.num_papers))
+        forced_cost = None
+        blocks = []
+        for start in range(0, self.num_reviewers, block_size):
+            columns = slice(start, start + block_size)
+            costs = np.asarray(self.cost_matrix[:, columns]).T.astype(np.int64)
+            constraints = np.asarray(self.constraint_matrix[:, columns]).T
+
+            forced = constraints == 1
+            candidates = constraints == 0
+            if not self.allow_zero_score_assignments:
+                candidates &= costs != 0
+            candidates |= forced
+
+            reviewer_offsets, paper_indices = np.nonzero(candidates)
+            arc_costs = costs[reviewer_offsets, paper_indices]
+            arc_forced = forced[reviewer_offsets, paper_indices]
+            if arc_forced.any():
+                if forced_cost is None:
+                    forced_cost = self._forced_cost()
+                arc_costs[arc_forced] = forced_cost
+
+            reviewer_indices = reviewer_offsets + start
+            if limit_matrix is None:
+                capacities = np.ones(len(paper_indices), dtype=np.int64)
+            else:
+                capacities = np.asarray(
+                    limit_matrix[paper_indices, reviewer_indices]
+                ).astype(np.int64)
+            blocks.append((paper_indices, reviewer_indices, capacities, arc_costs))
+
+        if not blocks:
+            return tuple(np.zeros(0, dtype=np.int64) for _ in range(4))
+        return tuple(np.concatenate(arrays) for arrays in zip(*blocks))
+
+    def _sparse_arcs(self, limit_matrix):
+        """
+        Return the (paper indices, reviewer indices, capacities, costs) of the reviewer ->
+        paper arcs for the stored edges of sparse cost/constraint matrices, ordered by
+        paper and then reviewer. The same rules as the dense case apply: unconstrained
+        pairs with a non-zero cost and forced (constraint == 1) pairs get an arc.
+        """
+        candidates = sparse.csr_matrix(abs(self.cost_matrix)) + abs(
+            sparse.csr_matrix(self.constraint_matrix)
+        )
+        paper_indices, reviewer_indices = candidates.nonzero()
+        costs = matrix_values(
+            self.cost_matrix, paper_indices, reviewer_indices
+        ).astype(np.int64)
+        constraints = matrix_values(
+            self.constraint_matrix, paper_indices, reviewer_indices
+        )
+
+        forced = constraints == 1
+        keep = ((constraints == 0) & (costs != 0)) | forced
+        if forced.any():
+            costs[forced] = self._forced_cost()
+
+        paper_indices = paper_indices[keep]
+        reviewer_indices = reviewer_indices[keep]
+        if limit_matrix is None:
+            capacities = np.ones(len(paper_indices), dtype=np.int64)
+        else:
+            capacities = matrix_values(
+                limit_matrix, paper_indices, reviewer_indices
+            ).astype(np.int64)
+        return paper_indices, reviewer_indices, capacities, costs[keep]
+
+    def _candidate_block(self, rows, columns):
+        """
+        Return the (truncated) costs of the pairs in a block of the matrices, as floats
+        with np.inf where an unforced arc would be useless (a conflict, a zero cost when
+        zero score assignments are not allowed, or no capacity), and the forced pairs.
+        """
+        costs = np.asarray(self.cost_matrix[rows, columns]).astype(np.int64)
+        constraints = np.asarray(self.constraint_matrix[rows, columns])
+        eligible = constraints == 0
+        if not self.allow_zero_score_assignments:
+            eligible &= costs != 0
+        if self.limit_matrix is not None:
+            eligible &= (
+                np.asarray(self.limit_matrix[rows, columns]).astype(np.int64) > 0
+            )
+        return np.where(eligible, costs, np.inf), constraints == 1
+
+    def _pruned_dense_arcs(self):
+        """
+        Return the (paper indices, reviewer indices, capacities, costs) of the arcs of a
+        pruned dense graph: each paper's `candidates_per_paper` cheapest reviewers, each
+        reviewer's `candidates_per_reviewer` cheapest papers, and all forced pairs.
+        """
+        selected = []
+        if self.candidates_per_paper is not None:
+            block_size = max(1, ARC_BLOCK_SIZE // max(1, self.num_reviewers))
+            count = min(self.candidates_per_paper, self.num_reviewers)
+            for start in range(0, self.num_papers, block_size):
+                keys, forced = self._candidate_block(
+                    slice(start, start + block_size), slice(None)
+                )
+                best = np.argpartition(keys, count - 1, axis=1)[:, :count]
+                rows = np.broadcast_to(np.arange(len(keys))[:, None], best.shape)
+                kept = np.isfinite(keys[rows, best])
+                selected.append((rows[kept] + start, best[kept]))
+                forced_rows, forced_columns = np.nonzero(forced)
+                selected.append((forced_rows + start, forced_columns))
+
+        if self.candidates_per_reviewer is not None:
+            block_size = max(1, ARC_BLOCK_SIZE // max(1, self.num_papers))
+            count = min(self.candidates_per_reviewer, self.num_papers)
+            for start in range(0, self.num_reviewers, block_size):
+                keys, forced = self._candidate_block(
+                    slice(None), slice(start, start + block_size)
+                )
+                best = np.argpartition(keys, count - 1, axis=0)[:count]
+                columns = np.broadcast_to(np.arange(keys.shape[1]), best.shape)
+                kept = np.isfinite(keys[best, columns])
+                selected.append((best[kept], columns[kept] + start))
+                forced_rows, forced_columns = np.nonzero(forced)
+                selected.append((forced_rows, forced_columns + start))
+
+        paper_indices, reviewer_indices = np.divmod(
+            np.unique(
+                np.concatenate(
+                    [
+                        paper_indices.astype(np.int64) * self.num_reviewers
+                        + reviewer_indices
+                        for paper_indices, reviewer_indices in selected
+                    ]
+                )
+            ),
+            self.num_reviewers,
+        )
+
+        costs = np.asarray(
+            self.cost_matrix[paper_indices, reviewer_indices]
+        ).astype(np.int64)
+        forced = (
+            np.asarray(self.constraint_matrix[paper_indices, reviewer_indices]) == 1
+        )
+        if forced.any():
+            costs[forced] = self._forced_cost()
+        if self.limit_matrix is None:
+            capacities = np.ones(len(paper_indices), dtype=np.int64)
+        else:
+            capacities = np.asarray(
+                self.limit_matrix[paper_indices, reviewer_indices]
+            ).astype(np.int64)
+        return paper_indices, reviewer_indices, capacities, costs
+
+    def _pruned_sparse_arcs(self):
+        """
+        Return the arcs of a pruned sparse graph, selected from the stored edges as in
+        `_pruned_dense_arcs`.
+        """
+        paper_indices, reviewer_indices, capacities, costs = self._sparse_arcs(
+            self.limit_matrix
+        )
+        forced = (
+            matrix_values(self.constraint_matrix, paper_indices, reviewer_indices)
+            == 1
+        )
+        keys = np.where(~forced & (capacities > 0), costs, np.inf)
+
+        kept = forced.copy()
+        if self.candidates_per_paper is not None:
+            kept |= _ranks_within(paper_indices, keys) < self.candidates_per_paper
+        if self.candidates_per_reviewer is not None:
+            kept |= (
+                _ranks_within(reviewer_indices, keys)
+                < self.candidates_per_reviewer
+            )
+        kept &= forced | np.isfinite(keys)
+
+        return (
+            paper_indices[kept],
+            reviewer_indices[kept],
+            capacities[kept],
+            costs[kept],
+        )
+
+    def _residual_potentials(self, flows):
+        """
+        Return node potentials for the current flows: shortest path distances in the
+        residual graph from a virtual root joined to every node at no cost, under which
+        every residual arc has a non-negative reduced cost. Computed with Bellman-Ford,
+        relaxing all arcs at once until the distances settle; returns None if they have
+        not settled after POTENTIAL_PASSES passes.
+        """
+        forward = flows < self.capacities
+        backward = flows > 0
+        tails = np.concatenate([self.start_nodes[forward], self.end_nodes[backward]])
+        heads = np.concatenate([self.end_nodes[forward], self.start_nodes[backward]])
+        costs = np.concatenate([self.costs[forward], -self.costs[backward]])
+
+        # group the arcs by head, to take the least distance through each group at once
+        order = np.argsort(heads, kind="stable")
+        tails, heads, costs = tails[order], heads[order], costs[order]
+        group_heads, group_starts = np.unique(heads, return_index=True)
+
+        potentials = np.zeros(len(self.node_by_number), dtype=np.int64)
+        for _ in range(POTENTIAL_PASSES):
+            if not len(heads):
+                return potentials
+            distances = np.minimum.reduceat(potentials[tails] + costs, group_starts)
+            improved = distances < potentials[group_heads]
+            if not improved.any():
+                return potentials
+            potentials[group_heads[improved]] = distances[improved]
+        return None
+
+    def _count_pruned_violations(self, potentials):
+        """
+        Count the pairs left out of a pruned graph whose arc would have a negative
+        reduced cost under `potentials`, i.e. could still improve the solution.
+        """
+        first_reviewer = self.source_node.number + 1
+        first_paper = first_reviewer + self.num_reviewers
+        reviewer_potentials = potentials[
+            first_reviewer : first_reviewer + self.num_reviewers
+        ]
+        paper_potentials = potentials[first_paper : first_paper + self.num_papers]
+
+        if self.sparse:
+            paper_indices, reviewer_indices, capacities, costs = self._sparse_arcs(
+                self.limit_matrix
+            )
+            in_graph = np.isin(
+                paper_indices.astype(np.int64) * self.num_reviewers
+                + reviewer_indices,
+                self.arc_paper_indices.astype(np.int64) * self.num_reviewers
+                + self.arc_reviewer_indices,
+            )
+            reduced_costs = (
+                costs
+                + reviewer_potentials[reviewer_indices]
+                - paper_potentials[paper_indices]
+            )
+            return int(
+                np.count_nonzero((reduced_costs < 0) & (capacities > 0) & ~in_graph)
+            )
+
+        in_graph = sparse.csr_matrix(
+            (
+                np.ones(len(self.arc_paper_indices), dtype=bool),
+                (self.arc_paper_indices, self.arc_reviewer_indices),
+            ),
+            shape=(self.num_papers, self.num_reviewers),
+        )
+        violations = 0
+        block_size = max(1, ARC_BLOCK_SIZE // max(1, self.num_reviewers))
+        for start in range(0, self.num_papers, block_size):
+            rows = slice(start, start + block_size)
+            keys, _ = self._candidate_block(rows, slice(None))
+            reduced_costs = (
+                keys + reviewer_potentials[None, :] - paper_potentials[rows, None]
+            )
+            violations += np.count_nonzero(
+                (reduced_costs < 0) & ~in_graph[rows].toarray()
+            )
+        return violations
+
+    def _pruned_solution_is_optimal(self, solver_status):
+        """
+        Whether the solution of a pruned graph is also optimal for the full graph: it must
+        be feasible, and no left-out arc may have a negative reduced cost. If the
+        potentials cannot be computed within POTENTIAL_PASSES, the graph is unpruned.
+        """
+        if solver_status != self.min_cost_flow.OPTIMAL:
+            self.logger.debug(
+                "Pruned graph has no optimal solution (status {})".format(
+                    solver_status
+                )
+            )
+            return False
+
+        potentials = self._residual_potentials(
+            self.min_cost_flow.flows(np.arange(self.min_cost_flow.num_arcs()))
+        )
+        if potentials is None:
+            self.logger.debug(
+                "Potentials did not settle in {} passes, solving the full graph".format(
+                    POTENTIAL_PASSES
+                )
+            )
+            self.pruned = False
+            return False
+
+        violations = self._count_pruned_violations(potentials)
+        if violations:
+            self.logger.debug(
+                "{} left-out arcs could improve the pruned solution".format(
+                    violations
+                )
+            )
+        return violations == 0
+
+    def _widen_candidates(self):
+        """
+        Double the number of candidates per paper and per reviewer, up to the number of
+        reviewers and papers.
+        """
+        if self.candidates_per_paper is not None:
+            self.candidates_per_paper = min(
+                max(1, 2 * self.candidates_per_paper), self.num_reviewers
+            )
+        if self.candidates_per_reviewer is not None:
+            self.candidates_per_reviewer = min(
+                max(1, 2 * self.candidates_per_reviewer), self.num_papers
+            )
+
+        if (
+            self.candidates_per_paper is not None
+            and self.candidates_per_paper >= self.num_reviewers
+        ) or (
+            self.candidates_per_reviewer is not None
+            and self.candidates_per_reviewer >= self.num_papers
+        ):
+            # every candidate is kept: this is the full graph
+            self.pruned = False
+
+        self.logger.debug(
+            "Widening candidates to {} per paper and {} per reviewer".format(
+                self.candidates_per_paper, self.candidates_per_reviewer
+            )
+        )
+
     def _check_graph_integrity(self):
         """Ensure that graph arrays are well-formed for use by OR-Tools."""
         self.logger.debug("Checking graph integrity")
@@ -237,14 +704,11 @@ class SimpleSolver:
                 )
             )
 
-        if any([not isinstance(i, int) for i in self.capacities]):
-            raise SolverException(
-                "capacities list may not contain integers of type numpy.int64"
-            )
-
-        if any([not isinstance(i, int) for i in self.costs]):
+        if self.capacities.dtype != np.int64 or self.costs.dtype != np.int64:
             raise SolverException(
-                "costs list may not contain integers of type numpy.int64"
+                "capacities ({}) and costs ({}) must be arrays of type numpy.int64".format(
+                    self.capacities.dtype, self.costs.dtype
+                )
             )
 
     def _boundary_cost(self, boundary_function):
@@ -297,21 +761,6 @@ class SimpleSolver:
             self.current_offset += 1
             return new_node
 
-    def add_edge(self, start_node, end_node, capacity, cost):
-        """
-        Adds an "edge" between `start_node` and `end_node` with the given capacity and cost.
-
-        Edges are represented virtually by the presence of Node numbers in the aligned arrays
-        `self.start_nodes` and `self.end_nodes`; there is no "Edge" object.
-        """
-        self.start_nodes.append(start_node)
-        self.end_nodes.append(end_node)
-
-        # cast `capacity` to Python int because SimpleMinCostFlow can't handle other int types
-        # (e.g. numpy.int64)
-        self.capacities.append(int(capacity))
-        self.costs.append(cost)
-
     def construct_solver(self):
         """
         Constructs the OR-Tools MinCostFlow solver with this SimpleSolver's Nodes and edges.
@@ -320,16 +769,15 @@ class SimpleSolver:
 
         self.min_cost_flow = min_cost_flow.SimpleMinCostFlow()
 
-        for arc_index in range(len(self.start_nodes)):
-            self.min_cost_flow.add_arcs_with_capacity_and_unit_cost(
-                self.start_nodes[arc_index].number,
-                self.end_nodes[arc_index].number,
-                self.capacities[arc_index],
-                self.costs[arc_index],
-            )
+        self.min_cost_flow.add_arcs_with_capacity_and_unit_cost(
+            self.start_nodes, self.end_nodes, self.capacities, self.costs
+        )
 
-        for node in self.node_by_number.values():
-            self.min_cost_flow.set_nodes_supplies(node.number, node.supply)
+        nodes = list(self.node_by_number.values())
+        self.min_cost_flow.set_nodes_supplies(
+            np.array([node.number for node in nodes], dtype=np.int32),
+            np.array([node.supply for node in nodes], dtype=np.int64),
+        )
 
     def solve(self):
         """
@@ -342,27 +790,47 @@ class SimpleSolver:
         ), "Solver not constructed. Run self.construct_solver() first."
         self.cost = 0
         solver_status = self.min_cost_flow.solve()
+        while self.pruned and not self._pruned_solution_is_optimal(solver_status):
+            if self.pruned:
+                self._widen_candidates()
+            self._add_arcs()
+            self.construct_solver()
+            solver_status = self.min_cost_flow.solve()
         if solver_status == self.min_cost_flow.OPTIMAL:
             self.solved = True
-            for i in range(self.min_cost_flow.num_arcs()):
-                self.cost += self.min_cost_flow.flow(
-                    i
-                ) * self.min_cost_flow.unit_cost(i)
-                r_node = self.node_by_number[self.min_cost_flow.tail(i)]
-                p_node = self.node_by_number[self.min_cost_flow.head(i)]
-                flow = self.min_cost_flow.flow(i)
-
-                if (
-                    r_node in self.reviewer_nodes
-                    and p_node in self.paper_nodes
-                ):
-                    self.flow_matrix[p_node.index, r_node.index] = flow
+            flows = self.min_cost_flow.flows(
+                np.arange(self.min_cost_flow.num_arcs())
+            )
+            self.cost = int(np.dot(flows, self.costs))
+
+            assignment_flows = flows[self.assignment_arcs]
+            if self.sparse:
+                return self._sparse_solution(assignment_flows)
+            self.flow_matrix[
+                self.arc_paper_indices, self.arc_reviewer_indices
+            ] = assignment_flows
         else:
             logging.debug("Solver status: {}".format(solver_status))
             self.solved = False
 
         return self.flow_matrix
 
+    def _sparse_solution(self, assignment_flows):
+        """Collect the non-zero reviewer -> paper flows of a solved graph into a CSR matrix."""
+        assigned = assignment_flows != 0
+        self.flow_matrix = sparse.csr_matrix(
+            (
+                assignment_flows[assigned],
+                (
+                    self.arc_paper_indices[assigned],
+                    self.arc_reviewer_indices[assigned],
+                ),
+            ),
+            shape=(self.num_papers, self.num_reviewers),
+            dtype=float,
+        )
+        return self.flow_matrix
+
     def __str__(self):
         return_lines = []
         return_lines.append(
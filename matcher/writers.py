@@ -0,0 +1,111 @@
+"""
+Streaming writers for assignments and alternates.
+
+Both are dicts keyed on forum IDs, with lists of {"aggregate_score", "user"} entries
+(see Encoder.decode_assignments). Records are written to disk a paper at a time, so
+no serialization of the whole result is built in memory.
+
+Formats:
+- `json`: the same document as json.dumps(records, indent=2).
+- `jsonl`: one {"paper_id", "user", "aggregate_score"} object per line.
+- `csv`: headerless "paper_id,user,aggregate_score" rows.
+- `parquet`: columns paper_id, user and aggregate_score (requires pyarrow).
+"""
+
+import csv
+import json
+
+OUTPUT_FORMATS = ["json", "jsonl", "csv", "parquet"]
+
+# number of records per Parquet row group
+PARQUET_BATCH_SIZE = 100000
+
+
+def iter_rows(records_by_forum):
+    """Yield (paper_id, user, aggregate_score) for every entry."""
+    for forum, entries in records_by_forum.items():
+        for entry in entries:
+            yield forum, entry["user"], entry["aggregate_score"]
+
+
+def write_records(records_by_forum, path, output_format="json"):
+    """Write assignments or alternates to `path` in `output_format`."""
+    if output_format == "json":
+        _write_json(records_by_forum, path)
+    elif output_format == "jsonl":
+        _write_jsonl(records_by_forum, path)
+    elif output_format == "csv":
+        _write_csv(records_by_forum, path)
+    elif output_format == "parquet":
+        _write_parquet(records_by_forum, path)
+    else:
+        raise ValueError(
+            "Unknown output format {!r}, use one of {}".format(
+                output_format, OUTPUT_FORMATS
+            )
+        )
+
+
+def _write_json(records_by_forum, path):
+    with open(path, "w") as f:
+        if not records_by_forum:
+            f.write("{}")
+            return
+
+        f.write("{\n")
+        for i, (forum, entries) in enumerate(records_by_forum.items()):
+            if i:
+                f.write(",\n")
+            # the "{\n" ... "\n}" around a single key is the only part to drop
+            f.write(json.dumps({forum: entries}, indent=2)[2:-2])
+        f.write("\n}")
+
+
+def _write_jsonl(records_by_forum, path):
+    with open(path, "w") as f:
+        for paper_id, user, aggregate_score in iter_rows(records_by_forum):
+            f.write(
+                json.dumps(
+                    {
+                        "paper_id": paper_id,
+                        "user": user,
+                        "aggregate_score": aggregate_score,
+                    }
+                )
+            )
+            f.write("\n")
+
+
+def _write_csv(records_by_forum, path):
+    with open(path, "w", newline="") as f:
+        csv.writer(f, lineterminator="\n").writerows(iter_rows(records_by_forum))
+
+
+def _write_parquet(records_by_forum, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("paper_id", pa.string()),
+            ("user", pa.string()),
+            ("aggregate_score", pa.float64()),
+        ]
+    )
+
+    def _table(batch):
+        columns = list(zip(*batch)) or [[] for _ in schema]
+        return pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in iter_rows(records_by_forum):
+            batch.append(row)
+            if len(batch) == PARQUET_BATCH_SIZE:
+                writer.write_table(_table(batch))
+                batch = []
+        if batch:
+            writer.write_table(_table(batch))
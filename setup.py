@@ -33,10 +33,13 @@ setup(
         "gurobipy",
         "kombu>=5.3.0,<6.0",
         "psutil",
-        "scipy"
+        "scipy",
+        "pandas"
     ],
     extras_require={
         "full": ["flower"],
+        "arrow": ["pyarrow"],
+        "yaml": ["pyyaml"],
     },
     zip_safe=False,
 )
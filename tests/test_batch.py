@@ -0,0 +1,133 @@
+import csv
+import itertools
+import json
+import random
+
+from matcher import Matcher
+from matcher.__main__ import (
+    build_parser,
+    get_solver_class,
+    load_inputs,
+    load_match_data,
+)
+from matcher.batch import option_arguments, run_batch, without_edges
+
+
+def _write_inputs(folder):
+    random.seed(0)
+    papers = ["paper{}".format(i) for i in range(6)]
+    reviewers = ["reviewer{}".format(i) for i in range(8)]
+    with open(folder / "scores.csv", "w") as f:
+        for paper, reviewer in itertools.product(papers, reviewers):
+            f.write("{},{},{}\n".format(paper, reviewer, round(random.random(), 3)))
+    with open(folder / "bids.csv", "w") as f:
+        for paper, reviewer in random.sample(
+            list(itertools.product(papers, reviewers)), 20
+        ):
+            f.write("{},{},{}\n".format(paper, reviewer, random.choice([0.5, 1])))
+    with open(folder / "constraints.csv", "w") as f:
+        f.write("paper0,reviewer0,-1\n")
+
+    return {
+        "scores": [str(folder / "scores.csv"), str(folder / "bids.csv")],
+        "weights": [1, 2],
+        "constraints": str(folder / "constraints.csv"),
+        "max_papers_default": 3,
+        "num_reviewers": 2,
+    }
+
+
+def test_option_arguments():
+    assert option_arguments(
+        {"scores": ["a.csv", "b.csv"], "sparse": True, "compact": False, "q": None, "k": 2}
+    ) == ["--scores", "a.csv", "b.csv", "--sparse", "--k", "2"]
+
+
+def test_without_edges():
+    match_data = {
+        "constraints": [("paper0", "reviewer0", -1)],
+        "scores_by_type": {"affinity": {"edges": [("paper0", "reviewer0", 1)], "default": 0}},
+        "probability_limits": 0.5,
+        "logger": None,
+    }
+    assert without_edges(match_data) == {
+        "constraints": [],
+        "scores_by_type": {"affinity": {"default": 0}},
+        "probability_limits": 0.5,
+    }
+
+
+def test_run_batch(tmp_path):
+    options = _write_inputs(tmp_path)
+    output_folder = tmp_path / "batch"
+    rows = run_batch(
+        {
+            "options": options,
+            "output_folder": str(output_folder),
+            "scenarios": [
+                {"name": "minmax"},
+                {"name": "fairflow", "solver": "FairFlow"},
+                {"name": "randomized", "solver": "Randomized", "probability_limits": 0.5},
+                {"name": "weights", "weights": [1, 3], "num_reviewers": 1},
+                {"name": "unsupported", "solver": "FairFlow", "sparse": True},
+            ],
+        },
+        workers=2,
+    )
+
+    assert [row["scenario"] for row in rows] == [
+        "minmax",
+        "fairflow",
+        "randomized",
+        "weights",
+        "unsupported",
+    ]
+    assert [row["status"] for row in rows] == ["Complete"] * 4 + ["Error"]
+    assert 0 < rows[2]["fraction_of_opt"] <= 1
+
+    with open(output_folder / "summary.csv") as f:
+        summary = list(csv.DictReader(f))
+    assert [row["scenario"] for row in summary] == [row["scenario"] for row in rows]
+
+    # a scenario of the batch gives the same assignments as a run on its own
+    args = build_parser().parse_args(
+        option_arguments(dict(options, output_folder=str(tmp_path)))
+    )
+    matcher = Matcher(
+        datasource=load_match_data(args),
+        solver_class=get_solver_class(args.solver),
+    )
+    matcher.run()
+    with open(output_folder / "minmax" / "assignments.json") as f:
+        assert json.load(f) == matcher.assignments
+
+    with open(output_folder / "weights" / "assignments.json") as f:
+        assert all(len(entries) == 1 for entries in json.load(f).values())
+
+
+def test_run_batch_loads_inputs_once(tmp_path, monkeypatch):
+    """Inputs are read and hashed again only for scenarios overriding an input path"""
+    options = _write_inputs(tmp_path)
+    loaded = []
+
+    def _load_inputs(args, **kwargs):
+        loaded.append(args.probability_limits)
+        return load_inputs(args, **kwargs)
+
+    monkeypatch.setattr("matcher.batch.load_inputs", _load_inputs)
+    rows = run_batch(
+        {
+            "options": options,
+            "output_folder": str(tmp_path / "batch"),
+            "scenarios": [
+                {"name": "minmax"},
+                {"name": "weights", "weights": [1, 3], "num_reviewers": 1},
+                {"name": "fairflow", "solver": "FairFlow"},
+                {"name": "randomized", "solver": "Randomized", "probability_limits": 0.5},
+            ],
+        },
+        workers=1,
+    )
+
+    assert [row["status"] for row in rows] == ["Complete"] * 4
+    assert loaded == [None, "0.5"]
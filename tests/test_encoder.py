@@ -7,6 +7,7 @@ from collections import namedtuple
 
 import pytest
 import numpy as np
+import scipy.sparse
 
 from matcher.encoder import Encoder, EncoderError
 from conftest import assert_arrays
@@ -57,7 +58,12 @@ def test_encoder_basic(encoder_context):
     constraints = []
 
     encoder = Encoder(
-        reviewers, papers, constraints, scores_by_type, weight_by_type
+        reviewers,
+        papers,
+        constraints,
+        scores_by_type,
+        weight_by_type,
+        keep_score_matrices=True,
     )
 
     # all values in the bids matrix should be 1.0
@@ -214,7 +220,12 @@ def test_encoder_weighting(encoder_context):
     constraints = []
 
     encoder = Encoder(
-        reviewers, papers, constraints, scores_by_type, weight_by_type
+        reviewers,
+        papers,
+        constraints,
+        scores_by_type,
+        weight_by_type,
+        keep_score_matrices=True,
     )
 
     # all values in the score matrix should be 0.5, because they're unweighted
@@ -465,6 +476,594 @@ def test_encoder_probability_limits(encoder_context):
     assert np.all(encoder.prob_limit_matrix == desired_limits)
 
 
+def test_encoder_from_indexed_edges(encoder_context):
+    """Pre-indexed array input should encode exactly like (ID, ID, value) triples"""
+    papers, reviewers, matrix_shape = encoder_context()
+
+    scores = [
+        (forum, reviewer, (i + 1) / 10)
+        for i, (forum, reviewer) in enumerate(
+            itertools.product(papers, reviewers)
+        )
+        if i % 3
+    ]
+    constraints = [("paper1", "reviewer0", 1), ("paper2", "reviewer3", -1)]
+    prob_limits = [("paper0", "reviewer2", 0.4)]
+
+    def _to_arrays(edges):
+        return (
+            np.array([papers.index(forum) for forum, _, _ in edges]),
+            np.array([reviewers.index(user) for _, user, _ in edges]),
+            np.array([value for _, _, value in edges]),
+        )
+
+    encoder = Encoder(
+        reviewers,
+        papers,
+        constraints,
+        {"mock/-/score_edge": {"edges": scores}},
+        {"mock/-/score_edge": 1},
+        probability_limits=prob_limits,
+    )
+    indexed_encoder = Encoder.from_indexed_edges(
+        reviewers,
+        papers,
+        _to_arrays(constraints),
+        {"mock/-/score_edge": {"edges": _to_arrays(scores)}},
+        {"mock/-/score_edge": 1},
+        probability_limits=_to_arrays(prob_limits),
+    )
+
+    assert np.array_equal(
+        encoder.aggregate_score_matrix, indexed_encoder.aggregate_score_matrix
+    )
+    assert np.array_equal(
+        encoder.constraint_matrix, indexed_encoder.constraint_matrix
+    )
+    assert np.array_equal(
+        encoder.prob_limit_matrix, indexed_encoder.prob_limit_matrix
+    )
+    assert indexed_encoder.prob_limit_matrix[0, 2] == 0.4
+    assert indexed_encoder.constraint_matrix[2, 3] == -1
+
+    # values read from CSV files arrive as strings
+    string_encoder = Encoder(
+        reviewers,
+        papers,
+        [(forum, user, str(value)) for forum, user, value in constraints],
+        {
+            "mock/-/score_edge": {
+                "edges": [
+                    (forum, user, str(value)) for forum, user, value in scores
+                ]
+            }
+        },
+        {"mock/-/score_edge": 1},
+    )
+    assert np.array_equal(
+        encoder.aggregate_score_matrix, string_encoder.aggregate_score_matrix
+    )
+    assert np.array_equal(
+        encoder.constraint_matrix, string_encoder.constraint_matrix
+    )
+
+    for constraints in [
+        [("paper0", "unknown_reviewer", 1)],
+        [("paper0", "reviewer0", 1), ("unknown_paper", "reviewer1", -1)],
+        [(None, "reviewer0", 1)],
+    ]:
+        with pytest.raises(KeyError):
+            Encoder(reviewers, papers, constraints, {}, {})
+
+
+def test_encoder_sparse(encoder_context):
+    """Sparse mode should hold the same values as dense mode on the known edges"""
+    papers, reviewers, matrix_shape = encoder_context(n_reviewers=5, n_papers=4)
+
+    scores_by_type = {
+        "mock/-/score_edge": {
+            "edges": [
+                (forum, reviewer, (i % 7) / 10)
+                for i, (forum, reviewer) in enumerate(
+                    itertools.product(papers, reviewers)
+                )
+                if i % 2
+            ]
+        },
+        "mock/-/bid_edge": {
+            "edges": [
+                ("paper0", "reviewer0", 1),
+                ("paper1", "reviewer2", -1),
+                ("paper3", "reviewer4", 0.5),
+            ]
+        },
+    }
+    weight_by_type = {"mock/-/score_edge": 1, "mock/-/bid_edge": 2}
+    constraints = [("paper2", "reviewer1", -1), ("paper3", "reviewer3", 1)]
+    prob_limits = [("paper0", "reviewer0", 0.0), ("paper1", "reviewer1", 0.5)]
+
+    encoders = [
+        Encoder(
+            reviewers,
+            papers,
+            constraints,
+            scores_by_type,
+            weight_by_type,
+            normalization_types=["mock/-/bid_edge"],
+            probability_limits=prob_limits,
+            sparse=sparse,
+        )
+        for sparse in [False, True]
+    ]
+    dense_encoder, sparse_encoder = encoders
+
+    assert sparse_encoder.aggregate_score_matrix.format == "csr"
+    assert np.allclose(
+        dense_encoder.aggregate_score_matrix,
+        sparse_encoder.aggregate_score_matrix.toarray(),
+    )
+    assert np.allclose(
+        dense_encoder.cost_matrix, sparse_encoder.cost_matrix.toarray()
+    )
+    assert np.array_equal(
+        dense_encoder.constraint_matrix,
+        sparse_encoder.constraint_matrix.toarray(),
+    )
+
+    # limits are stored for every known edge, including explicit zeros
+    limits = sparse_encoder.prob_limit_matrix
+    rows, cols = (
+        (sparse_encoder.aggregate_score_matrix != 0)
+        + (sparse_encoder.constraint_matrix != 0)
+    ).nonzero()
+    assert np.array_equal(
+        np.asarray(limits[rows, cols]).ravel(),
+        dense_encoder.prob_limit_matrix[rows, cols],
+    )
+    assert limits.nnz == len(rows) + 1
+    assert limits[0, 0] == 0.0
+    assert sparse_encoder.prob_limit_default == 1.0
+
+    mock_solution = np.zeros(matrix_shape)
+    mock_solution[0, 1] = mock_solution[1, 3] = mock_solution[3, 3] = 1
+    assert dense_encoder.decode_assignments(
+        mock_solution
+    ) == sparse_encoder.decode_assignments(
+        scipy.sparse.csr_matrix(mock_solution)
+    )
+
+    with pytest.raises(EncoderError):
+        Encoder(
+            reviewers,
+            papers,
+            constraints,
+            {"mock/-/score_edge": {"default": 0.1, "edges": []}},
+            {"mock/-/score_edge": 1},
+            sparse=True,
+        )
+
+
+def test_encoder_memmap(encoder_context, tmp_path):
+    """Memory-mapped matrices should match in-memory ones and be reused by later runs"""
+    papers, reviewers, matrix_shape = encoder_context(n_reviewers=5, n_papers=4)
+
+    scores_by_type = {
+        "mock/-/score_edge": {
+            "edges": [
+                (forum, reviewer, (i % 7) / 10)
+                for i, (forum, reviewer) in enumerate(
+                    itertools.product(papers, reviewers)
+                )
+            ]
+        },
+        "mock/-/bid_edge": {
+            "default": 0.1,
+            "edges": [("paper0", "reviewer0", 1), ("paper1", "reviewer2", -1)],
+        },
+    }
+    weight_by_type = {"mock/-/score_edge": 1, "mock/-/bid_edge": 2}
+    constraints = [("paper2", "reviewer1", -1), ("paper3", "reviewer3", 1)]
+    prob_limits = [("paper1", "reviewer1", 0.5)]
+
+    def _encode(**kwargs):
+        return Encoder(
+            reviewers,
+            papers,
+            constraints,
+            scores_by_type,
+            weight_by_type,
+            normalization_types=["mock/-/bid_edge"],
+            probability_limits=prob_limits,
+            **kwargs
+        )
+
+    dense_encoder = _encode(keep_score_matrices=True)
+    memmap_encoder = _encode(memmap_dir=str(tmp_path), keep_score_matrices=True)
+
+    for name in [
+        "aggregate_score_matrix",
+        "cost_matrix",
+        "constraint_matrix",
+        "prob_limit_matrix",
+    ]:
+        matrix = getattr(memmap_encoder, name)
+        assert isinstance(matrix, np.memmap)
+        assert not matrix.flags.writeable
+        assert np.array_equal(matrix, getattr(dense_encoder, name))
+        assert (tmp_path / (name + ".npy")).exists()
+
+    for score_type, matrix in dense_encoder.score_matrices.items():
+        assert np.array_equal(memmap_encoder.score_matrices[score_type], matrix)
+
+    # the same inputs reopen the stored files instead of encoding again
+    cost_file = tmp_path / "cost_matrix.npy"
+    encoded_at = cost_file.stat().st_mtime_ns
+    reused_encoder = _encode(memmap_dir=str(tmp_path), keep_score_matrices=True)
+    assert cost_file.stat().st_mtime_ns == encoded_at
+    assert reused_encoder.cache_key == memmap_encoder.cache_key
+    assert np.array_equal(
+        reused_encoder.constraint_matrix, dense_encoder.constraint_matrix
+    )
+
+    # a changed score value is encoded again, into the same directory
+    scores_by_type["mock/-/score_edge"]["edges"][0] = ("paper0", "reviewer0", 0.9)
+    changed_encoder = _encode(memmap_dir=str(tmp_path), keep_score_matrices=True)
+    assert changed_encoder.cache_key != memmap_encoder.cache_key
+    assert np.array_equal(
+        changed_encoder.aggregate_score_matrix,
+        _encode(keep_score_matrices=True).aggregate_score_matrix,
+    )
+    assert not np.array_equal(
+        changed_encoder.aggregate_score_matrix, dense_encoder.aggregate_score_matrix
+    )
+
+    # different score types are encoded again
+    reencoded_encoder = Encoder(
+        reviewers, papers, [], {}, {}, memmap_dir=str(tmp_path)
+    )
+    assert not reencoded_encoder.cost_matrix.any()
+    assert not reencoded_encoder.constraint_matrix.any()
+
+    with pytest.raises(EncoderError):
+        _encode(memmap_dir=str(tmp_path), sparse=True)
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_encoder_compact(encoder_context, sparse):
+    """Compact dtypes should keep the values of the default float64/int64 matrices"""
+    papers, reviewers, _ = encoder_context()
+
+    scores_by_type = {
+        "mock/-/score_edge": {
+            "edges": [
+                (forum, reviewer, 0.29 + 0.01 * i)
+                for i, (forum, reviewer) in enumerate(
+                    itertools.product(papers, reviewers)
+                )
+            ]
+        },
+    }
+    weight_by_type = {"mock/-/score_edge": 1}
+    constraints = [("paper0", "reviewer1", -1), ("paper2", "reviewer3", 1)]
+    prob_limits = [("paper1", "reviewer1", 0.29)]
+
+    default_encoder, compact_encoder = [
+        Encoder(
+            reviewers,
+            papers,
+            constraints,
+            scores_by_type,
+            weight_by_type,
+            probability_limits=prob_limits,
+            sparse=sparse,
+            compact=compact,
+        )
+        for compact in [False, True]
+    ]
+
+    assert compact_encoder.constraint_matrix.dtype == np.int8
+    assert compact_encoder.aggregate_score_matrix.dtype == np.float32
+    assert compact_encoder.prob_limit_matrix.dtype == np.float32
+    assert compact_encoder.cost_matrix.dtype == np.int32
+
+    def _dense(matrix):
+        return matrix.toarray() if sparse else matrix
+
+    assert np.array_equal(
+        _dense(compact_encoder.constraint_matrix),
+        _dense(default_encoder.constraint_matrix),
+    )
+    assert np.allclose(
+        _dense(compact_encoder.aggregate_score_matrix),
+        _dense(default_encoder.aggregate_score_matrix),
+    )
+    assert np.allclose(
+        _dense(compact_encoder.prob_limit_matrix),
+        _dense(default_encoder.prob_limit_matrix),
+    )
+    # costs are the rounded integers -29, -30, ... rather than truncated float32 noise
+    assert np.array_equal(
+        _dense(compact_encoder.cost_matrix),
+        np.round(_dense(default_encoder.cost_matrix)),
+    )
+
+
+def test_encoder_compact_without_float64_matrix(encoder_context, monkeypatch):
+    """Compact dense aggregation should sum float64 blocks of rows, never full matrices"""
+    papers, reviewers, matrix_shape = encoder_context(n_reviewers=5, n_papers=7)
+
+    scores_by_type = {
+        "mock/-/affinity": {
+            "default": 0.1,
+            "edges": [
+                (forum, reviewer, 0.01 * i)
+                for i, (forum, reviewer) in enumerate(
+                    itertools.product(papers, reviewers)
+                )
+                if i % 3
+            ]
+            # a repeated edge keeps its last value
+            + [("paper4", "reviewer2", 0.7), ("paper4", "reviewer2", 0.8)],
+        },
+        "mock/-/bid": {
+            "edges": [
+                ("paper0", "reviewer0", 1.0),
+                ("paper3", "reviewer1", 0.5),
+                ("paper6", "reviewer4", -1.0),
+            ]
+        },
+        "mock/-/recommendation": {
+            "edges": [("paper3", "reviewer1", 0.25), ("paper5", "reviewer0", 1)]
+        },
+    }
+    weight_by_type = {
+        "mock/-/affinity": 1,
+        "mock/-/bid": 2,
+        "mock/-/recommendation": 3,
+    }
+    normalization_types = ["mock/-/bid", "mock/-/recommendation"]
+
+    def _encode(compact):
+        return Encoder(
+            reviewers,
+            papers,
+            [("paper0", "reviewer1", -1)],
+            scores_by_type,
+            weight_by_type,
+            normalization_types=normalization_types,
+            compact=compact,
+        )
+
+    default_encoder = _encode(compact=False)
+
+    allocated = []
+    new_matrix = Encoder._new_matrix
+
+    def _spy(encoder, name, fill_value, dtype):
+        allocated.append(np.dtype(dtype))
+        return new_matrix(encoder, name, fill_value, dtype)
+
+    monkeypatch.setattr("matcher.encoder.MEMMAP_BLOCK_SIZE", 10)
+    monkeypatch.setattr(Encoder, "_new_matrix", _spy)
+    compact_encoder = _encode(compact=True)
+
+    assert allocated
+    assert np.dtype(float) not in allocated
+    assert compact_encoder.aggregate_score_matrix.dtype == np.float32
+    assert compact_encoder.aggregate_score_matrix.shape == matrix_shape
+    assert np.allclose(
+        compact_encoder.aggregate_score_matrix,
+        default_encoder.aggregate_score_matrix,
+    )
+    assert np.array_equal(
+        compact_encoder.cost_matrix, np.round(default_encoder.cost_matrix)
+    )
+
+
+def test_encoder_decode_alternates_ties(encoder_context):
+    """Alternates are the best unassigned reviewers, ties going to the lower index"""
+    papers, reviewers, _ = encoder_context(n_reviewers=5, n_papers=2)
+
+    paper_scores = [[0.5, 0.9, 0.5, 0.5, 0.1], [0.2, 0.2, 0.2, 0.2, 0.2]]
+    scores_by_type = {
+        "mock/-/score_edge": {
+            "edges": [
+                (papers[p], reviewers[r], score)
+                for p, row in enumerate(paper_scores)
+                for r, score in enumerate(row)
+            ]
+        }
+    }
+    encoder = Encoder(
+        reviewers, papers, [], scores_by_type, {"mock/-/score_edge": 1}
+    )
+
+    mock_solution = np.asarray([[0, 1, 0, 0, 0], [1, 1, 1, 1, 0]])
+
+    alternates_by_forum = encoder.decode_alternates(mock_solution, 2)
+    assert [entry["user"] for entry in alternates_by_forum["paper0"]] == [
+        "reviewer0",
+        "reviewer2",
+    ]
+    assert [entry["user"] for entry in alternates_by_forum["paper1"]] == [
+        "reviewer4"
+    ]
+    assert alternates_by_forum["paper0"][0]["aggregate_score"] == 0.5
+
+    alternates_by_forum = encoder.decode_alternates(mock_solution, 10)
+    assert [entry["user"] for entry in alternates_by_forum["paper0"]] == [
+        "reviewer0",
+        "reviewer2",
+        "reviewer3",
+        "reviewer4",
+    ]
+
+    assert encoder.decode_alternates(mock_solution, 0) == {
+        "paper0": [],
+        "paper1": [],
+    }
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_encoder_cache(encoder_context, tmp_path, monkeypatch, sparse):
+    """Identical inputs should load the cached matrices instead of encoding them"""
+    papers, reviewers, _ = encoder_context()
+
+    scores_by_type = {
+        "mock/-/score_edge": {
+            "edges": [
+                (forum, reviewer, 0.1 * (i % 5))
+                for i, (forum, reviewer) in enumerate(
+                    itertools.product(papers, reviewers)
+                )
+            ]
+        },
+    }
+    constraints = [("paper0", "reviewer1", -1)]
+    prob_limits = [("paper0", "reviewer0", 0.0)]
+
+    def _encode(weight=1, **kwargs):
+        return Encoder(
+            reviewers,
+            papers,
+            constraints,
+            scores_by_type,
+            {"mock/-/score_edge": weight},
+            probability_limits=prob_limits,
+            sparse=sparse,
+            cache_dir=str(tmp_path),
+            **kwargs
+        )
+
+    def _dense(matrix):
+        return matrix.toarray() if sparse else matrix
+
+    encoder = _encode()
+    assert (tmp_path / encoder.cache_key / "manifest.json").exists()
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("cached matrices were encoded again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Encoder, "_encode_matrices", _fail)
+        cached_encoder = _encode()
+
+    assert cached_encoder.cache_key == encoder.cache_key
+    for name in [
+        "aggregate_score_matrix",
+        "cost_matrix",
+        "constraint_matrix",
+        "prob_limit_matrix",
+    ]:
+        assert np.array_equal(
+            _dense(getattr(cached_encoder, name)), _dense(getattr(encoder, name))
+        )
+    assert cached_encoder.prob_limit_matrix[0, 0] == 0.0
+
+    # different weights, edges or options are encoded under another key
+    assert _encode(weight=2).cache_key != encoder.cache_key
+    scores_by_type["mock/-/score_edge"]["edges"][0] = ("paper0", "reviewer0", 0.9)
+    changed_encoder = _encode()
+    assert changed_encoder.cache_key != encoder.cache_key
+    assert changed_encoder.aggregate_score_matrix[0, 0] == 0.9
+    assert _encode(compact=True).cache_key != changed_encoder.cache_key
+
+    # a caller-supplied key stands in for the edges
+    assert (
+        _encode(cache_key="scores.csv:abc").cache_key
+        == _encode(cache_key="scores.csv:abc").cache_key
+        != _encode(cache_key="scores.csv:def").cache_key
+    )
+
+    with pytest.raises(EncoderError):
+        _encode(memmap_dir=str(tmp_path / "memmap"))
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"sparse": True}, {"compact": True}, {"sparse": True, "compact": True}],
+)
+def test_encoder_streaming_accumulation(encoder_context, tmp_path, options):
+    """Folding score types into the aggregate should give the same matrices as keeping them"""
+    papers, reviewers, _ = encoder_context(n_reviewers=6, n_papers=5)
+
+    scores_by_type = {
+        "mock/-/score_edge": {
+            "edges": [
+                (forum, reviewer, (i % 7) / 7)
+                for i, (forum, reviewer) in enumerate(
+                    itertools.product(papers, reviewers)
+                )
+                if i % 3
+            ]
+            + [("paper0", "reviewer1", 0.3)]  # repeated edge, the last value wins
+        },
+        "mock/-/bid_edge": {
+            "edges": [
+                ("paper0", "reviewer0", 1),
+                ("paper1", "reviewer2", -1),
+                ("paper3", "reviewer4", 0.5),
+            ]
+        },
+        "mock/-/recommendation": {
+            "edges": [("paper2", "reviewer2", 1), ("paper3", "reviewer4", 0)]
+        },
+    }
+    if not options.get("sparse"):
+        scores_by_type["mock/-/recommendation"]["default"] = 0.25
+    weight_by_type = {
+        "mock/-/score_edge": 1,
+        "mock/-/bid_edge": 2,
+        "mock/-/recommendation": 0.5,
+    }
+    normalization_types = ["mock/-/bid_edge", "mock/-/recommendation"]
+
+    encoders = {}
+    for keep_score_matrices in [True, False]:
+        encoders[keep_score_matrices] = Encoder(
+            reviewers,
+            papers,
+            [("paper4", "reviewer5", -1)],
+            scores_by_type,
+            weight_by_type,
+            normalization_types=normalization_types,
+            keep_score_matrices=keep_score_matrices,
+            **options
+        )
+    if not options.get("sparse"):
+        encoders["memmap"] = Encoder(
+            reviewers,
+            papers,
+            [("paper4", "reviewer5", -1)],
+            scores_by_type,
+            weight_by_type,
+            normalization_types=normalization_types,
+            memmap_dir=str(tmp_path),
+            **options
+        )
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "aggregate_score_matrix.npy",
+            "constraint_matrix.npy",
+            "cost_matrix.npy",
+            "manifest.json",
+            "prob_limit_matrix.npy",
+        ]
+
+    def _dense(matrix):
+        return matrix.toarray() if options.get("sparse") else np.asarray(matrix)
+
+    kept_encoder = encoders.pop(True)
+    assert len(kept_encoder.score_matrices) == 3
+    for encoder in encoders.values():
+        assert encoder.score_matrices == {}
+        for name in ["aggregate_score_matrix", "cost_matrix"]:
+            matrix = getattr(encoder, name)
+            assert matrix.dtype == getattr(kept_encoder, name).dtype
+            assert np.array_equal(
+                _dense(matrix), _dense(getattr(kept_encoder, name))
+            )
+
+
 def test_specific_alternates(encoder_context):
     """Test the decode_selected_alternates function"""
     papers, reviewers, matrix_shape = encoder_context()
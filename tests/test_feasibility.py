@@ -0,0 +1,175 @@
+import pytest
+
+from matcher import Matcher
+from matcher.core import KeywordDatasource
+from matcher.encoder import Encoder
+from matcher.feasibility import check_feasibility
+from matcher.profiling import Profiler
+
+REVIEWERS = ["reviewer0", "reviewer1", "reviewer2"]
+PAPERS = ["paper0", "paper1", "paper2"]
+
+
+def encode(scores, constraints=[], probability_limits=[], sparse=False):
+    return Encoder(
+        REVIEWERS,
+        PAPERS,
+        constraints,
+        {"affinity": {"edges": scores}},
+        {"affinity": 1},
+        probability_limits=probability_limits,
+        sparse=sparse,
+    )
+
+
+# every reviewer has a known score with every paper
+ALL_SCORES = [
+    (paper, reviewer, 0.5) for paper in PAPERS for reviewer in REVIEWERS
+]
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_feasible_problem(sparse):
+    report = check_feasibility(
+        encode(ALL_SCORES, sparse=sparse), [1, 1, 1], [2, 2, 2], [2, 2, 2]
+    )
+    assert report.feasible
+    assert report.papers == report.reviewers == []
+
+
+def test_total_demand_out_of_range():
+    report = check_feasibility(encode(ALL_SCORES), [0, 0, 0], [1, 1, 1], [2, 2, 2])
+    assert not report.feasible
+    assert "total demand (6)" in str(report)
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_paper_without_enough_available_reviewers(sparse):
+    # paper0: reviewer0 is a conflict and reviewer1 has no known score
+    scores = [entry for entry in ALL_SCORES if entry[:2] != ("paper0", "reviewer1")]
+    report = check_feasibility(
+        encode(scores, [("paper0", "reviewer0", -1)], sparse=sparse),
+        [0, 0, 0],
+        [3, 3, 3],
+        [2, 2, 2],
+    )
+    assert not report.feasible
+    assert report.papers == ["paper0"]
+    assert report.reviewers == []
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_hall_violation(sparse):
+    # paper0 and paper1 each have one available reviewer, the same one, with one review
+    scores = [
+        ("paper0", "reviewer0", 0.5),
+        ("paper1", "reviewer0", 0.5),
+        ("paper2", "reviewer1", 0.5),
+        ("paper2", "reviewer2", 0.5),
+    ]
+    report = check_feasibility(
+        encode(scores, sparse=sparse), [0, 0, 0], [1, 1, 1], [1, 1, 1]
+    )
+    assert not report.feasible
+    assert sorted(report.papers) == ["paper0", "paper1"]
+    assert "at most 1 of their 2 reviews" in str(report)
+
+
+def test_minimums_cannot_be_met_together():
+    # reviewer0 and reviewer1 need a paper each, but only know paper0 with one review
+    scores = [
+        ("paper0", "reviewer0", 0.5),
+        ("paper0", "reviewer1", 0.5),
+        ("paper1", "reviewer2", 0.5),
+        ("paper2", "reviewer2", 0.5),
+    ]
+    report = check_feasibility(encode(scores), [1, 1, 0], [2, 2, 2], [1, 1, 1])
+    assert not report.feasible
+    assert sorted(report.reviewers) == ["reviewer0", "reviewer1"]
+
+
+def test_forced_assignments_over_maximum():
+    constraints = [("paper0", "reviewer0", 1), ("paper1", "reviewer0", 1)]
+    encoder = encode(ALL_SCORES, constraints)
+    assert check_feasibility(encoder, [0, 0, 0], [1, 3, 3], [1, 1, 1]).feasible
+
+    report = check_feasibility(
+        encoder, [0, 0, 0], [1, 3, 3], [1, 1, 1], forced_assignments=True
+    )
+    assert not report.feasible
+    assert report.reviewers == ["reviewer0"]
+
+
+def test_probability_limits_cap_available_reviewers():
+    encoder = encode(ALL_SCORES, probability_limits=0.5)
+    assert check_feasibility(encoder, [0, 0, 0], [3, 3, 3], [2, 2, 2]).feasible
+
+    report = check_feasibility(
+        encoder, [0, 0, 0], [3, 3, 3], [2, 2, 2], probability_limits=True
+    )
+    assert not report.feasible
+    assert sorted(report.papers) == PAPERS
+
+
+@pytest.mark.parametrize("check", [True, False])
+def test_matcher_skips_solver_of_infeasible_problem(check):
+    profiler = Profiler()
+    test_matcher = Matcher(
+        {
+            "reviewers": REVIEWERS,
+            "papers": PAPERS,
+            "constraints": [("paper0", "reviewer0", -1), ("paper0", "reviewer1", -1)],
+            "scores_by_type": {"affinity": {"edges": ALL_SCORES}},
+            "weight_by_type": {"affinity": 1},
+            "minimums": [0, 0, 0],
+            "maximums": [3, 3, 3],
+            "demands": [2, 2, 2],
+            "check_feasibility": check,
+        },
+        solver_class="MinMax",
+        profiler=profiler,
+    )
+    test_matcher.run()
+    assert test_matcher.get_status() == "No Solution"
+
+    stages = [stage["stage"] for stage in profiler.report()["stages"]]
+    if check:
+        assert stages == ["encode", "check_feasibility"]
+        assert test_matcher.feasibility_report.papers == ["paper0"]
+        assert test_matcher.status_info == {}
+    else:
+        assert "solve" in stages
+
+
+class UncheckedDatasource(KeywordDatasource):
+    """A datasource that, like the service's, does not set check_feasibility."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        del self.check_feasibility
+        self.messages = []
+
+    def set_status(self, status, message, additional_status_info={}):
+        self.messages.append(message)
+
+
+def test_matcher_check_is_opt_in():
+    profiler = Profiler()
+    datasource = UncheckedDatasource(
+        reviewers=REVIEWERS,
+        papers=PAPERS,
+        scores_by_type={"affinity": {"edges": ALL_SCORES}},
+        weight_by_type={"affinity": 1},
+        minimums=[0, 0, 0],
+        maximums=[1, 1, 1],
+        demands=[2, 2, 2],
+    )
+    test_matcher = Matcher(datasource, solver_class="MinMax", profiler=profiler)
+    test_matcher.run()
+    assert test_matcher.get_status() == "No Solution"
+    assert test_matcher.feasibility_report is None
+
+    stages = [stage["stage"] for stage in profiler.report()["stages"]]
+    assert "check_feasibility" not in stages
+    # the solver's own message is kept
+    assert datasource.messages[-1].startswith("Review demand (6)")
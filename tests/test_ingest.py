@@ -0,0 +1,136 @@
+"""
+Unit test suite for `matcher/ingest.py`
+"""
+
+import numpy as np
+import pytest
+
+from matcher.encoder import Encoder, IndexedEdges
+from matcher.ingest import (
+    read_edges,
+    read_edge_files,
+    read_table,
+    write_edges,
+    unique_ids,
+    index_edges,
+)
+
+
+def test_read_edges(tmp_path):
+    """Edge files are parsed into typed columns, with IDs stripped of whitespace"""
+    scores_file = tmp_path / "scores.csv"
+    scores_file.write_text("paper1, reviewer1 ,0.5\npaper2,reviewer1, 1\n")
+
+    frame = read_edges(str(scores_file))
+    assert frame["paper"].tolist() == ["paper1", "paper2"]
+    assert frame["reviewer"].tolist() == ["reviewer1", "reviewer1"]
+    assert frame["value"].dtype == np.float64
+    assert frame["value"].tolist() == [0.5, 1.0]
+
+    constraints_file = tmp_path / "constraints.csv"
+    constraints_file.write_text("paper1,reviewer2,-1\n")
+    frame = read_edges(str(constraints_file), value_dtype=int, strip=False)
+    assert frame["value"].tolist() == [-1]
+
+    empty_file = tmp_path / "empty.csv"
+    empty_file.write_text("")
+    frame = read_edges(str(empty_file))
+    assert len(frame) == 0
+    assert list(frame.columns) == ["paper", "reviewer", "value"]
+
+
+def test_read_edge_files(tmp_path):
+    """Several files are read concurrently and returned in the order given"""
+    paths = []
+    for i in range(3):
+        path = tmp_path / "scores{}.csv".format(i)
+        path.write_text(
+            "".join(
+                "paper{},reviewer{},{}\n".format(p, r, i)
+                for p in range(4)
+                for r in range(5)
+            )
+        )
+        paths.append(str(path))
+
+    frames = read_edge_files(reversed(paths))
+    assert list(frames) == list(reversed(paths))
+    for i, path in enumerate(paths):
+        assert len(frames[path]) == 20
+        assert (frames[path]["value"] == i).all()
+
+    assert unique_ids(*[frame["reviewer"] for frame in frames.values()]) == {
+        "reviewer{}".format(r) for r in range(5)
+    }
+
+
+def test_read_table(tmp_path):
+    max_papers_file = tmp_path / "max_papers.csv"
+    max_papers_file.write_text("reviewer1,3\nreviewer2,0\n")
+
+    frame = read_table(
+        str(max_papers_file),
+        ["reviewer", "max_papers"],
+        {"reviewer": str, "max_papers": int},
+    )
+    assert frame["reviewer"].tolist() == ["reviewer1", "reviewer2"]
+    assert frame["max_papers"].tolist() == [3, 0]
+
+
+def test_index_edges(tmp_path):
+    """IDs are mapped to indexes; edges with unknown IDs are dropped"""
+    scores_file = tmp_path / "scores.csv"
+    scores_file.write_text(
+        "paper1,reviewer2,0.5\npaper0,reviewer0,0.25\npaper1,ghost,1\n"
+    )
+    papers = ["paper0", "paper1"]
+    reviewers = ["reviewer0", "reviewer1", "reviewer2"]
+
+    edges = index_edges(read_edges(str(scores_file)), papers, reviewers)
+    assert isinstance(edges, IndexedEdges)
+    assert edges.paper_idx.tolist() == [1, 0]
+    assert edges.reviewer_idx.tolist() == [2, 0]
+    assert edges.values.tolist() == [0.5, 0.25]
+
+    encoder = Encoder(
+        reviewers,
+        papers,
+        [],
+        {"scores": {"edges": edges}},
+        {"scores": 1},
+    )
+    assert encoder.aggregate_score_matrix.tolist() == [
+        [0.25, 0, 0],
+        [0, 0, 0.5],
+    ]
+
+
+@pytest.mark.parametrize("extension", [".npz", ".parquet", ".feather"])
+def test_binary_edge_files(tmp_path, extension):
+    """Binary edge files should read back as the CSV they were converted from"""
+    if extension != ".npz":
+        pytest.importorskip("pyarrow")
+
+    scores_file = tmp_path / "scores.csv"
+    scores_file.write_text(
+        "paper1,reviewer2,0.5\npaper0,reviewer0,0.25\npaper1,reviewer0,1\n"
+    )
+    csv_frame = read_edges(str(scores_file))
+
+    binary_file = str(tmp_path / ("scores" + extension))
+    write_edges(csv_frame, binary_file)
+    frame = read_edges(binary_file)
+
+    assert frame["paper"].astype(str).tolist() == csv_frame["paper"].tolist()
+    assert (
+        frame["reviewer"].astype(str).tolist() == csv_frame["reviewer"].tolist()
+    )
+    assert frame["value"].tolist() == csv_frame["value"].tolist()
+    assert unique_ids(frame["paper"]) == {"paper0", "paper1"}
+
+    papers = ["paper0", "paper1"]
+    reviewers = ["reviewer0", "reviewer1", "reviewer2"]
+    edges = index_edges(frame, papers, reviewers)
+    csv_edges = index_edges(csv_frame, papers, reviewers)
+    for column, csv_column in zip(edges, csv_edges):
+        assert np.array_equal(column, csv_column)
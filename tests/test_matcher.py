@@ -4,10 +4,15 @@ Verifies that custom loads are being used correctly in the matcher.
 """
 import itertools
 import random
+import subprocess
+import sys
 import pytest
 import logging
 from numpy import testing as nptest
 from matcher import Matcher
+from matcher.core import SOLVER_MAP
+from matcher.profiling import Profiler
+from matcher.solvers import SolverException
 
 
 def test_matcher_basic_minmax():
@@ -78,7 +83,8 @@ def test_matcher_basic_fairflow():
     assert test_matcher.alternates
 
 
-def test_matcher_minmax_fixed_input():
+@pytest.mark.parametrize("compact", [False, True])
+def test_matcher_minmax_fixed_input(compact):
     reviewers = ["reviewer1", "reviewer2", "reviewer3"]
     papers = ["paper1", "paper2", "paper3"]
 
@@ -108,6 +114,7 @@ def test_matcher_minmax_fixed_input():
             "maximums": maximums,
             "demands": demands,
             "num_alternates": 1,
+            "compact": compact,
         },
         solver_class="MinMax",
     )
@@ -127,7 +134,8 @@ def test_matcher_minmax_fixed_input():
     assert test_minmax_matcher.alternates
 
 
-def test_matcher_fairflow_fixed_input():
+@pytest.mark.parametrize("compact", [False, True])
+def test_matcher_fairflow_fixed_input(compact):
     reviewers = ["reviewer1", "reviewer2", "reviewer3"]
     papers = ["paper1", "paper2", "paper3"]
 
@@ -157,6 +165,7 @@ def test_matcher_fairflow_fixed_input():
             "maximums": maximums,
             "demands": demands,
             "num_alternates": 1,
+            "compact": compact,
         },
         solver_class="FairFlow",
     )
@@ -174,3 +183,339 @@ def test_matcher_fairflow_fixed_input():
     )
     assert test_fairflow_matcher.assignments
     assert test_fairflow_matcher.alternates
+
+
+@pytest.mark.parametrize("solver_class", ["MinMax", "Randomized", "FairIR"])
+def test_matcher_sparse_matches_dense(solver_class):
+    reviewers = ["reviewer{}".format(i) for i in range(6)]
+    papers = ["paper{}".format(i) for i in range(4)]
+
+    random.seed(0)
+    scores = [
+        (paper, reviewer, round(random.random(), 2))
+        for paper, reviewer in itertools.product(papers, reviewers)
+        if random.random() < 0.7
+    ]
+
+    costs = {}
+    for sparse in [False, True]:
+        test_matcher = Matcher(
+            {
+                "reviewers": reviewers,
+                "papers": papers,
+                "constraints": [("paper0", "reviewer0", -1)],
+                "scores_by_type": {"affinity": {"edges": scores}},
+                "weight_by_type": {"affinity": 1},
+                "minimums": [0] * len(reviewers),
+                "maximums": [2] * len(reviewers),
+                "demands": [2] * len(papers),
+                "num_alternates": 1,
+                "probability_limits": 1.0,
+                "sparse": sparse,
+            },
+            solver_class=solver_class,
+        )
+        test_matcher.run()
+        assert test_matcher.get_status() == "Complete"
+
+        costs[sparse] = sum(
+            entry["aggregate_score"]
+            for entries in test_matcher.assignments.values()
+            for entry in entries
+        )
+        assert all(
+            entry["user"] != "reviewer0"
+            for entry in test_matcher.assignments.get("paper0", [])
+        )
+
+    assert costs[False] == pytest.approx(costs[True])
+
+
+def test_matcher_sparse_unsupported_solver():
+    test_matcher = Matcher(
+        {
+            "reviewers": ["reviewer1"],
+            "papers": ["paper1"],
+            "scores_by_type": {"affinity": {"edges": [("paper1", "reviewer1", 1)]}},
+            "weight_by_type": {"affinity": 1},
+            "minimums": [0],
+            "maximums": [1],
+            "demands": [1],
+            "sparse": True,
+        },
+        solver_class="FairFlow",
+    )
+    test_matcher.run()
+    assert test_matcher.get_status() == "Error"
+
+
+@pytest.mark.parametrize("solver_class", ["MinMax", "Randomized"])
+def test_matcher_pruned_candidates_match_full(solver_class):
+    reviewers = ["reviewer{}".format(i) for i in range(8)]
+    papers = ["paper{}".format(i) for i in range(10)]
+
+    random.seed(2)
+    scores = [
+        (paper, reviewer, round(random.random(), 2))
+        for paper, reviewer in itertools.product(papers, reviewers)
+    ]
+
+    objectives = {}
+    for candidates in [None, 1]:
+        test_matcher = Matcher(
+            {
+                "reviewers": reviewers,
+                "papers": papers,
+                "constraints": [("paper0", "reviewer0", -1)],
+                "scores_by_type": {"affinity": {"edges": scores}},
+                "weight_by_type": {"affinity": 1},
+                "minimums": [1] * len(reviewers),
+                "maximums": [3] * len(reviewers),
+                "demands": [2] * len(papers),
+                "probability_limits": 0.5,
+                "candidates_per_paper": candidates,
+                "candidates_per_reviewer": candidates,
+            },
+            solver_class=solver_class,
+        )
+        test_matcher.run()
+        assert test_matcher.get_status() == "Complete"
+        if solver_class == "Randomized":
+            # the sampled assignment varies, the optimum it is compared with does not
+            objectives[candidates] = float(
+                test_matcher.status_info["randomized_fraction_of_opt"]
+            )
+        else:
+            objectives[candidates] = sum(
+                entry["aggregate_score"]
+                for entries in test_matcher.assignments.values()
+                for entry in entries
+            )
+
+    assert objectives[1] == pytest.approx(objectives[None])
+
+
+@pytest.mark.parametrize("solver_class", ["MinMax", "Randomized"])
+def test_matcher_single_solve_respects_loads(solver_class):
+    reviewers = ["reviewer{}".format(i) for i in range(4)]
+    papers = ["paper{}".format(i) for i in range(6)]
+
+    random.seed(3)
+    scores = [
+        (paper, reviewer, round(random.random(), 2))
+        for paper, reviewer in itertools.product(papers, reviewers)
+    ]
+
+    test_matcher = Matcher(
+        {
+            "reviewers": reviewers,
+            "papers": papers,
+            "scores_by_type": {"affinity": {"edges": scores}},
+            "weight_by_type": {"affinity": 1},
+            "minimums": [2] * len(reviewers),
+            "maximums": [4] * len(reviewers),
+            "demands": [2] * len(papers),
+            "probability_limits": 0.75,
+            "single_solve": True,
+        },
+        solver_class=solver_class,
+    )
+    test_matcher.run()
+    assert test_matcher.get_status() == "Complete"
+
+    loads = {reviewer: 0 for reviewer in reviewers}
+    for entries in test_matcher.assignments.values():
+        assert len(entries) == 2
+        for entry in entries:
+            loads[entry["user"]] += 1
+    assert all(2 <= load <= 4 for load in loads.values())
+
+
+def test_matcher_bad_candidate_count():
+    test_matcher = Matcher(
+        {
+            "reviewers": ["reviewer1"],
+            "papers": ["paper1"],
+            "scores_by_type": {"affinity": {"edges": [("paper1", "reviewer1", 1)]}},
+            "weight_by_type": {"affinity": 1},
+            "minimums": [0],
+            "maximums": [1],
+            "demands": [1],
+            "candidates_per_paper": 0,
+        },
+        solver_class="MinMax",
+    )
+    with pytest.raises(SolverException, match="candidates_per_paper"):
+        test_matcher.solver_options()
+    test_matcher.run()
+    assert test_matcher.get_status() == "No Solution"
+
+
+def test_matcher_pruning_unsupported_solver():
+    test_matcher = Matcher(
+        {
+            "reviewers": ["reviewer1"],
+            "papers": ["paper1"],
+            "scores_by_type": {"affinity": {"edges": [("paper1", "reviewer1", 1)]}},
+            "weight_by_type": {"affinity": 1},
+            "minimums": [0],
+            "maximums": [1],
+            "demands": [1],
+            "candidates_per_paper": 5,
+        },
+        solver_class="FairFlow",
+    )
+    test_matcher.run()
+    assert test_matcher.get_status() == "Error"
+
+
+@pytest.mark.parametrize(
+    "solver_class", ["MinMax", "FairFlow", "FairSequence", "FairIR"]
+)
+def test_matcher_compact_matches_default(solver_class):
+    reviewers = ["reviewer{}".format(i) for i in range(6)]
+    papers = ["paper{}".format(i) for i in range(4)]
+
+    random.seed(1)
+    scores = [
+        (paper, reviewer, round(random.random(), 2))
+        for paper, reviewer in itertools.product(papers, reviewers)
+    ]
+
+    solutions = {}
+    for compact in [False, True]:
+        test_matcher = Matcher(
+            {
+                "reviewers": reviewers,
+                "papers": papers,
+                "constraints": [("paper0", "reviewer0", -1)],
+                "scores_by_type": {"affinity": {"edges": scores}},
+                "weight_by_type": {"affinity": 1},
+                "minimums": [0] * len(reviewers),
+                "maximums": [2] * len(reviewers),
+                "demands": [2] * len(papers),
+                "num_alternates": 1,
+                "compact": compact,
+            },
+            solver_class=solver_class,
+        )
+        test_matcher.run()
+        assert test_matcher.get_status() == "Complete"
+        solutions[compact] = test_matcher.solution
+
+    nptest.assert_array_equal(solutions[False], solutions[True])
+
+
+def test_matcher_profile(tmp_path):
+    reviewers = ["reviewer1", "reviewer2", "reviewer3"]
+    papers = ["paper1", "paper2", "paper3"]
+    scores = [
+        (paper, reviewer, random.random())
+        for paper, reviewer in itertools.product(papers, reviewers)
+    ]
+
+    profiler = Profiler(cprofile_path=str(tmp_path / "solver.prof"))
+    test_matcher = Matcher(
+        {
+            "reviewers": reviewers,
+            "papers": papers,
+            "scores_by_type": {"affinity": {"edges": scores}},
+            "weight_by_type": {"affinity": 1},
+            "minimums": [1, 1, 1],
+            "maximums": [1, 1, 1],
+            "demands": [1, 1, 1],
+            "num_alternates": 1,
+            "assignments_output": str(tmp_path / "assignments.json"),
+            "alternates_output": str(tmp_path / "alternates.json"),
+        },
+        solver_class="MinMax",
+        profiler=profiler,
+    )
+    test_matcher.run()
+    assert test_matcher.get_status() == "Complete"
+
+    stages = [stage["stage"] for stage in profiler.report()["stages"]]
+    assert stages == [
+        "encode",
+        "check_feasibility",
+        "prepare_solver",
+        "solve",
+        "decode_assignments",
+        "write_assignments",
+        "decode_alternates",
+        "write_alternates",
+    ]
+    assert (tmp_path / "solver.prof").exists()
+
+
+def test_import_matcher_loads_no_solver():
+    """Solver modules and their dependencies are only imported once a solver is selected."""
+    heavy_modules = [
+        "gurobipy",
+        "ortools",
+        "cffi",
+        "psutil",
+        "sortedcontainers",
+        "matcher.solvers.minmax_solver",
+        "matcher.solvers.bvn_extension",
+    ]
+    code = "import sys; from matcher import Matcher; print([m for m in {} if m in sys.modules])".format(
+        heavy_modules
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_solver_map_resolves_solvers():
+    for name in SOLVER_MAP:
+        assert isinstance(SOLVER_MAP[name], type)
+    assert Matcher({"reviewers": [], "papers": []}, "Unknown").solver_name == "MinMax"
+
+
+def test_matcher_fractional_backend_unsupported_solver():
+    test_matcher = Matcher(
+        {
+            "reviewers": ["reviewer1"],
+            "papers": ["paper1"],
+            "scores_by_type": {"affinity": {"edges": [("paper1", "reviewer1", 1)]}},
+            "weight_by_type": {"affinity": 1},
+            "minimums": [0],
+            "maximums": [1],
+            "demands": [1],
+            "fractional_backend": "lp",
+        },
+        solver_class="MinMax",
+    )
+    test_matcher.run()
+    assert test_matcher.get_status() == "Error"
+
+
+def test_matcher_skip_deterministic_baseline(tmp_path):
+    test_matcher = Matcher(
+        {
+            "reviewers": ["reviewer1", "reviewer2"],
+            "papers": ["paper1"],
+            "scores_by_type": {
+                "affinity": {
+                    "edges": [
+                        ("paper1", "reviewer1", 1),
+                        ("paper1", "reviewer2", 0.5),
+                    ]
+                }
+            },
+            "weight_by_type": {"affinity": 1},
+            "minimums": [0, 0],
+            "maximums": [1, 1],
+            "demands": [1],
+            "probability_limits": 0.5,
+            "skip_deterministic_baseline": True,
+            "assignments_output": str(tmp_path / "assignments.json"),
+            "alternates_output": str(tmp_path / "alternates.json"),
+        },
+        solver_class="Randomized",
+    )
+    test_matcher.run()
+    assert test_matcher.get_status() == "Complete"
+    assert "randomized_fraction_of_opt" not in test_matcher.status_info
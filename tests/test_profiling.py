@@ -0,0 +1,78 @@
+import json
+import pstats
+import time
+
+from matcher.profiling import Profiler
+
+
+def test_profiler_records_stages(tmp_path):
+    profiler = Profiler()
+    with profiler.stage("first"):
+        sum(range(1000))
+    with profiler.stage("second"):
+        pass
+
+    path = tmp_path / "profile.json"
+    profiler.write(str(path))
+    report = json.loads(path.read_text())
+
+    assert [stage["stage"] for stage in report["stages"]] == ["first", "second"]
+    for stage in report["stages"]:
+        assert stage["wall_time"] >= 0
+        assert stage["cpu_time"] >= 0
+        assert stage["peak_rss_increase_mb"] >= 0
+        assert stage["process_peak_rss_mb"] > 0
+    assert report["total_wall_time"] >= sum(
+        stage["wall_time"] for stage in report["stages"]
+    )
+
+
+def test_profiler_total_cpu_time_starts_with_profiler():
+    # CPU time spent before the profiler is created is not counted
+    deadline = time.process_time() + 0.2
+    while time.process_time() < deadline:
+        pass
+
+    profiler = Profiler()
+    with profiler.stage("small"):
+        sum(range(1000))
+    report = profiler.report()
+
+    stages_cpu_time = sum(stage["cpu_time"] for stage in report["stages"])
+    assert stages_cpu_time <= report["total_cpu_time"] < 0.1
+
+
+def test_profiler_peak_rss_is_per_stage():
+    profiler = Profiler()
+    with profiler.stage("allocate"):
+        block = bytearray(64 * 2**20)
+        block[:: 4096] = b"x" * len(block[:: 4096])
+    del block
+    with profiler.stage("small"):
+        pass
+
+    allocate, small = profiler.stages
+    assert allocate["peak_rss_increase_mb"] >= 32
+    # the process peak carries over, the increase does not
+    assert small["peak_rss_increase_mb"] < 32
+    assert small["process_peak_rss_mb"] >= allocate["process_peak_rss_mb"]
+
+
+def test_profiler_cprofile(tmp_path):
+    path = tmp_path / "solver.prof"
+    profiler = Profiler(cprofile_path=str(path))
+    with profiler.stage("plain"):
+        pass
+    assert not path.exists()
+
+    with profiler.stage("solve", cprofile=True):
+        sorted(range(1000), reverse=True)
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_profiler_disabled(tmp_path):
+    profiler = Profiler(enabled=False, cprofile_path=str(tmp_path / "solver.prof"))
+    with profiler.stage("solve", cprofile=True):
+        pass
+    assert profiler.report()["stages"] == []
+    assert not (tmp_path / "solver.prof").exists()
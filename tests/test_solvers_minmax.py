@@ -2,7 +2,8 @@
 from collections import namedtuple
 import pytest
 import numpy as np
-from matcher.solvers import MinMaxSolver
+from scipy import sparse
+from matcher.solvers import MinMaxSolver, SimpleSolver, SolverException, simple_solver
 
 encoder = namedtuple("Encoder", ["cost_matrix", "constraint_matrix"])
 
@@ -544,3 +545,217 @@ def test_solver_minmax_avoid_zero_scores_get_no_solution():
 
     res = solver.solve()
     assert solver.solved is False
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_simple_solver_reviewer_paper_arcs(use_sparse, monkeypatch):
+    """Conflicts and zero-cost pairs get no arc, forced pairs get the least cost - 1."""
+    # scan one reviewer at a time, so the dense arcs are built over several blocks
+    monkeypatch.setattr("matcher.solvers.simple_solver.ARC_BLOCK_SIZE", 1)
+    cost_matrix = np.array([[-10.7, 0, -3], [-2, -5, -1], [0, -8, -4]])
+    constraint_matrix = np.array([[0, 0, -1], [1, 0, 0], [0, 0, 0]])
+    limit_matrix = np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+    if use_sparse:
+        cost_matrix, constraint_matrix, limit_matrix = (
+            sparse.csr_matrix(m) for m in (cost_matrix, constraint_matrix, limit_matrix)
+        )
+
+    solver = SimpleSolver(
+        [2, 2, 2],
+        [2, 2, 2],
+        cost_matrix,
+        constraint_matrix,
+        limit_matrix=limit_matrix,
+    )
+
+    source, sink = solver.source_node.number, solver.sink_node.number
+    arcs = {
+        (solver.node_by_number[start].index, solver.node_by_number[end].index): (
+            capacity,
+            cost,
+        )
+        for start, end, capacity, cost in zip(
+            solver.start_nodes, solver.end_nodes, solver.capacities, solver.costs
+        )
+        if start != source and end != sink
+    }
+    # (reviewer, paper): (capacity, cost)
+    assert arcs == {
+        (0, 0): (1, -10),
+        (0, 1): (4, -11),
+        (1, 1): (5, -5),
+        (1, 2): (8, -8),
+        (2, 1): (6, -1),
+        (2, 2): (9, -4),
+    }
+    assert solver.min_cost_flow.num_arcs() == len(solver.start_nodes) == 12
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+@pytest.mark.parametrize(
+    "candidates_per_paper, candidates_per_reviewer", [(1, None), (None, 1), (2, 2)]
+)
+def test_simple_solver_pruned_matches_full(
+    use_sparse, candidates_per_paper, candidates_per_reviewer
+):
+    """A pruned graph, widened as needed, reaches the optimal cost of the full graph."""
+    rng = np.random.default_rng(3)
+    cost_matrix = -np.round(rng.random((12, 8)) * 10, 2)
+    constraint_matrix = np.zeros((12, 8), dtype=int)
+    constraint_matrix[rng.random((12, 8)) < 0.2] = -1
+    constraint_matrix[0, 5] = constraint_matrix[7, 2] = 1
+    if use_sparse:
+        cost_matrix, constraint_matrix = (
+            sparse.csr_matrix(m) for m in (cost_matrix, constraint_matrix)
+        )
+    num_reviews, demands = [3] * 8, [2] * 12
+
+    full_solver = SimpleSolver(num_reviews, demands, cost_matrix, constraint_matrix)
+    full_solver.solve()
+    pruned_solver = SimpleSolver(
+        num_reviews,
+        demands,
+        cost_matrix,
+        constraint_matrix,
+        candidates_per_paper=candidates_per_paper,
+        candidates_per_reviewer=candidates_per_reviewer,
+    )
+    solution = pruned_solver.solve()
+
+    assert full_solver.solved and pruned_solver.solved
+    assert pruned_solver.cost == full_solver.cost
+    solution = solution.toarray() if use_sparse else solution
+    assert solution[0, 5] == solution[7, 2] == 1
+    assert np.all(solution.sum(axis=1) == demands)
+
+
+def test_simple_solver_pruned_widens_infeasible_graph():
+    """Every paper's cheapest reviewer is the same, so one candidate each is infeasible."""
+    cost_matrix = np.array([[-9, -2, -1], [-9, -1, -2], [-9, -2, -1]])
+    constraint_matrix = np.zeros((3, 3), dtype=int)
+
+    solver = SimpleSolver(
+        [1, 1, 1],
+        [1, 1, 1],
+        cost_matrix,
+        constraint_matrix,
+        candidates_per_paper=1,
+    )
+    assert len(solver.arc_paper_indices) == 3
+    solution = solver.solve()
+
+    assert solver.solved
+    assert solver.candidates_per_paper == 2
+    assert solver.cost == -13
+    assert np.all(solution.sum(axis=0) == 1)
+
+
+@pytest.mark.parametrize("count", [0, -1, 1.5, True])
+def test_simple_solver_bad_candidate_counts(count):
+    cost_matrix = np.array([[-9, -2], [-1, -2]])
+    constraint_matrix = np.zeros((2, 2), dtype=int)
+    for candidates in [
+        {"candidates_per_paper": count},
+        {"candidates_per_reviewer": count},
+    ]:
+        with pytest.raises(SolverException, match="at least 1"):
+            SimpleSolver([1, 1], [1, 1], cost_matrix, constraint_matrix, **candidates)
+
+
+def test_simple_solver_widening_stops_at_full_graph():
+    """Widening caps the candidates at the matrix dimensions, which unprunes the graph."""
+    cost_matrix = np.array([[-9, -2, -1], [-9, -1, -2]])
+    constraint_matrix = np.zeros((2, 3), dtype=int)
+    solver = SimpleSolver(
+        [1, 1, 1],
+        [1, 1],
+        cost_matrix,
+        constraint_matrix,
+        candidates_per_paper=2,
+        candidates_per_reviewer=1,
+    )
+    solver._widen_candidates()
+    assert solver.candidates_per_paper == 3
+    assert solver.candidates_per_reviewer == 2
+    assert not solver.pruned
+
+
+def test_simple_solver_pruned_widens_suboptimal_graph():
+    """The pruned graph is feasible, but its solution fails the check and is widened."""
+    cost_matrix = np.array([[-8, -6, -5], [-3, -3, -1], [-1, -1, -2]])
+    constraint_matrix = np.zeros((3, 3), dtype=int)
+
+    solver = SimpleSolver(
+        [1, 1, 1],
+        [1, 1, 1],
+        cost_matrix,
+        constraint_matrix,
+        candidates_per_paper=1,
+        candidates_per_reviewer=1,
+    )
+    status = solver.min_cost_flow.solve()
+    assert status == solver.min_cost_flow.OPTIMAL
+    assert solver.min_cost_flow.optimal_cost() == -11
+    assert not solver._pruned_solution_is_optimal(status)
+
+    solver.solve()
+    assert solver.solved
+    assert solver.candidates_per_paper == solver.candidates_per_reviewer == 2
+    assert solver.cost == -13
+
+
+def test_simple_solver_pruned_falls_back_to_full_graph(monkeypatch):
+    """If the potentials do not settle within the passes, the full graph is solved."""
+    monkeypatch.setattr(simple_solver, "POTENTIAL_PASSES", 0)
+    rng = np.random.default_rng(3)
+    cost_matrix = -np.round(rng.random((12, 8)) * 10, 2)
+    constraint_matrix = np.zeros((12, 8), dtype=int)
+
+    full_solver = SimpleSolver([3] * 8, [2] * 12, cost_matrix, constraint_matrix)
+    full_solver.solve()
+    solver = SimpleSolver(
+        [3] * 8,
+        [2] * 12,
+        cost_matrix,
+        constraint_matrix,
+        candidates_per_paper=2,
+    )
+    solver.solve()
+
+    assert solver.solved and not solver.pruned
+    assert len(solver.arc_paper_indices) == len(full_solver.arc_paper_indices)
+    assert solver.cost == full_solver.cost
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_solver_minmax_single_solve_finds_optimum(use_sparse):
+    """
+    Filling reviewer0's minimum with its best paper first (two-stage) leaves reviewer1
+    its worst paper; a single lower-bounded solve finds the better split.
+    """
+    cost_matrix = np.array([[-10, -10], [-9, -1]])
+    constraint_matrix = np.zeros((2, 2), dtype=int)
+    if use_sparse:
+        cost_matrix, constraint_matrix = (
+            sparse.csr_matrix(m) for m in (cost_matrix, constraint_matrix)
+        )
+
+    solutions = {}
+    for single_solve in [False, True]:
+        solver = MinMaxSolver(
+            [1, 0],
+            [1, 2],
+            [1, 1],
+            encoder(cost_matrix, constraint_matrix),
+            single_solve=single_solve,
+        )
+        solution = solver.solve()
+        assert solver.solved
+        solutions[single_solve] = (
+            solution.toarray() if use_sparse else solution,
+            solver.cost,
+        )
+
+    assert solutions[False][1] == -11
+    assert solutions[True][1] == -19
+    np.testing.assert_array_equal(solutions[True][0], [[0, 1], [1, 0]])
@@ -702,3 +702,24 @@ def test_identical_costs():
     )
     for _ in range(1000):
         check_test_solution(solver, T=1)
+
+
+def test_sample_assignments():
+    """Several draws from one solve are valid and reproducible from their seeds"""
+    p = 5
+    r = 15
+    S = np.random.random((p, r))
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.5)
+    solver = PerturbedMaximizationSolver(
+        [1] * r, [3] * r, [3] * p, encoder(-S, M, Q, 0.5)
+    )
+    solver.solve()
+
+    draws = solver.sample_assignments(4, seeds=[1, 2, 3, 4], max_workers=2)
+    assert [draw.seed for draw in draws] == [1, 2, 3, 4]
+    for draw in draws:
+        assert draw.valid
+        assert draw.cost == pytest.approx(np.sum(draw.assignment * solver.cost_matrix))
+    again = solver.sample_assignments(1, seeds=[3])
+    assert np.array_equal(again[0].assignment, draws[2].assignment)
@@ -1,7 +1,9 @@
 import pytest
 from collections import namedtuple
 import numpy as np
-from matcher.solvers import SolverException, RandomizedSolver
+from scipy import sparse
+from matcher.solvers import SolverException, RandomizedSolver, SimpleSolver, lp_solver
+from matcher.solvers.bvn_extension import draw_seeds, sample_bvn, sample_bvn_batch
 
 cost_scale = 1000
 
@@ -395,6 +397,63 @@ def test_opt_fraction():
     assert solver.get_fraction_of_opt() == 0.6
 
 
+def test_skip_deterministic_baseline():
+    """Skipping the deterministic baseline leaves the randomized assignment unchanged"""
+    S = np.eye(5)
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.5)
+    solvers = [
+        RandomizedSolver(
+            [0, 0, 0, 0, 0],
+            [1, 1, 1, 1, 1],
+            [1, 1, 1, 1, 1],
+            encoder(-S, M, Q),
+            True,  # allow zero score assignment
+            skip_deterministic_baseline=skip,
+        )
+        for skip in [False, True]
+    ]
+    for solver in solvers:
+        solver.solve()
+
+    with_baseline, without_baseline = solvers
+    assert without_baseline.deterministic_assignment_solver is None
+    assert without_baseline.solved and not without_baseline.opt_solved
+    assert without_baseline.get_fraction_of_opt() is None
+    assert with_baseline.get_fraction_of_opt() == 0.5
+    assert np.array_equal(
+        with_baseline.fractional_assignment_matrix,
+        without_baseline.fractional_assignment_matrix,
+    )
+    assert without_baseline.expected_cost == with_baseline.expected_cost
+
+
+def test_concurrent_baseline():
+    """Solving the deterministic baseline on a second thread gives the same results"""
+    S = np.eye(5)
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.5)
+    solvers = [
+        RandomizedSolver(
+            [0, 0, 0, 0, 0],
+            [1, 1, 1, 1, 1],
+            [1, 1, 1, 1, 1],
+            encoder(-S, M, Q),
+            True,  # allow zero score assignment
+            concurrent_baseline=concurrent,
+        )
+        for concurrent in [False, True]
+    ]
+    for solver in solvers:
+        solver.solve()
+
+    sequential, concurrent = solvers
+    assert concurrent.solved and concurrent.opt_solved
+    assert concurrent.opt_cost == sequential.opt_cost
+    assert concurrent.expected_cost == sequential.expected_cost
+    assert concurrent.get_fraction_of_opt() == sequential.get_fraction_of_opt() == 0.5
+
+
 def test_identical_costs():
     """Test that LP is integral when all costs identical"""
     S = np.transpose(np.array([[1.0, 1], [1, 1], [1, 1], [1, 1]]))
@@ -405,3 +464,255 @@ def test_identical_costs():
     )
     for _ in range(1000):
         check_test_solution(solver, T=1)
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_round_fractional_assignment(use_sparse, caplog):
+    """LP values are rounded as a whole, and non-integral ones are counted in the log"""
+    S = np.transpose(np.array([[1, 0.1], [1, 1], [0.3, 0.6], [0.5, 0.8]]))
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.75)
+    solver = RandomizedSolver(
+        [0, 0, 0, 0], [1, 1, 1, 1], [2, 2], encoder(-S, M, Q)
+    )
+    one = solver.one
+    lp_solution = np.array(
+        [[0.75, 0.75, 0.25, 0.25], [0.25, 0.25, 0.75, 0.75]]
+    ) * one + np.array([[1e-7, -1e-7, 0.4, -0.4], [0, 0, 0, 0]])
+    if use_sparse:
+        lp_solution = sparse.csr_matrix(lp_solution)
+        round_assignment = solver._round_sparse_fractional_assignment
+    else:
+        round_assignment = solver._round_fractional_assignment
+
+    solver.solved = True
+    with caplog.at_level("DEBUG"):
+        round_assignment(lp_solution)
+    assert solver.solved
+    integer_assignment = solver.integer_fractional_assignment_matrix
+    if use_sparse:
+        integer_assignment = integer_assignment.toarray()
+    np.testing.assert_array_equal(
+        integer_assignment,
+        [[75000, 75000, 25000, 25000], [25000, 25000, 75000, 75000]],
+    )
+    assert integer_assignment.dtype == np.intc
+    assert "LP solution not integral at 2 cells, e.g. 0,2" in caplog.text
+
+    # a paper load that is not a whole number of reviews after rounding
+    lp_solution[0, 0] += 0.6
+    round_assignment(lp_solution)
+    assert not solver.solved
+
+
+def test_sample_bvn_leaves_input_unchanged():
+    """The sampler works on its own copy and returns a 0/1 matrix of the same shape"""
+    one = 100
+    F = np.array([[50, 50, 0], [50, 0, 50], [0, 50, 50]], dtype=np.intc)
+    original = F.copy()
+    for _ in range(20):
+        sample = sample_bvn(F, one)
+        np.testing.assert_array_equal(F, original)
+        assert sample.shape == F.shape and sample.dtype == np.intc
+        assert np.all(sample.sum(axis=1) == 1) and np.all(sample.sum(axis=0) == 1)
+        assert np.all(F[sample == 1] > 0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sample_assignments(max_workers):
+    """Several draws from one solve are valid and reproducible from their seeds"""
+    p = 10
+    r = 20
+    S = np.random.random((p, r))
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.5)
+    solver = RandomizedSolver([1] * r, [3] * r, [3] * p, encoder(-S, M, Q))
+    solver.solve()
+    flow_matrix = solver.flow_matrix.copy()
+
+    draws = solver.sample_assignments(6, seeds=7, max_workers=max_workers)
+    assert len(draws) == 6
+    assert len(set(draw.seed for draw in draws)) == 6
+    assert np.array_equal(solver.flow_matrix, flow_matrix)
+    for draw in draws:
+        assert draw.valid
+        assert np.all(np.logical_or(draw.assignment == 0, draw.assignment == 1))
+        assert np.all(draw.assignment[solver.fractional_assignment_matrix == 0] == 0)
+        assert draw.cost == pytest.approx(np.sum(draw.assignment * solver.cost_matrix))
+
+    again = solver.sample_assignments(
+        2, seeds=[draws[0].seed, draws[5].seed], max_workers=1
+    )
+    assert np.array_equal(again[0].assignment, draws[0].assignment)
+    assert np.array_equal(again[1].assignment, draws[5].assignment)
+
+    with pytest.raises(SolverException):
+        solver.sample_assignments(3, seeds=[1, 2])
+
+
+def test_sample_bvn_threads_reproduce_seeds():
+    """Draws on concurrent threads equal the sequential draws with the same seeds"""
+    one = 100000
+    F = np.full((20, 40), one // 4, dtype=np.intc)
+    seeds = draw_seeds(8, 0)
+    assert all(0 <= seed < 2**64 for seed in seeds)
+    sequential = [sample_bvn(F, one, seed) for seed in seeds]
+    threaded = sample_bvn_batch(F, one, seeds, max_workers=4)
+    for expected, sample in zip(sequential, threaded):
+        assert np.array_equal(expected, sample)
+        assert np.all(sample.sum(axis=1) == 10) and np.all(sample.sum(axis=0) == 5)
+    assert len(set(sample.tobytes() for sample in sequential)) > 1
+
+
+def test_sample_bvn_sparse_support():
+    """Sampling the support of a fractional assignment gives the dense sample"""
+    one = 100000
+    F = np.zeros((20, 40), dtype=np.intc)
+    for i in range(20):
+        F[i, [i, i + 10, i + 20, (i + 30) % 40]] = one // 2
+    support = sparse.coo_matrix(F)
+    # unordered pairs, one of them stored twice
+    order = np.random.permutation(support.nnz)
+    rows = np.append(support.row[order], 0)
+    cols = np.append(support.col[order], 0)
+    values = np.append(support.data[order], 0)
+    values[np.flatnonzero((rows == 0) & (cols == 0))[0]] = one // 4
+    values[-1] = one // 4
+    support = sparse.coo_matrix((values, (rows, cols)), shape=F.shape)
+
+    for seed in draw_seeds(5, 1):
+        sample = sample_bvn(support, one, seed)
+        assert sparse.isspmatrix_csr(sample) and sample.dtype == np.intc
+        assert sample.nnz == 40 and np.all(sample.data == 1)
+        assert np.array_equal(sample.toarray(), sample_bvn(F, one, seed))
+
+
+def test_lp_backend_basic():
+    """The LP backend finds the same fractional assignment as the flow backend"""
+    S = np.transpose(np.array([[1, 0.1], [1, 1], [0.3, 0.6], [0.5, 0.8]]))
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.75)
+    solver = RandomizedSolver(
+        [0, 0, 0, 0],
+        [1, 1, 1, 1],
+        [2, 2],
+        encoder(-S, M, Q),
+        fractional_backend="lp",
+    )
+
+    check_test_solution(solver)
+    solution = np.transpose(
+        np.array([[0.75, 0.25], [0.75, 0.25], [0.25, 0.75], [0.25, 0.75]])
+    )
+    assert np.all(
+        solver.fractional_assignment_matrix == solution
+    ), "Fractional assignment should be correct"
+
+
+def test_lp_backend_fraction_of_opt():
+    """
+    The LP backend solves minimums and demands together, so its deterministic baseline
+    does too: the two-stage baseline (-11) would be worse than the LP itself (-19).
+    """
+    S = np.array([[10, 10], [9, 1]])
+    M = np.zeros(np.shape(S))
+    Q = np.ones(np.shape(S))
+    solver = RandomizedSolver(
+        [1, 0],
+        [1, 2],
+        [1, 1],
+        encoder(-S, M, Q),
+        fractional_backend="lp",
+    )
+    solver.solve()
+
+    assert solver.solved and solver.opt_solved
+    assert solver.opt_cost == -19 * cost_scale
+    assert solver.get_fraction_of_opt() <= 1
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_lp_backend_matches_single_solve_flow(use_sparse):
+    """The LP backend reaches the optimum of the single-solve flow, within the scale"""
+    p = 12
+    r = 9
+    rng = np.random.default_rng(4)
+    S = np.round(rng.random((p, r)), 2)
+    S[rng.random((p, r)) < 0.2] = 0
+    M = np.zeros(np.shape(S))
+    M[rng.random((p, r)) < 0.1] = -1
+    Q = np.round(rng.uniform(0.3, 1, (p, r)), 2)
+    Q = np.where(S != 0, Q, 0)
+    if use_sparse:
+        matrices = (
+            sparse.csr_matrix(-S),
+            sparse.csr_matrix(M),
+            sparse.csr_matrix(Q),
+        )
+    else:
+        matrices = (-S, M, Q)
+
+    flow_solver = RandomizedSolver(
+        [1] * r, [5] * r, [3] * p, encoder(*matrices), single_solve=True
+    )
+    flow_solver.solve()
+    lp_solver = RandomizedSolver(
+        [1] * r, [5] * r, [3] * p, encoder(*matrices), fractional_backend="lp"
+    )
+    lp_solver.solve()
+
+    assert flow_solver.solved and lp_solver.solved
+    assert lp_solver.expected_cost == pytest.approx(
+        flow_solver.expected_cost, rel=1e-4
+    )
+    fractions = lp_solver.fractional_assignment_matrix
+    limits = lp_solver.prob_limit_matrix
+    if use_sparse:
+        fractions = fractions.toarray()
+        limits = limits.toarray()
+    assert np.all(fractions <= limits + 1e-9)
+    assert np.allclose(fractions.sum(axis=1), 3)
+    loads = fractions.sum(axis=0)
+    assert np.all(loads >= 1 - 1e-9) and np.all(loads <= 5 + 1e-9)
+    assert lp_solver._assignment_is_valid(lp_solver.flow_matrix)
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_lp_backend_candidates_follow_flow(monkeypatch, use_sparse):
+    """Both backends drop pairs whose cost truncates to 0, and keep the same pairs"""
+    monkeypatch.setattr(lp_solver, "PAIR_BLOCK_SIZE", 3)  # one paper per block
+    S = np.array([[1, 0.0004, 0.5], [0.0004, 1, 0.5], [0.5, 0.5, 0.0009]])
+    M = np.zeros(np.shape(S))
+    M[2, 1] = -1
+    Q = np.full(np.shape(S), 0.5)
+    matrices = (-S, M, Q)
+    if use_sparse:
+        matrices = tuple(sparse.csr_matrix(matrix) for matrix in matrices)
+
+    solver = RandomizedSolver(
+        [0, 0, 0], [2, 2, 2], [1, 1, 1], encoder(*matrices), fractional_backend="lp"
+    )
+    papers, reviewers, costs, _ = solver.fractional_assignment_solver._candidate_pairs()
+    flow_graph = SimpleSolver(
+        [2, 2, 2], [1, 1, 1], solver.cost_matrix, solver.constraint_matrix
+    )
+    assert list(zip(papers, reviewers)) == [(0, 0), (0, 2), (1, 1), (1, 2), (2, 0)]
+    assert set(zip(papers, reviewers, costs)) == set(
+        zip(
+            flow_graph.arc_paper_indices,
+            flow_graph.arc_reviewer_indices,
+            flow_graph.costs[flow_graph.assignment_arcs],
+        )
+    )
+
+
+def test_bad_fractional_backend():
+    S = np.ones((2, 2))
+    with pytest.raises(SolverException):
+        RandomizedSolver(
+            [0, 0],
+            [2, 2],
+            [1, 1],
+            encoder(-S, np.zeros((2, 2)), np.ones((2, 2))),
+            fractional_backend="simplex",
+        )
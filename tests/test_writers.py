@@ -0,0 +1,67 @@
+import csv
+import json
+
+import pandas as pd
+import pytest
+
+from matcher.writers import write_records
+
+RECORDS = {
+    "paper0": [
+        {"aggregate_score": 0.5, "user": "reviewer0"},
+        {"aggregate_score": 0.25, "user": "reviewer1"},
+    ],
+    "paper1": [{"aggregate_score": 1.0, "user": "reviewer2"}],
+    "paper2": [],
+}
+
+ROWS = [
+    ("paper0", "reviewer0", 0.5),
+    ("paper0", "reviewer1", 0.25),
+    ("paper1", "reviewer2", 1.0),
+]
+
+
+@pytest.mark.parametrize("records", [RECORDS, {}])
+def test_write_json_matches_json_dumps(tmp_path, records):
+    path = tmp_path / "assignments.json"
+    write_records(records, str(path), "json")
+    assert path.read_text() == json.dumps(records, indent=2)
+
+
+def test_write_jsonl(tmp_path):
+    path = tmp_path / "assignments.jsonl"
+    write_records(RECORDS, str(path), "jsonl")
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [
+        (line["paper_id"], line["user"], line["aggregate_score"]) for line in lines
+    ] == ROWS
+
+
+def test_write_csv(tmp_path):
+    """Rows match the layout of ICML2025/scripts/json_to_csv.py: no header."""
+    path = tmp_path / "assignments.csv"
+    write_records(RECORDS, str(path), "csv")
+    assert path.read_bytes().startswith(b"paper0,reviewer0,0.5\n")
+    with open(path) as f:
+        rows = [(paper, user, float(score)) for paper, user, score in csv.reader(f)]
+    assert rows == ROWS
+
+
+def test_write_parquet(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr("matcher.writers.PARQUET_BATCH_SIZE", 2)
+
+    path = tmp_path / "assignments.parquet"
+    write_records(RECORDS, str(path), "parquet")
+    frame = pd.read_parquet(path)
+    assert list(frame.columns) == ["paper_id", "user", "aggregate_score"]
+    assert list(frame.itertuples(index=False, name=None)) == ROWS
+
+    write_records({}, str(path), "parquet")
+    assert len(pd.read_parquet(path)) == 0
+
+
+def test_write_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_records(RECORDS, str(tmp_path / "assignments.xml"), "xml")